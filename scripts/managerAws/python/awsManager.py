@@ -3,6 +3,20 @@
 """
 AWS Credential Manager - Beautiful Login-Style Design
 Inspired by PyQt-Fluent-Widgets Login Template
+
+Core module: configuration, credential backends, store, scheduler and worker.
+Nothing here imports Qt - the window lives in awsManagerGui.py and is only loaded when shown.
+
+Usage:
+    python awsManager.py                                  # GUI (a second launch shows the running one instead)
+    python awsManager.py --renew --default prod-app       # ...and can renew now / switch [default] there
+    python awsManager.py daemon --totp-env awsSecretHere  # headless renewer (no Qt, no display)
+    python awsManager.py daemon --inventory accounts.yaml --tags prod
+    python awsManager.py daemon --identity prod,nonprod           # several IAM users at once (CONFIG['identities'])
+    python awsManager.py creds <profile>                  # credential_process helper (awsManagerCreds.py is the fast path)
+    python awsManager.py logs --since 2h --errors --profile prod-app  # search the log history, rotated files included
+    python awsManager.py ctl status                       # every profile's expiry / last renewal latency as JSON
+    python awsManager.py ctl renew prod-app               # ...also: ctl stop, ctl set-default <profile>
 """
 
 import sys
@@ -15,68 +29,307 @@ import configparser
 import hmac
 import hashlib
 import struct
-import traceback
-from datetime import datetime
+import argparse
+import atexit
+import functools
+import logging
+import logging.handlers
+import queue
+import signal
+import socket
+import socketserver
+import errno
+import heapq
+import bisect
+import mmap
+import itertools
+import random
+import re
+import secrets
+import http.client
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape as xml_escape
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
+from urllib.parse import urlsplit, urlencode, quote, parse_qs
 
 
-# --- DEBUG LOGGING (independent of the worker thread) ---
+# --- LOGGING ---
+# Every log call only enqueues a record; one background listener thread formats, writes (buffered) and
+# rotates the files, so hot paths such as the renewal loop never block on disk I/O.
+LOG_PATH = Path(__file__).parent / "aws_manager.log"
 DEBUG_LOG_PATH = Path(__file__).parent / "aws_manager_debug.log"
 
+logger = logging.getLogger("awsManager")
+debug_logger = logging.getLogger("awsManager.debug")
+
+_log_listener = None
+
+# Start of a log record: "[2026-10-17 03:12:45] ..." (text), "[... .123] ..." (debug) or {"ts": "2026-10-17T03:12:45.123", ...} (json)
+LOG_RECORD_RE = re.compile(rb'^(?:\[|\{"ts": ")(\d{4}-\d\d-\d\d)[ T](\d\d:\d\d:\d\d)', re.M)
+
+
+class RotatingLogHandler(logging.handlers.RotatingFileHandler):
+    """Rotates on size *or* age (numbered backups .1 .. .N) and writes buffered -
+    the listener flushes it whenever the queue drains instead of after every line."""
+
+    def __init__(self, filename, max_bytes, backup_count, rotate_hours):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.rotate_seconds = rotate_hours * 3600
+        # From the current file's start, not this launch - an app restarted more often than the rotation
+        # interval would otherwise never rotate by age
+        self.rollover_at = (self.file_started() or time.time()) + self.rotate_seconds
+
+    def file_started(self):
+        """When the current log file was begun: its birth time where the OS records one, else the time of its
+        first record, else its last write; None if there is no file yet"""
+        try:
+            stat = os.stat(self.baseFilename)
+            with open(self.baseFilename, "rb") as f:
+                head = f.read(4096)
+        except OSError:
+            return None
+        if getattr(stat, "st_birthtime", None):
+            return stat.st_birthtime
+        match = LOG_RECORD_RE.search(head)
+        if match:
+            try:
+                return datetime.strptime(f"{match.group(1).decode()} {match.group(2).decode()}", "%Y-%m-%d %H:%M:%S").timestamp()
+            except ValueError:
+                pass
+        return stat.st_mtime if head else None
+
+    def shouldRollover(self, record):
+        if self.rotate_seconds and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_seconds
+
+    def flush(self):
+        pass  # buffered - see force_flush()
+
+    def force_flush(self):
+        super().flush()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line - message plus structured fields (profile, account, duration_ms, outcome...)"""
+
+    def format(self, record):
+        doc = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        doc.update(getattr(record, "fields", None) or {})
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class LogListener(logging.handlers.QueueListener):
+    """Background log writer - drains the queue and flushes the buffered files whenever it goes idle"""
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            for handler in self.handlers:
+                getattr(handler, "force_flush", handler.flush)()
+            return self.queue.get(block)
+
+
+def log_handlers(config):
+    """The file (and console) handlers for config's log_* settings"""
+    rotation = (config.get("log_max_bytes", 5 * 1024 * 1024), config.get("log_backup_count", 5),
+                config.get("log_rotate_hours", 24))
+
+    main_handler = RotatingLogHandler(LOG_PATH, *rotation)
+    if config.get("log_format", "text") == "json":
+        main_handler.setFormatter(JsonLinesFormatter())
+    else:
+        main_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+    main_handler.addFilter(lambda record: record.name == logger.name)
+
+    debug_handler = RotatingLogHandler(DEBUG_LOG_PATH, *rotation)
+    debug_handler.setFormatter(logging.Formatter("[%(asctime)s.%(msecs)03d] %(message)s", "%Y-%m-%d %H:%M:%S"))
+    debug_handler.addFilter(lambda record: record.name == debug_logger.name)
+
+    handlers = [main_handler, debug_handler]
+    if sys.stdout is not None:  # None in the --windowed PyInstaller build
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(debug_handler.formatter)
+        console_handler.addFilter(lambda record: record.name == debug_logger.name)
+        handlers.append(console_handler)
+    return handlers
+
+
+def setup_logging(config):
+    """Route the worker log and the debug log through one queue + background writer (idempotent)"""
+    global _log_listener
+    if _log_listener:
+        return
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.DEBUG)
+    debug_logger.setLevel(logging.DEBUG)  # propagates to the queue handler on "awsManager"
+
+    _log_listener = LogListener(log_queue, *log_handlers(config), respect_handler_level=False)
+    _log_listener.start()
+    atexit.register(shutdown_logging)
+
+
+def reconfigure_logging(config):
+    """Re-open the log files with changed log_* settings (a reloaded inventory). The queue stays in place,
+    so records logged meanwhile are written by the new handlers."""
+    global _log_listener
+    if not _log_listener:
+        return setup_logging(config)
+    old = _log_listener
+    old.stop()
+    for handler in old.handlers:
+        handler.close()
+    _log_listener = LogListener(old.queue, *log_handlers(config), respect_handler_level=False)
+    _log_listener.start()
+
+
+def shutdown_logging():
+    """Drain the queue, flush and close the log files (runs at exit, safe to call twice)"""
+    global _log_listener
+    listener, _log_listener = _log_listener, None
+    if listener:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
 
 def debug_log(message):
-    """Write a debug message to the dedicated debug log."""
-    try:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        line = f"[{timestamp}] {message}"
-        with open(DEBUG_LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
-        print(line)
-    except Exception:
-        try:
-            print(f"DEBUG_LOG_FAILED: {message}")
-        except Exception:
-            pass
+    """Queue a debug message for the dedicated debug log (and the console)"""
+    debug_logger.debug(message)
+
+
+def log_startup():
+    """Startup diagnostics - called from main() for the GUI/daemon, never on the credential_process path"""
+    debug_log("=" * 80)
+    debug_log("STARTUP")
+    debug_log(f"sys.argv          = {sys.argv}")
+    debug_log(f"__file__          = {__file__}")
+    debug_log(f"Path(__file__)    = {Path(__file__).resolve()}")
+    debug_log(f"Parent dir        = {Path(__file__).parent.resolve()}")
+    debug_log(f"cwd               = {os.getcwd()}")
+    debug_log(f"DEBUG_LOG_PATH    = {DEBUG_LOG_PATH.resolve()}")
+    debug_log(f"Python            = {sys.executable}")
+    debug_log(f"Platform          = {sys.platform}")
+    debug_log(f"USERPROFILE       = {os.environ.get('USERPROFILE', '<missing>')}")
+    debug_log(f"awsSecretHere set = {bool(os.environ.get('awsSecretHere'))}")
+
+
+class LogRing:
+    """Fixed-capacity line buffer with O(1) indexed access - the oldest lines drop off, so memory stays flat
+    however long the app runs. Not thread-safe: owned by the GUI thread."""
+
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._items = [None] * self.capacity
+        self._start = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        return self._items[(self._start + i) % self.capacity]
+
+    def extend(self, lines):
+        """Append lines; returns how many old lines were dropped to make room"""
+        lines = list(lines)[-self.capacity:]
+        dropped = max(0, self._len + len(lines) - self.capacity)
+        self.discard(dropped)
+        for line in lines:
+            self._items[(self._start + self._len) % self.capacity] = line
+            self._len += 1
+        return dropped
+
+    def discard(self, count):
+        """Drop the `count` oldest lines"""
+        for _ in range(min(count, self._len)):
+            self._items[self._start] = None
+            self._start = (self._start + 1) % self.capacity
+            self._len -= 1
 
+    def clear(self):
+        self.discard(self._len)
 
-debug_log("=" * 80)
-debug_log("STARTUP")
-debug_log(f"sys.argv          = {sys.argv}")
-debug_log(f"__file__          = {__file__}")
-debug_log(f"Path(__file__)    = {Path(__file__).resolve()}")
-debug_log(f"Parent dir        = {Path(__file__).parent.resolve()}")
-debug_log(f"cwd               = {os.getcwd()}")
-debug_log(f"DEBUG_LOG_PATH    = {DEBUG_LOG_PATH.resolve()}")
-debug_log(f"Python            = {sys.executable}")
-debug_log(f"Platform          = {sys.platform}")
-debug_log(f"USERPROFILE       = {os.environ.get('USERPROFILE', '<missing>')}")
-debug_log(f"awsSecretHere set = {bool(os.environ.get('awsSecretHere'))}")
-
-from PyQt5.QtCore import Qt, pyqtSignal, QObject, QSize, QEvent, QTimer
-from PyQt5.QtGui import QIcon, QColor, QPixmap, QPainter, QLinearGradient, QBrush
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QSystemTrayIcon, QMenu, QAction, QLabel, QSpacerItem, QSizePolicy
-from qfluentwidgets import (
-    setTheme, Theme, setThemeColor, isDarkTheme,
-    PrimaryPushButton, PushButton, ComboBox, LineEdit,
-    TitleLabel, SubtitleLabel, BodyLabel, CaptionLabel, StrongBodyLabel,
-    ProgressRing, InfoBar, InfoBarPosition, MessageBox, MessageBoxBase,
-    FluentIcon as FIF, SplitTitleBar, CheckBox, HyperlinkButton
-)
-
-def resource_path(name):
-    """Path to bundled resource - works both as script and pyinstaller onefile exe"""
-    base = getattr(sys, "_MEIPASS", str(Path(__file__).parent))
-    return str(Path(base) / name)
-
-
-def isWin11():
-    """Check if running on Windows 11"""
-    return sys.platform == 'win32' and sys.getwindowsversion().build >= 22000
-
-if isWin11():
-    from qframelesswindow import AcrylicWindow as Window
-else:
-    from qframelesswindow import FramelessWindow as Window
+
+class LogTail:
+    """Incremental reader of a growing log file. read_new() returns only the complete lines written since the last
+    call, from the remembered byte offset. It picks up the rest of the old file after a rotation (aws_manager.log.1),
+    and it jumps ahead when the backlog exceeds `backlog_bytes`, e.g. on first open of a multi-megabyte log."""
+
+    def __init__(self, path, backlog_bytes=256 * 1024, max_line=64 * 1024):
+        self.path = Path(path)
+        self.backlog_bytes = backlog_bytes
+        self.max_line = max_line
+        self.offset = None
+        self.ident = None
+        self.partial = b""
+
+    def _read(self, path, start, end):
+        with open(path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def read_new(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        chunks = []
+        if self.ident is not None and st.st_ino != self.ident:
+            # Rotated: finish the old file (now .1) before starting on the new one
+            rotated = Path(f"{self.path}.1")
+            try:
+                old = os.stat(rotated)
+                if old.st_ino == self.ident and old.st_size > self.offset:
+                    chunks.append(self._read(rotated, self.offset, old.st_size))
+            except OSError:
+                pass
+            self.offset = 0
+        elif self.offset is None or st.st_size < self.offset:
+            self.offset = 0  # first read, or truncated in place
+        self.ident = st.st_ino
+
+        skip_first = False
+        if st.st_size - self.offset > self.backlog_bytes:
+            # Only the newest lines fit the view anyway - skip to the last `backlog_bytes`, minus the cut line
+            self.offset = st.st_size - self.backlog_bytes
+            chunks, self.partial, skip_first = [], b"", True
+        if st.st_size > self.offset:
+            chunks.append(self._read(self.path, self.offset, st.st_size))
+            self.offset = st.st_size
+
+        lines = (self.partial + b"".join(chunks)).split(b"\n")
+        self.partial = lines.pop()[-self.max_line:]
+        if skip_first:
+            lines = lines[1:]
+        return [line.rstrip(b"\r").decode("utf-8", "replace") for line in lines]
+
+
+def format_log_line(line):
+    """A log file line for display - JSON lines (log_format "json") become "[ts] msg", text lines stay as they are"""
+    if not line.startswith("{"):
+        return line
+    try:
+        doc = json.loads(line)
+        return f"[{doc['ts'][:19].replace('T', ' ')}] {doc['msg']}"
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return line
 
 
 # Configuration - matching PowerShell script
@@ -94,826 +347,3948 @@ CONFIG = {
     "main_iam_acct_num": "736763050260",
     "role_name": "GroupAccess-Developers-Recording",
     "codeartifact_source_profile": "dev-test-perf",
-    "mfa_secret_key": os.environ.get("awsSecretHere", "")
+    "mfa_secret_key": os.environ.get("awsSecretHere", ""),
+    "renewal_concurrency": 8,
+    "renewal_margin_minutes": 5,            # renew this long before a credential's real Expiration
+    "renewal_jitter_seconds": 60,           # spread renewals so identities/instances don't hit STS together
+    "retry_failed_seconds": 60,             # reschedule a failed profile this soon (after its in-cycle retries)
+    "retry_attempts": 3,                    # in-cycle retries of throttled / transient assume-role failures...
+    "retry_base_seconds": 0.5,              # ...with exponential backoff and full jitter from this base...
+    "retry_max_seconds": 8,                 # ...capped at this per wait
+    "breaker_failures": 5,                  # consecutive failed renewals that pause a profile (throttling is not counted)
+    "breaker_permanent_failures": 2,        # ...or this many permanent ones (AccessDenied, deleted role)
+    "breaker_cooldown_minutes": 15,         # first pause; doubles after every failed probe...
+    "breaker_max_cooldown_hours": 6,        # ...up to this
+    "sts_rate_per_second": 50,              # STS calls per second for the whole process, all identities together (0 = no limit)...
+    "sts_burst": 100,                       # ...with bursts of up to this many
+    "identities": [],                       # more IAM users / MFA devices for one daemon, see IdentityBroker
+    "broker_pool_size": 16,                 # assume-role threads shared by all identities
+    "max_sleep_seconds": 900,               # re-check the wall clock at least this often (laptop sleep/resume)
+    "credential_mode": "file",              # "file" = static keys in ~/.aws/credentials, "process" = credential_process entries
+    "write_credentials_file": True,         # False = only the cache / local endpoint hand out account credentials
+    "credentials_server": False,            # serve AWS_CONTAINER_CREDENTIALS_FULL_URI on a loopback port
+    "credentials_server_host": "127.0.0.1",
+    "credentials_server_port": 0,           # 0 = pick a free port (published in ~/.aws/awsManager/endpoint.json)
+    "credential_backend": "native",         # "native" = in-process STS/CodeArtifact client (source profiles without static keys go through the CLI), "cli" = spawn the aws CLI
+    "aws_cli": "aws",                       # command used by the cli backend (benchmarks point it at a fake)
+    "sts_endpoint_url": "",                 # set = always this STS endpoint, ignoring the three settings below
+    "sts_endpoint_mode": "regional",        # "global" = sts.amazonaws.com, "regional" = default_region first, "fastest" = latency probe
+    "sts_regions": [],                      # more regional STS candidates for failover / probing, e.g. ["eu-west-1", "ap-south-1"]
+    "sts_endpoints": {},                    # region (or "global") -> endpoint URL override, e.g. a local stub
+    "sts_probe_ttl_hours": 24,              # reuse the probed order (~/.aws/awsManager/sts-endpoint.json) this long
+    "sts_probe_timeout_seconds": 2,
+    "sts_failover_minutes": 5,              # keep a failed endpoint at the back of the list this long
+    "codeartifact_endpoint_url": "",        # empty = https://codeartifact.<codeartifact_region>.amazonaws.com
+    "codeartifact_domain": "nice-devops",
+    "codeartifact_domain_owner": "369498121101",
+    "codeartifact_region": "us-west-2",
+    "codeartifact_npm_repository": "cxone-npm",
+    "codeartifact_pip_repository": "cxone-pystore",
+    "codeartifact_token_hours": 12,         # requested token lifetime, 0.25-12 h, independent of the role session's expiry
+    "codeartifact_refresh_minutes": 75,     # fetch a new token once the cached one has less than this left
+    "codeartifact_extra_tools": [],         # also configure any of "twine", "maven", "gradle" with the token
+    "log_format": "text",                   # "json" = JSON lines with profile/account/duration_ms/outcome fields
+    "log_max_bytes": 5 * 1024 * 1024,       # rotate aws_manager.log / aws_manager_debug.log at this size...
+    "log_rotate_hours": 24,                 # ...or after this long, whichever comes first
+    "log_backup_count": 5,
+    "log_view_lines": 5000,                 # lines kept by the in-app log viewer (a fixed ring buffer)
+    "metrics_snapshot": True,               # write ~/.aws/awsManager/metrics.json after every renewal
+    "control_api": True,                    # status / renew / stop / set-default for scripts, see ControlServer
+    "control_transport": "auto",            # "auto" = Unix socket where available, "http" = loopback port + token
+    "control_port": 0,                      # loopback port for the http transport (0 = pick a free one)
+    "metrics_port": None,                   # e.g. 9464 = Prometheus text on http://127.0.0.1:9464/metrics
+    "inventory_path": os.environ.get("awsManagerInventory", ""),  # YAML/JSON/INI accounts file; empty = ~/.aws/awsManager/inventory.*, else AWS_ACCOUNTS
+    "inventory_poll_seconds": 2,            # hot-reload check interval for the inventory file
+    "renewal_policy": "all",                # "usage" = keep only recently used profiles warm, renew the rest on demand
+    "usage_warm_hours": 12,                 # a profile requested within this window keeps being renewed on schedule
+    "on_demand_timeout_seconds": 20,        # how long creds / the endpoint wait for an on-demand renewal
+    "resume_mfa_session": True,             # reuse the MFA session from the last run while it is valid (DPAPI / OS keyring / 0600 file)
+    "resume_min_minutes": 30,               # ...and has at least this long left (else ask for a new MFA code)
+    "totp_digits": 6,
+    "totp_period": 30,
+    "totp_algorithm": "sha1",
+    "totp_min_remaining_seconds": 3         # wait for the next window rather than send a code about to expire
 }
 
 
+BASE32_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
+
+
+def base32_key(secret):
+    """Base32 secret -> key bytes (spaces / padding ignored, trailing partial byte dropped like New-TOTPCode)"""
+    value = bits = 0
+    key = bytearray()
+    for char in secret.upper().replace(" ", "").rstrip("="):
+        index = BASE32_CHARS.find(char)
+        if index == -1:
+            raise ValueError(f"Invalid Base32 character: {char}")
+        value = ((value << 5) | index) & 0xFFFF
+        bits += 5
+        if bits >= 8:
+            bits -= 8
+            key.append((value >> bits) & 0xFF)
+    return bytes(key)
+
+
+class TOTP:
+    """RFC 6238 code generator. The key is decoded once; fresh_code() waits out a window that is about to roll
+    over or whose code was already sent, since STS rejects both and that costs a failed round trip."""
+
+    def __init__(self, secret, digits=6, period=30, algorithm="sha1", min_remaining=3):
+        self.key = base32_key(secret)
+        if not self.key:
+            raise ValueError("Empty TOTP secret")
+        self.digits = digits
+        self.period = period
+        self.digest = getattr(hashlib, algorithm.lower())
+        self.min_remaining = min_remaining
+        self.used_path = state_dir() / "totp-used.json"
+        self.key_id = hashlib.sha256(self.key).hexdigest()[:16]  # never store the key itself
+
+    def counter(self, now=None):
+        return int(time.time() if now is None else now) // self.period
+
+    def code_at(self, counter):
+        digest = hmac.new(self.key, struct.pack(">Q", counter), self.digest).digest()
+        offset = digest[-1] & 0x0F
+        binary = struct.unpack(">I", digest[offset:offset + 4])[0] & 0x7FFFFFFF
+        return str(binary % 10 ** self.digits).zfill(self.digits)
+
+    def now(self, now=None):
+        return self.code_at(self.counter(now))
+
+    def remaining(self, now=None):
+        """Seconds the current code has left"""
+        now = time.time() if now is None else now
+        return self.period - now % self.period
+
+    def used_counters(self):
+        """key id -> last counter sent, for every secret used on this machine"""
+        try:
+            return json.loads(self.used_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def last_used(self):
+        return self.used_counters().get(self.key_id, -1)
+
+    def wait_seconds(self, now=None):
+        """How long fresh_code() would wait - 0 when the current code is usable"""
+        now = time.time() if now is None else now
+        if self.counter(now) <= self.last_used() or self.remaining(now) < self.min_remaining:
+            return self.remaining(now)
+        return 0
+
+    def fresh_code(self, sleep=time.sleep):
+        """A code that has not been sent before and stays valid for at least min_remaining seconds"""
+        wait = self.wait_seconds()
+        if wait:
+            sleep(wait + 0.05)
+        counter = self.counter()
+        try:
+            self.used_path.parent.mkdir(parents=True, exist_ok=True)
+            used = dict(self.used_counters(), **{self.key_id: counter})
+            atomic_write(self.used_path, json.dumps(used).encode("utf-8"), fsync=False)
+        except OSError:
+            pass
+        return self.code_at(counter)
+
+
+@functools.lru_cache(maxsize=8)
+def totp_for(secret, digits=6, period=30, algorithm="sha1", min_remaining=3):
+    """Shared TOTP per secret - the base32 decode happens once per process"""
+    return TOTP(secret, digits, period, algorithm, min_remaining)
+
+
+def totp_from_config(secret, config):
+    return totp_for(secret, config.get("totp_digits", 6), config.get("totp_period", 30),
+                    config.get("totp_algorithm", "sha1"), config.get("totp_min_remaining_seconds", 3))
+
+
 def generate_totp(secret):
     """Generate TOTP code from secret key - matching PowerShell New-TOTPCode function"""
     try:
-        secret = secret.upper().replace(" ", "")
-        
-        base32_chars = "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
-        bits = ""
-        
-        for char in secret:
-            index = base32_chars.find(char)
-            if index == -1:
-                raise ValueError(f"Invalid Base32 character: {char}")
-            bits += format(index, '05b')
-        
-        byte_count = len(bits) // 8
-        secret_bytes = bytes([int(bits[i*8:(i+1)*8], 2) for i in range(byte_count)])
-        
-        epoch = int(time.time()) // 30
-        time_bytes = struct.pack(">Q", epoch)
-        
-        hmac_hash = hmac.new(secret_bytes, time_bytes, hashlib.sha1).digest()
-        
-        offset = hmac_hash[-1] & 0x0F
-        binary = ((hmac_hash[offset] & 0x7F) << 24 |
-                  (hmac_hash[offset + 1] & 0xFF) << 16 |
-                  (hmac_hash[offset + 2] & 0xFF) << 8 |
-                  (hmac_hash[offset + 3] & 0xFF))
-        
-        otp = binary % 1000000
-        
-        return str(otp).zfill(6)
-        
+        return totp_from_config(secret, CONFIG).now()
     except Exception as e:
         print(f"Error generating TOTP: {e}")
         return None
 
 
-class WorkerSignals(QObject):
-    """Signals for background worker thread"""
-    status_update = pyqtSignal(str)
-    progress_update = pyqtSignal(bool)
-    finished = pyqtSignal(bool, str)
-    log_message = pyqtSignal(str)
 
+# --- STS ENDPOINT SELECTION ---
+# Regional STS endpoints answer faster from far away than the global one (which lives in us-east-1) and keep
+# working when another region has trouble. With sts_endpoint_mode "fastest" the candidates are ordered by a
+# latency probe whose result is cached for sts_probe_ttl_hours; any mode fails over down the list.
 
-class AWSCredentialWorker(threading.Thread):
-    """Background worker for AWS credential management"""
+STS_GLOBAL_URL = "https://sts.amazonaws.com"
 
-    def __init__(self, default_profile_name, accounts, mfa_code, config, signals, npm_token=False, pip_token=False):
-        super().__init__()
-        self.default_profile_name = default_profile_name
-        self.accounts = accounts
-        self.mfa_code = mfa_code
+
+def sts_signing_region(url, default_region):
+    """SigV4 region for an STS endpoint URL (global -> us-east-1, sts.<region>.amazonaws.com -> <region>)"""
+    host = urlsplit(url).hostname or ""
+    if host == "sts.amazonaws.com":
+        return "us-east-1"
+    if host.startswith("sts.") and host.endswith(".amazonaws.com"):
+        return host.split(".")[1]
+    return default_region
+
+
+def sts_candidates(config):
+    """(name, url, signing_region) of every endpoint STS calls may use, in configured order - the global
+    endpoint last. CONFIG['sts_endpoints'] maps a region (or "global") to another URL, e.g. a local stub."""
+    if config.get("sts_endpoint_url"):
+        url = config["sts_endpoint_url"]
+        return [(urlsplit(url).hostname or url, url, sts_signing_region(url, config["default_region"]))]
+
+    overrides = config.get("sts_endpoints") or {}
+    regions = []
+    if config.get("sts_endpoint_mode", "regional") != "global":
+        regions = list(dict.fromkeys([config["default_region"], *config.get("sts_regions", [])]))
+    candidates = [(region, overrides.get(region) or f"https://sts.{region}.amazonaws.com", region) for region in regions]
+    candidates.append(("global", overrides.get("global") or STS_GLOBAL_URL, "us-east-1"))
+    return candidates
+
+
+def probe_latency(url, timeout=2.0, samples=2):
+    """Best round trip (seconds) of an unsigned GET / over one connection, None when unreachable.
+    Any HTTP answer counts - STS replies 302 - since only the network path is being measured."""
+    parts = urlsplit(url)
+    cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    conn = cls(parts.netloc, timeout=timeout)
+    best = None
+    try:
+        for _ in range(samples):
+            started = time.perf_counter()
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    except (OSError, http.client.HTTPException):
+        pass
+    finally:
+        conn.close()
+    return best
+
+
+class StsEndpointSelector:
+    """Preference order of the STS candidates, shared by both backends. call() walks it and moves on to the next
+    endpoint when one fails with a network / 5xx error; a failed endpoint stays demoted for sts_failover_minutes."""
+
+    def __init__(self, config, path=None, log=None):
         self.config = config
-        self.signals = signals
-        self.npm_token = npm_token
-        self.pip_token = pip_token
-        self.should_stop = False
-        self.daemon = True
-        
-    def log(self, message):
-        """Log message to file"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
-        
-        log_file = Path(__file__).parent / "aws_manager.log"
-        try:
-            with open(log_file, "a", encoding="utf-8") as f:
-                f.write(log_message + "\n")
-        except Exception as e:
-            print(f"Error writing to log: {e}")
-        
-        self.signals.log_message.emit(log_message)
-        
-    def run_aws_command(self, command):
-        """Run AWS CLI command"""
-        try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            return result.returncode == 0, result.stdout if result.returncode == 0 else result.stderr
-        except Exception as e:
-            return False, str(e)
-    
-    def set_profile(self, profile, creds, region):
-        """Write credentials + region directly to ~/.aws files.
-        Replaces 4 'aws configure set' CLI spawns (~1s each) with instant file writes."""
-        aws_dir = Path.home() / ".aws"
-        aws_dir.mkdir(exist_ok=True)
+        self.candidates = sts_candidates(config)
+        self.path = Path(path) if path else state_dir() / "sts-endpoint.json"
+        self.log = log or logger.info
+        self.latency = {}  # name -> probed seconds (None = unreachable)
+        self._order = None
+        self._demoted = {}  # name -> demoted until
+        self._lock = threading.Lock()
 
-        cp = configparser.ConfigParser()
-        cp.read(aws_dir / "credentials", encoding='utf-8')
-        if not cp.has_section(profile):
-            cp.add_section(profile)
-        cp[profile]["aws_access_key_id"] = creds["AccessKeyId"]
-        cp[profile]["aws_secret_access_key"] = creds["SecretAccessKey"]
-        cp[profile]["aws_session_token"] = creds["SessionToken"]
-        with open(aws_dir / "credentials", "w", encoding='utf-8') as f:
-            cp.write(f)
+    @property
+    def probing(self):
+        return self.config.get("sts_endpoint_mode", "regional") == "fastest" and len(self.candidates) > 1
 
-        cp = configparser.ConfigParser()
-        cp.read(aws_dir / "config", encoding='utf-8')
-        section = "default" if profile == "default" else f"profile {profile}"
-        if not cp.has_section(section):
-            cp.add_section(section)
-        cp[section]["region"] = region
-        with open(aws_dir / "config", "w", encoding='utf-8') as f:
-            cp.write(f)
-    
-    def clear_unchecked_tokens(self):
-        """Delete token files for unchecked options - like clearTokens.bat"""
-        targets = []
-        if not self.pip_token:
-            appdata = os.environ.get("APPDATA", "")
-            if appdata:
-                targets.append(Path(appdata) / "pip" / "pip.ini")
-            targets.append(Path.home() / "pip" / "pip.ini")
-        if not self.npm_token:
-            targets.append(Path.home() / ".npmrc")
-
-        for f in targets:
-            try:
-                if f.exists():
-                    f.unlink()
-                    self.log(f"Deleted {f}")
-            except Exception as e:
-                self.log(f"Failed to delete {f}: {e}")
+    def cache_key(self):
+        return hashlib.sha256("|".join(url for _, url, _ in self.candidates).encode("utf-8")).hexdigest()[:16]
 
-    def run(self):
-        """Main worker thread logic - Following PowerShell script flow"""
+    def load_cached(self):
+        """Cached probe result for these candidates, if younger than sts_probe_ttl_hours"""
         try:
-            self.signals.progress_update.emit(True)
-            self.clear_unchecked_tokens()
-            self.signals.status_update.emit("🔐 Authenticating with MFA...")
+            entry = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        ttl = self.config.get("sts_probe_ttl_hours", 24) * 3600
+        if entry.get("key") != self.cache_key() or time.time() - entry.get("probed_at", 0) > ttl:
+            return None
+        return entry.get("latency", {})
 
-            user = self.config['user']
-            source_profile = self.config['source_profile']
-            main_iam_acct_num = self.config['main_iam_acct_num']
-            role_name = self.config['role_name']
-            default_region = self.config['default_region']
-            codeartifact_source_profile = self.config['codeartifact_source_profile']
-            token_expiration_seconds = self.config['token_expiration_hours'] * 3600
+    def probe(self):
+        """Probe every candidate in parallel, cache and return name -> seconds (None = unreachable)"""
+        timeout = self.config.get("sts_probe_timeout_seconds", 2)
+        with ThreadPoolExecutor(max_workers=len(self.candidates), thread_name_prefix="sts-probe") as pool:
+            results = list(pool.map(lambda c: probe_latency(c[1], timeout), self.candidates))
+        latency = {name: seconds for (name, _, _), seconds in zip(self.candidates, results)}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.path, json.dumps({"key": self.cache_key(), "probed_at": time.time(),
+                                                "latency": latency}).encode("utf-8"), fsync=False)
+        except OSError as e:
+            logger.warning(f"Could not cache the STS probe result: {e}")
+        return latency
 
-            profile_names = ", ".join(a['name'] for a in self.accounts)
-            self.log("**********************************************************************************************************")
-            self.log(f"Default profile: {self.default_profile_name}. Renewing for: {profile_names}")
-            self.log("This script will obtain temporary credentials and store them in your AWS CLI configuration.")
-            self.log(f"The selected profile credentials will also be mirrored into [default] for tools like IntelliJ IDEA.")
-            self.log("**********************************************************************************************************")
+    def order(self):
+        """Candidates, fastest (or configured) first - endpoints that just failed go to the back"""
+        with self._lock:
+            if self._order is None:
+                self._order = list(self.candidates)
+                if self.probing:
+                    cached = self.load_cached()
+                    self.latency = cached if cached is not None else self.probe()
+                    # Unreachable endpoints keep their configured order behind the reachable ones
+                    self._order.sort(key=lambda c: (self.latency.get(c[0]) is None, self.latency.get(c[0]) or 0))
+            order = self._order
+            demoted = dict(self._demoted)
+        now = time.time()
+        return ([c for c in order if demoted.get(c[0], 0) <= now] +
+                [c for c in order if demoted.get(c[0], 0) > now])
 
-            MFA_SESSION = f"{source_profile}-mfa-session"
-            DEFAULT_SESSION = "default"
-            CODEARTIFACT_SESSION = "default-codeartifact"
+    def describe(self):
+        """e.g. "us-west-2 (24 ms), then eu-west-1 (141 ms), global (unreachable)" """
+        parts = []
+        for name, _, _ in self.order():
+            if name in self.latency:
+                seconds = self.latency[name]
+                parts.append(f"{name} ({'unreachable' if seconds is None else f'{seconds * 1000:.0f} ms'})")
+            else:
+                parts.append(name)
+        return parts[0] + (f", then {', '.join(parts[1:])}" if len(parts) > 1 else "")
 
-            mfa_device = f"arn:aws:iam::{main_iam_acct_num}:mfa/{user}"
+    def demote(self, name, error):
+        with self._lock:
+            self._demoted[name] = time.time() + self.config.get("sts_failover_minutes", 5) * 60
+        # The cached probe picked this endpoint - make the next start probe again
+        if self.probing:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+        self.log(f"STS endpoint {name} failed, failing over: {str(error).strip()}")
 
-            self.log(f"MFA Device: {mfa_device}")
+    def call(self, operation):
+        """operation(url, signing_region) -> (success, result), tried on each endpoint in order until one answers.
+        Throttling and permanent errors come back as they are - another region would not change them."""
+        result = "No STS endpoint configured"
+        for name, url, region in self.order():
+            success, result = operation(url, region)
+            if success or classify_error(result) != "transient":
+                return success, result
+            self.demote(name, result)
+        return False, result
 
-            cmd = f'aws sts get-session-token --serial-number {mfa_device} --duration-seconds {token_expiration_seconds} --token-code {self.mfa_code} --profile {source_profile} --output json'
-            self.log(f"Running: aws sts get-session-token...")
-            success, output = self.run_aws_command(cmd)
 
-            if not success:
-                self.log(f"MFA authentication failed: {output}")
-                self.signals.finished.emit(False, f"MFA failed: {output}")
-                return
+# --- CREDENTIAL BACKENDS ---
+# Both backends expose the same three calls and return (success, result_or_error):
+#   get_session_token -> Credentials dict, assume_role -> Credentials dict, get_authorization_token -> token str
 
-            token_creds = json.loads(output)
-            self.log("Renewed AWS CLI Session with temporary credentials with MFA info...")
+def run_command(command, timeout=30):
+    """Run a shell command, returns (success, stdout or stderr)"""
+    try:
+        result = subprocess.run(
+            command,
+            shell=True,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+        return result.returncode == 0, result.stdout if result.returncode == 0 else result.stderr
+    except Exception as e:
+        return False, str(e)
 
-            self.signals.status_update.emit("⚙️ Configuring MFA session...")
 
-            self.set_profile(MFA_SESSION, token_creds["Credentials"], default_region)
+class CliBackend:
+    """Fallback backend - spawns the aws CLI for every call"""
 
-            self.log(f"Successfully cached token for {token_expiration_seconds} seconds ..")
+    def __init__(self, config):
+        self.config = config
+        self.aws = config.get("aws_cli", "aws")
+        self.sts = StsEndpointSelector(config)
 
-            self.signals.progress_update.emit(False)
-            hours_remaining = self.config['token_expiration_hours']
+    def sts_command(self, command):
+        """Run an `aws sts ...` command against the preferred STS endpoint, failing over like the native backend"""
+        return self.sts.call(lambda url, region: run_command(f'{command} --endpoint-url {url} --region {region}'))
 
-            while hours_remaining > 0 and not self.should_stop:
-                self.signals.progress_update.emit(True)
-                self.signals.status_update.emit(f"🔄 Renewing all profiles...")
+    def get_session_token(self, mfa_device, duration_seconds, token_code, source_profile):
+        cmd = f'{self.aws} sts get-session-token --serial-number {mfa_device} --duration-seconds {duration_seconds} --token-code {token_code} --profile {source_profile} --output json'
+        success, output = self.sts_command(cmd)
+        if not success:
+            return False, output
+        return True, json.loads(output)["Credentials"]
 
-                codeartifact_creds = None
-                renewal_failed = False
+    def assume_role(self, role_arn, session_name, profile, creds):
+        cmd = f'{self.aws} sts assume-role --role-arn {role_arn} --role-session-name {session_name} --profile {profile} --query Credentials --output json'
+        success, output = self.sts_command(cmd)
+        if not success:
+            return False, output
+        return True, json.loads(output)
 
-                for acct in self.accounts:
-                    if self.should_stop:
-                        break
+    def get_authorization_token(self, profile, creds):
+        duration = int(self.config.get("codeartifact_token_hours", 12) * 3600)
+        cmd = (f'{self.aws} codeartifact get-authorization-token --domain {self.config["codeartifact_domain"]} '
+               f'--domain-owner {self.config["codeartifact_domain_owner"]} --duration-seconds {duration} '
+               f'--query "[authorizationToken,expiration]" --output text '
+               f'--region {self.config["codeartifact_region"]} --profile {profile}')
+        success, output = run_command(cmd)
+        if not success:
+            return False, output
+        token, _, expiration = output.strip().partition("\t")
+        try:
+            expires = parse_expiration(expiration.strip())
+        except ValueError:
+            expires = time.time() + duration
+        return True, {"token": token.strip(), "expiration": expires}
 
-                    target_profile_name = acct['name']
-                    target_account_num = acct['id']
-                    target_role = f"arn:aws:iam::{target_account_num}:role/{role_name}"
 
-                    self.log(f"Renewing {target_profile_name} access keys...")
-                    cmd = f'aws sts assume-role --role-arn {target_role} --role-session-name {user} --profile {MFA_SESSION} --query Credentials --output json'
-                    success, output = self.run_aws_command(cmd)
+class HttpConnectionPool:
+    """Keep-alive HTTP(S) connections per host, shared by all pool threads"""
 
-                    if not success:
-                        self.log(f"Failed to assume role for {target_profile_name} (Account: {target_account_num}): {output}")
-                        renewal_failed = True
-                        continue
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
 
-                    creds = json.loads(output)
-
-                    self.set_profile(target_profile_name, creds, default_region)
-                    self.log(f"{target_profile_name} profile has been updated in ~/.aws/credentials.")
-
-                    # If this is the user-selected default profile, mirror credentials into [default]
-                    if target_profile_name == self.default_profile_name:
-                        self.set_profile(DEFAULT_SESSION, creds, default_region)
-                        self.log(f"Mirrored {target_profile_name} credentials into [{DEFAULT_SESSION}] profile.")
-
-                    if target_profile_name == codeartifact_source_profile:
-                        codeartifact_creds = creds
-
-                # Use the dev-test-perf credentials for CodeArtifact (npm/pip) if requested
-                if (self.npm_token or self.pip_token) and codeartifact_creds and not self.should_stop:
-                    try:
-                        self.set_profile(CODEARTIFACT_SESSION, codeartifact_creds, default_region)
-
-                        if self.npm_token:
-                            cmd_token = f'aws codeartifact get-authorization-token --domain nice-devops --domain-owner 369498121101 --query authorizationToken --output text --region us-west-2 --profile {CODEARTIFACT_SESSION}'
-                            success_token, ca_token = self.run_aws_command(cmd_token)
-
-                            if success_token:
-                                self.log(f"Generated CodeArtifact Token using {codeartifact_source_profile} credentials.")
-                                try:
-                                    self.run_aws_command('npm config set registry "https://nice-devops-369498121101.d.codeartifact.us-west-2.amazonaws.com/npm/cxone-npm/"')
-                                    self.run_aws_command(f'npm config set "//nice-devops-369498121101.d.codeartifact.us-west-2.amazonaws.com/npm/cxone-npm/:_authToken={ca_token.strip()}"')
-                                    self.log("Updated NPM with CodeArtifact Token.")
-                                except Exception as e:
-                                    self.log(f"NPM not installed or error: {e}")
-                            else:
-                                self.log(f"Failed to get CodeArtifact token: {ca_token}")
-
-                        if self.pip_token:
-                            cmd_pip = f'aws codeartifact login --tool pip --repository cxone-pystore --domain nice-devops --domain-owner 369498121101 --region us-west-2 --profile {CODEARTIFACT_SESSION}'
-                            success_pip, output_pip = self.run_aws_command(cmd_pip)
-                            if success_pip:
-                                self.log("pip authenticated against cxone-pystore.")
-                            else:
-                                self.log(f"pip CodeArtifact login failed: {output_pip}")
-                    except Exception as e:
-                        self.log(f"Error generating CodeArtifact token: {e}")
-                elif self.npm_token or self.pip_token:
-                    self.log(f"Skipping CodeArtifact: {codeartifact_source_profile} credentials not available.")
-
-                if renewal_failed:
-                    self.log("One or more profiles failed to renew. Continuing with next cycle.")
+    def request(self, method, url, body=b"", headers=None):
+        """Send one request, returns (status, headers, body). Retries once if a reused connection went stale."""
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        key = (parts.scheme, parts.netloc)
 
-                self.signals.progress_update.emit(False)
-                hour_text = "hour" if hours_remaining == 1 else "hours"
-                self.signals.status_update.emit(f"✅ Running ({hours_remaining}h)")
-                self.log(f"Keep this window open to have your keys renewed every 59 minutes for the next {hours_remaining} {hour_text}.")
-
-                for minute in range(59, 0, -1):
-                    # 1-second granularity so Stop reacts immediately (was a 60s blocking sleep)
-                    for _ in range(60):
-                        if self.should_stop:
-                            break
-                        time.sleep(1)
-                    if self.should_stop:
-                        break
-                    if minute % 10 == 0:
-                        self.signals.status_update.emit(f"⏳ Waiting... ({hours_remaining}h, {minute}m)")
-
-                hours_remaining -= 1
+        for attempt in range(2):
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
 
-            if self.should_stop:
-                self.signals.finished.emit(True, "Stopped by user")
-                self.log("Process stopped by user")
+            if resp.will_close:
+                conn.close()
             else:
-                self.signals.finished.emit(True, "MFA token credentials have expired. Please restart this script.")
-                self.log("MFA token credentials have expired. Please restart this script.")
+                with self._lock:
+                    self._idle.setdefault(key, []).append(conn)
+            return resp.status, {k.lower(): v for k, v in resp.getheaders()}, data
 
-        except Exception as e:
-            self.log(f"Error: {str(e)}")
-            self.signals.finished.emit(False, f"Error: {str(e)}")
-    
-    def stop(self):
-        """Stop the worker thread"""
-        self.should_stop = True
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, netloc = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=self.timeout), False
 
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
 
-class BackgroundImageWidget(QWidget):
-    """Widget with background image and AWS cloud logo"""
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.backgroundPixmap = None
-        self.loadBackgroundImage()
-        
-    def loadBackgroundImage(self):
-        """Load background image"""
-        bg_path = Path(resource_path("background.jpg"))
-        if bg_path.exists():
-            self.backgroundPixmap = QPixmap(str(bg_path))
-        
-    def paintEvent(self, event):
-        """Paint background image with AWS logo"""
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform)
-        
-        if self.backgroundPixmap:
-            scaled = self.backgroundPixmap.scaled(
-                self.size(),
-                Qt.KeepAspectRatioByExpanding,
-                Qt.SmoothTransformation
-            )
-            x = (self.width() - scaled.width()) // 2
-            y = (self.height() - scaled.height()) // 2
-            painter.drawPixmap(x, y, scaled)
-        else:
-            gradient = QLinearGradient(0, 0, self.width(), self.height())
-            gradient.setColorAt(0.0, QColor(0, 120, 212))
-            gradient.setColorAt(0.5, QColor(0, 160, 240))
-            gradient.setColorAt(1.0, QColor(0, 120, 212))
-            painter.fillRect(self.rect(), QBrush(gradient))
-        
 
+def sign_v4(method, url, headers, body, creds, region, service, now=None):
+    """Add AWS Signature Version 4 headers to `headers` (in place)"""
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date_stamp = now.strftime("%Y%m%d")
+    parts = urlsplit(url)
 
-class MFADialog(MessageBoxBase):
-    """Simple MFA Dialog"""
-    
-    def __init__(self, account_name, parent=None):
-        super().__init__(parent)
-        self.titleLabel = SubtitleLabel(f"Mfa Code")
-        self.titleLabel.setAlignment(Qt.AlignCenter)
-        self.mfaInput = LineEdit(self)
-        self.mfaInput.setMaxLength(6)
-        self.mfaInput.setClearButtonEnabled(True)
-        self.warningLabel = CaptionLabel("MFA code must be 6 digits")
-        self.warningLabel.setStyleSheet("color: #d13438;")
-        self.warningLabel.setHidden(True)
-        self.viewLayout.addWidget(self.titleLabel)
-        self.viewLayout.addWidget(self.mfaInput)
-        self.viewLayout.addWidget(self.warningLabel)
-        
-        self.widget.setMinimumWidth(320)
-        self.yesButton.setText("Go !")
-        self.cancelButton.setText("Exit !")
-        
-        self.mfaInput.setFocus()
-    
-    def validate(self):
-        """Validate MFA code"""
-        mfa_code = self.mfaInput.text()
-        isValid = len(mfa_code) == 6 and mfa_code.isdigit()
-        self.warningLabel.setHidden(isValid)
-        return isValid
+    headers["Host"] = parts.netloc
+    headers["X-Amz-Date"] = amz_date
+    if creds.get("SessionToken"):
+        headers["X-Amz-Security-Token"] = creds["SessionToken"]
 
+    query_pairs = []
+    for pair in filter(None, parts.query.split("&")):
+        k, _, v = pair.partition("=")
+        query_pairs.append((quote(k, safe="-_.~"), quote(v, safe="-_.~%")))
+    canonical_query = "&".join(f"{k}={v}" for k, v in sorted(query_pairs))
 
-class AWSManagerWindow(Window):
-    """Main AWS Credential Manager Window - Login Style"""
-    
-    def __init__(self):
-        super().__init__()
-        
-        self.worker = None
-        self.is_running = False
-        self.shouldReallyClose = False
-        
-        setTheme(Theme.AUTO)
-        setThemeColor('#0078d4')
-        
-        self.initUI()
-        self.initWindow()
-        self.initSystemTray()
-        
-    def initUI(self):
-        """Initialize UI - Clean and elegant"""
-        
-        # Main horizontal layout
-        mainLayout = QHBoxLayout(self)
-        mainLayout.setContentsMargins(0, 0, 0, 0)
-        mainLayout.setSpacing(0)
-        
-        # Left side - Background image with AWS logo
-        self.backgroundWidget = BackgroundImageWidget(self)
-        mainLayout.addWidget(self.backgroundWidget)
-        
-        # Right side - Clean control panel
-        self.controlPanel = QWidget(self)
-        self.controlPanel.setMinimumWidth(320)
-        self.controlPanel.setMaximumWidth(320)
-        self.controlPanel.setStyleSheet("""
-            QWidget {
-                background: transparent;
-            }
-            QLabel {
-                font: 13px 'Segoe UI';
-            }
-        """)
-        
-        panelLayout = QVBoxLayout(self.controlPanel)
-        panelLayout.setContentsMargins(25, 25, 25, 25)
-        panelLayout.setSpacing(10)
-        
-        # Top spacer
-        panelLayout.addSpacerItem(QSpacerItem(20, 60, QSizePolicy.Minimum, QSizePolicy.Expanding))
-        
-        # Logo - blue fluent cloud icon rendered into a fixed pixmap (can't overflow onto the title)
-        logoLabel = QLabel()
-        logoLabel.setPixmap(FIF.CLOUD.icon(color=QColor("#60A5FA")).pixmap(84, 84))
-        logoLabel.setFixedSize(84, 84)
-        logoLabel.setAlignment(Qt.AlignCenter)
-        panelLayout.addWidget(logoLabel, 0, Qt.AlignCenter)
-
-        panelLayout.addSpacerItem(QSpacerItem(20, 24, QSizePolicy.Minimum, QSizePolicy.Fixed))
-
-        # Title - styled, below the logo
-        titleLabel = SubtitleLabel("AWS Credentials Manager")
-        titleLabel.setAlignment(Qt.AlignCenter)
-        titleLabel.setStyleSheet("font: 600 14px 'Segoe UI'; letter-spacing: 0.5px; color: #60A5FA;")
-        panelLayout.addWidget(titleLabel)
-
-        panelLayout.addSpacerItem(QSpacerItem(20, 30, QSizePolicy.Minimum, QSizePolicy.Fixed))
-
-        self.accountCombo = ComboBox()
-        defaultIndex = 0
-        for i, account in enumerate(AWS_ACCOUNTS):
-            self.accountCombo.addItem(f"{account['name']}", userData=account)
-            if account['name'] == 'dev-test-perf':
-                defaultIndex = i
-        self.accountCombo.setCurrentIndex(defaultIndex)
-        self.accountCombo.setFixedWidth(190)
-        panelLayout.addWidget(self.accountCombo, 0, Qt.AlignCenter)
-
-        panelLayout.addSpacerItem(QSpacerItem(20, 10, QSizePolicy.Minimum, QSizePolicy.Fixed))
-
-        # CodeArtifact token options - unchecked by default, side by side
-        tokenRow = QHBoxLayout()
-        tokenRow.setSpacing(16)
-        self.npmTokenCheck = CheckBox("npm")
-        self.pipTokenCheck = CheckBox("pip")
-        tokenRow.addStretch()
-        tokenRow.addWidget(self.npmTokenCheck)
-        tokenRow.addWidget(self.pipTokenCheck)
-        tokenRow.addStretch()
-        panelLayout.addLayout(tokenRow)
-
-        panelLayout.addSpacerItem(QSpacerItem(20, 15, QSizePolicy.Minimum, QSizePolicy.Fixed))
-        
-        # Start button - compact, centered
-        self.startButton = PrimaryPushButton(FIF.PLAY, "Start")
-        self.startButton.setFixedSize(110, 32)
-        self.startButton.clicked.connect(self.onStartClicked)
-        panelLayout.addWidget(self.startButton, 0, Qt.AlignCenter)
-
-        # Stop button
-        self.stopButton = PushButton(FIF.PAUSE, "Stop")
-        self.stopButton.setFixedSize(110, 32)
-        self.stopButton.clicked.connect(self.onStopClicked)
-        self.stopButton.hide()
-        panelLayout.addWidget(self.stopButton, 0, Qt.AlignCenter)
-        
-        panelLayout.addSpacerItem(QSpacerItem(20, 10, QSizePolicy.Minimum, QSizePolicy.Fixed))
-        
-        # View logs link
-        debug_log("initUI: creating viewLogsLink HyperlinkButton")
-        self.viewLogsLink = HyperlinkButton(
-            url="",
-            text="View Logs",
-            parent=self.controlPanel
-        )
-        self.viewLogsLink.clicked.connect(self.onViewLogsClicked)
-        debug_log("initUI: viewLogsLink.clicked connected to onViewLogsClicked")
-        panelLayout.addWidget(self.viewLogsLink, 0, Qt.AlignCenter)
-        
-        panelLayout.addSpacerItem(QSpacerItem(20, 20, QSizePolicy.Minimum, QSizePolicy.Fixed))
-        
-        # Status area - centered
-        statusContainer = QWidget()
-        statusLayout = QHBoxLayout(statusContainer)
-        statusLayout.setContentsMargins(0, 0, 0, 0)
-        statusLayout.setSpacing(8)
-        
-        statusLayout.addStretch()
-        
-        self.progressRing = ProgressRing()
-        self.progressRing.setFixedSize(16, 16)
-        self.progressRing.hide()
-        statusLayout.addWidget(self.progressRing)
-        
-        self.statusLabel = CaptionLabel("⚪ Ready")
-        self.statusLabel.setStyleSheet("color: gray;")
-        statusLayout.addWidget(self.statusLabel)
-        
-        statusLayout.addStretch()
-        
-        panelLayout.addWidget(statusContainer)
-        
-        # Bottom spacer
-        panelLayout.addSpacerItem(QSpacerItem(20, 60, QSizePolicy.Minimum, QSizePolicy.Expanding))
-        
-        mainLayout.addWidget(self.controlPanel)
-        
-    def initWindow(self):
-        """Initialize window properties"""
-        
-        # Set split title bar (like login) - no icon/text over the background image
-        self.setTitleBar(SplitTitleBar(self))
-        self.titleBar.iconLabel.hide()
-        self.titleBar.titleLabel.hide()
-        self.titleBar.raise_()
-        
-        # self.titleBar.titleLabel.setText("🔐 AWS Credential Manager")
-        self.titleBar.titleLabel.setStyleSheet("""
-            QLabel {
-                background: transparent;
-                font: 13px 'Segoe UI';
-                padding: 0 4px;
-                color: white;
-            }
-        """)
-        
-        # Window properties - fixed size
-        self.setWindowIcon(QIcon(resource_path("managerAws.ico")))
-        self.setWindowTitle("AWS Credential Manager")
-        self.setFixedSize(600, 425)
-        
-        # Center on screen
-        desktop = QApplication.desktop().availableGeometry()
-        w, h = desktop.width(), desktop.height()
-        self.move(w//2 - self.width()//2, h//2 - self.height()//2)
-        
-        # Apply Mica effect for Windows 11
-        if isWin11():
-            try:
-                self.windowEffect.setMicaEffect(self.winId(), isDarkMode=isDarkTheme())
-            except:
-                pass
-        
-        # Fallback background
-        if not isWin11():
-            color = QColor(25, 33, 42) if isDarkTheme() else QColor(240, 244, 249)
-            self.setStyleSheet(f"AWSManagerWindow{{background: {color.name()}}}")
-    
-    def initSystemTray(self):
-        """Initialize system tray"""
-        
-        self.trayIcon = QSystemTrayIcon(self)
-        self.trayIcon.setIcon(QIcon(resource_path("managerAws.ico")))
-        self.trayIcon.setToolTip("AWS Credential Manager")
-        
-        trayMenu = QMenu()
-        
-        showAction = QAction("Show Window", self)
-        showAction.triggered.connect(self.showNormal)
-        trayMenu.addAction(showAction)
-        
-        trayMenu.addSeparator()
-        
-        exitAction = QAction("Exit", self)
-        exitAction.triggered.connect(self.reallyClose)
-        trayMenu.addAction(exitAction)
-        
-        self.trayIcon.setContextMenu(trayMenu)
-        self.trayIcon.activated.connect(self.onTrayIconActivated)
-    
-    def changeEvent(self, event):
-        """Minimize button hides to system tray - same behavior as managerAws.ps1"""
-        if event.type() == QEvent.WindowStateChange and self.isMinimized():
-            event.ignore()
-            QTimer.singleShot(0, self.hide)
-            self.trayIcon.show()
-            self.trayIcon.showMessage(
-                "AWS Credential Manager",
-                "Application minimized to system tray",
-                QSystemTrayIcon.Information,
-                2000
-            )
-            return
-        super().changeEvent(event)
+    lowered = {k.lower(): " ".join(str(v).split()) for k, v in headers.items()}
+    signed_headers = ";".join(sorted(lowered))
+    canonical_headers = "".join(f"{k}:{lowered[k]}\n" for k in sorted(lowered))
+    payload_hash = hashlib.sha256(body).hexdigest()
 
-    def onTrayIconActivated(self, reason):
-        """Handle tray icon activation"""
-        if reason == QSystemTrayIcon.DoubleClick:
-            self.showNormal()
-            self.activateWindow()
-    
-    def onAccountSelected(self, index):
-        """Handle account icon selection"""
-        self.accountCombo.setCurrentIndex(index)
-    
-    def getSelectedAccount(self):
-        """Get currently selected account"""
-        index = self.accountCombo.currentIndex()
-        return AWS_ACCOUNTS[index]
-    
-    def onStartClicked(self):
-        """Handle start button - show MFA dialog or auto-generate code"""
-        account = self.getSelectedAccount()
-        mfa_secret_key = CONFIG.get("mfa_secret_key", "")
-        
-        if not mfa_secret_key:
-            mfaDialog = MFADialog(account['name'], self)
-            
-            if mfaDialog.exec():
-                mfa_code = mfaDialog.mfaInput.text()
-                self.startCredentialProcess(account, mfa_code)
-        else:
-            mfa_code = generate_totp(mfa_secret_key)
-            
-            if not mfa_code:
-                InfoBar.error(
-                    title="MFA Generation Error",
-                    content="Failed to generate MFA code automatically. Please check your secret key configuration.",
-                    orient=Qt.Horizontal,
-                    isClosable=True,
-                    position=InfoBarPosition.TOP,
-                    duration=5000,
-                    parent=self
-                )
-                return
-            
-            InfoBar.info(
-                title="Auto MFA",
-                content=f"MFA code generated: {mfa_code}",
-                orient=Qt.Horizontal,
-                isClosable=True,
-                position=InfoBarPosition.TOP,
-                duration=2000,
-                parent=self
-            )
-            self.startCredentialProcess(account, mfa_code)
-    
-    def startCredentialProcess(self, account, mfa_code):
-        """Start credential process"""
-
-        self.is_running = True
-        self.startButton.hide()
-        self.stopButton.show()
-        self.accountCombo.setEnabled(False)
-        self.npmTokenCheck.setEnabled(False)
-        self.pipTokenCheck.setEnabled(False)
-
-        self.updateStatus("🔄 Starting...")
-
-        InfoBar.success(
-            title="Starting",
-            content=f"Default: {account['name']} | All profiles will be renewed",
-            orient=Qt.Horizontal,
-            isClosable=True,
-            position=InfoBarPosition.TOP,
-            duration=2000,
-            parent=self
-        )
+    canonical_request = "\n".join([method, quote(parts.path or "/", safe="/-_.~"), canonical_query,
+                                   canonical_headers, signed_headers, payload_hash])
+    scope = f"{date_stamp}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope,
+                                hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()])
 
-        signals = WorkerSignals()
-        signals.status_update.connect(self.updateStatus)
-        signals.progress_update.connect(self.updateProgress)
-        signals.finished.connect(self.onProcessFinished)
+    key = ("AWS4" + creds["SecretAccessKey"]).encode("utf-8")
+    for part in (date_stamp, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
 
-        self.worker = AWSCredentialWorker(
-            account['name'], AWS_ACCOUNTS, mfa_code, CONFIG, signals,
-            npm_token=self.npmTokenCheck.isChecked(),
-            pip_token=self.pipTokenCheck.isChecked()
-        )
-        self.worker.start()
-    
-    def onStopClicked(self):
-        """Handle stop button"""
-        if self.worker:
-            self.updateStatus("⏸️ Stopping...")
-            self.worker.stop()
-    
-    def onViewLogsClicked(self):
-        """Open log file"""
-        debug_log("onViewLogsClicked: clicked")
-        log_file = Path(__file__).parent / "aws_manager.log"
-        debug_log(f"onViewLogsClicked: log_file = {log_file.resolve()}")
-        debug_log(f"onViewLogsClicked: log_file.exists() = {log_file.exists()}")
-
-        if not log_file.exists():
-            debug_log("onViewLogsClicked: file does not exist, creating placeholder")
-            try:
-                log_file.parent.mkdir(parents=True, exist_ok=True)
-                with open(log_file, "a", encoding="utf-8") as f:
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    f.write(f"[{timestamp}] Log file created. Start the service to see activity.\n")
-                debug_log("onViewLogsClicked: placeholder created successfully")
-            except Exception as e:
-                debug_log(f"onViewLogsClicked: failed to create placeholder: {e}\n{traceback.format_exc()}")
-                InfoBar.error(
-                    title="Cannot Create Log",
-                    content=str(e),
-                    orient=Qt.Horizontal,
-                    isClosable=True,
-                    position=InfoBarPosition.TOP,
-                    duration=4000,
-                    parent=self
-                )
-                return
+    headers["Authorization"] = (f"AWS4-HMAC-SHA256 Credential={creds['AccessKeyId']}/{scope}, "
+                                f"SignedHeaders={signed_headers}, Signature={signature}")
+    return headers
+
+
+class NativeBackend:
+    """In-process STS/CodeArtifact client - no CLI startup, one pooled connection per endpoint"""
+
+    STS_NS = "{https://sts.amazonaws.com/doc/2011-06-15/}"
+
+    def __init__(self, config):
+        self.config = config
+        self.pool = HttpConnectionPool()
+        self.sts = StsEndpointSelector(config)
+        self.cli = None
+
+    def read_profile_keys(self, profile):
+        """Static long-term keys of a profile from ~/.aws/credentials, or None when it has none - SSO,
+        credential_process and role_arn/source_profile profiles in ~/.aws/config are only resolved by the CLI"""
+        cp = configparser.ConfigParser()
+        cp.read(Path.home() / ".aws" / "credentials", encoding="utf-8")
+        if not (cp.has_option(profile, "aws_access_key_id") and cp.has_option(profile, "aws_secret_access_key")):
+            return None
+        return {
+            "AccessKeyId": cp[profile]["aws_access_key_id"],
+            "SecretAccessKey": cp[profile]["aws_secret_access_key"],
+            "SessionToken": cp[profile].get("aws_session_token", ""),
+        }
+
+    def sts_call(self, action, params, creds):
+        """POST a signed STS Query API call to the preferred endpoint and return the parsed Credentials element"""
+        return self.sts.call(lambda url, region: self.sts_request(url, region, action, params, creds))
 
-        # Open with notepad directly - .log files often have no file association,
-        # which causes os.startfile to silently do nothing.
+    def sts_request(self, url, region, action, params, creds):
+        body = urlencode({"Action": action, "Version": "2011-06-15", **params}).encode("utf-8")
+        headers = {"Content-Type": "application/x-www-form-urlencoded; charset=utf-8"}
+        sign_v4("POST", url, headers, body, creds, region, "sts")
         try:
-            debug_log(f"onViewLogsClicked: launching notepad for {log_file}")
-            subprocess.Popen(["notepad.exe", str(log_file)])
-            debug_log("onViewLogsClicked: notepad launched successfully")
+            status, _, data = self.pool.request("POST", url, body, headers)
         except Exception as e:
-            debug_log(f"onViewLogsClicked: notepad failed: {e}\n{traceback.format_exc()}")
-            # Fallback to os.startfile in case notepad isn't on PATH for some reason
-            try:
-                debug_log("onViewLogsClicked: trying os.startfile fallback")
-                os.startfile(str(log_file))
-                debug_log("onViewLogsClicked: os.startfile fallback returned")
-            except Exception as e2:
-                debug_log(f"onViewLogsClicked: os.startfile fallback failed: {e2}\n{traceback.format_exc()}")
-                InfoBar.error(
-                    title="Cannot Open Log",
-                    content=f"{e2}",
-                    orient=Qt.Horizontal,
-                    isClosable=True,
-                    position=InfoBarPosition.TOP,
-                    duration=4000,
-                    parent=self
-                )
-    
-    def updateStatus(self, message):
-        """Update status label"""
-        self.statusLabel.setText(message)
-    
-    def updateProgress(self, show):
-        """Show/hide progress ring"""
-        if show:
-            self.progressRing.show()
-        else:
-            self.progressRing.hide()
-    
-    def onProcessFinished(self, success, message):
-        """Handle process completion"""
-        
-        self.is_running = False
-        self.startButton.show()
-        self.stopButton.hide()
-        self.accountCombo.setEnabled(True)
-        self.npmTokenCheck.setEnabled(True)
-        self.pipTokenCheck.setEnabled(True)
-        self.progressRing.hide()
+            return False, f"Could not connect to the endpoint URL: {url} ({e})"
+
+        try:
+            root = ET.fromstring(data)
+        except ET.ParseError:
+            return False, f"An error occurred (HTTP {status}) when calling the {action} operation: {data[:200]!r}"
+
+        if status != 200:
+            code = root.findtext(f".//{self.STS_NS}Code") or root.findtext(".//Code") or f"HTTP {status}"
+            message = root.findtext(f".//{self.STS_NS}Message") or root.findtext(".//Message") or ""
+            return False, f"An error occurred ({code}) when calling the {action} operation: {message}"
+
+        node = root.find(f".//{self.STS_NS}Credentials")
+        if node is None:
+            return False, f"No credentials in {action} response"
+        return True, {field: node.findtext(f"{self.STS_NS}{field}")
+                      for field in ("AccessKeyId", "SecretAccessKey", "SessionToken", "Expiration")}
+
+    def get_session_token(self, mfa_device, duration_seconds, token_code, source_profile):
+        try:
+            creds = self.read_profile_keys(source_profile)
+        except Exception as e:
+            return False, str(e)
+        if creds is None:
+            # Only the MFA login needs the source profile; the session it returns drives the native calls again
+            if self.cli is None:
+                self.cli = CliBackend(self.config)
+            return self.cli.get_session_token(mfa_device, duration_seconds, token_code, source_profile)
+        return self.sts_call("GetSessionToken", {
+            "SerialNumber": mfa_device,
+            "DurationSeconds": str(duration_seconds),
+            "TokenCode": token_code,
+        }, creds)
+
+    def assume_role(self, role_arn, session_name, profile, creds):
+        return self.sts_call("AssumeRole", {"RoleArn": role_arn, "RoleSessionName": session_name}, creds)
+
+    def get_authorization_token(self, profile, creds):
+        region = self.config["codeartifact_region"]
+        base = self.config.get("codeartifact_endpoint_url") or f"https://codeartifact.{region}.amazonaws.com"
+        duration = int(self.config.get("codeartifact_token_hours", 12) * 3600)
+        query = urlencode({"domain": self.config["codeartifact_domain"],
+                           "domain-owner": self.config["codeartifact_domain_owner"],
+                           "duration": duration})
+        url = f"{base.rstrip('/')}/v1/authorization-token?{query}"
+        headers = {}
+        sign_v4("POST", url, headers, b"", creds, region, "codeartifact")
+        try:
+            status, resp_headers, data = self.pool.request("POST", url, b"", headers)
+        except Exception as e:
+            return False, f"Could not connect to the endpoint URL: {url} ({e})"
+        try:
+            payload = json.loads(data or b"{}")
+        except ValueError:
+            payload = {}
+        if status != 200:
+            code = resp_headers.get("x-amzn-errortype", f"HTTP {status}").split(":")[0]
+            return False, f"An error occurred ({code}) when calling the GetAuthorizationToken operation: {payload.get('message', '')}"
+        try:
+            expires = parse_expiration(payload["expiration"])
+        except (KeyError, ValueError):
+            expires = time.time() + duration
+        return True, {"token": payload["authorizationToken"], "expiration": expires}
+
+
+def create_backend(config):
+    """Pick the credential backend configured in CONFIG['credential_backend']"""
+    if config.get("credential_backend", "native") == "cli":
+        return CliBackend(config)
+    return NativeBackend(config)
+
+
+
+# --- CREDENTIAL STORE ---
+
+class FileLock:
+    """Cross-process exclusive lock on a sidecar file (msvcrt on Windows, fcntl elsewhere)"""
+
+    def __init__(self, path, timeout=10):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._file = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a+b")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if sys.platform == "win32":
+                    import msvcrt
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    import fcntl
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return self
+            except OSError:
+                if time.monotonic() >= deadline:
+                    self._file.close()
+                    raise TimeoutError(f"Timed out waiting for lock {self.path}")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+
+
+def atomic_write(path, data, mode=0o600, fsync=True):
+    """Write bytes through a temp file + fsync + rename so readers never see a half-written file"""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    try:
+        os.chmod(tmp, path.stat().st_mode if path.exists() else mode)
+    except OSError:
+        pass
+    # Windows refuses the rename while another process has the target open - retry briefly
+    for attempt in range(20):
+        try:
+            os.replace(tmp, path)
+            return
+        except PermissionError:
+            if attempt == 19:
+                os.unlink(tmp)
+                raise
+            time.sleep(0.05)
+
+
+# Shared by IniFile (whole text, re.M) and patch_ini_lines (one line). Headers must start the line: configparser
+# (and so the aws CLI, botocore and twine) reads an indented "[name]" after a key as part of that key's value.
+INI_HEADER_RE = re.compile(r"^\[([^\]\r\n]+)\]", re.M)
+INI_KEY_RE = re.compile(r"^([^\s#;=:][^=:]*?)\s*[=:]")
+
+
+def common_prefix_length(a, b):
+    """Length of the common prefix of two strings - slice compares, so C speed even for large files"""
+    lo, hi = 0, min(len(a), len(b))
+    if a[:hi] == b[:hi]:
+        return hi
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def ini_block_values(block):
+    """key (lower-cased) -> raw value of the first occurrence of each key in one section's text"""
+    values = {}
+    for line in block.splitlines()[1:]:
+        match = INI_KEY_RE.match(line)
+        if match:
+            values.setdefault(match.group(1).strip().lower(), line[match.end():].strip())
+    return values
+
+
+class IniFile:
+    """An INI file (~/.aws/credentials, ~/.aws/config) kept in memory with an offset index of its sections.
+    patch() rewrites only the key lines that change - comments, SSO sections, spacing and every other profile stay
+    byte-for-byte identical - and refresh() re-reads the file only when its mtime / size moved, re-indexing from
+    the first changed byte."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.text = ""
+        self.names = []      # section names in file order
+        self.starts = []     # offset of each section's header line
+        self.stamp = None    # (mtime_ns, size, inode) of the text above - atomic replaces change the inode
+        self.stats = {"reads": 0, "sections_scanned": 0}
+
+    def stat(self):
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def refresh(self):
+        """Re-read the file if someone changed it since our last read / write; True when it was re-read"""
+        stamp = self.stat()
+        if stamp == self.stamp:
+            return False
+        text = ""
+        if stamp:
+            with open(self.path, encoding="utf-8", newline="") as f:
+                text = f.read()
+        self.reindex(text)
+        self.stamp = stamp
+        self.stats["reads"] += 1
+        return True
+
+    def reindex(self, text):
+        """Adopt new file contents. Sections that end before the first changed byte keep their offsets;
+        only the rest of the file is scanned for headers."""
+        same = common_prefix_length(self.text, text)
+        keep = 0
+        while keep + 1 < len(self.starts) and self.starts[keep + 1] < same:
+            keep += 1
+        pos = self.starts[keep] if keep else 0
+        found = [(m.group(1).strip(), m.start()) for m in INI_HEADER_RE.finditer(text, pos)]
+        self.names = self.names[:keep] + [name for name, _ in found]
+        self.starts = self.starts[:keep] + [start for _, start in found]
+        self.text = text
+        self.stats["sections_scanned"] += len(found)
+
+    def end(self, i):
+        return self.starts[i + 1] if i + 1 < len(self.starts) else len(self.text)
+
+    def find(self, section):
+        """Index of the first section with this name, or None"""
+        try:
+            return self.names.index(section)
+        except ValueError:
+            return None
+
+    def get(self, section):
+        """key -> raw value of a section, or None when it does not exist"""
+        i = self.find(section)
+        return None if i is None else ini_block_values(self.text[self.starts[i]:self.end(i)])
+
+    def patch(self, updates):
+        """Apply {section: {key: value or None} or None} (None removes) in memory; True when the text changed.
+        Values equal to what the file already holds are left alone, so an unchanged profile is not even reformatted."""
+        newline = "\r\n" if self.text.find("\r\n", 0, self.text.find("\n") + 1) != -1 else "\n"
+        where = {}
+        for i, name in enumerate(self.names):
+            where.setdefault(name, i)
+
+        replaced, appended = {}, []
+        for section, values in updates.items():
+            i = where.get(section)
+            if i is None:
+                lines = patch_ini_lines([], section, values)
+                if lines:
+                    appended.append((section, newline.join(lines) + newline))
+                continue
+            block = self.text[self.starts[i]:self.end(i)]
+            if values is not None:
+                current = ini_block_values(block)
+                values = {key: value for key, value in values.items()
+                          if current.get(key.lower()) != (None if value is None else str(value).strip())}
+                if not values:
+                    continue
+            lines = patch_ini_lines(block.splitlines(), section, values)
+            replaced[i] = newline.join(lines) + newline if lines else ""
+        if not replaced and not appended:
+            return False
+
+        # Splice the new blocks in and shift the offsets of everything after them - nothing else is rescanned
+        pieces, names, starts, pos, shift = [], [], [], 0, 0
+        for i, (name, start) in enumerate(zip(self.names, self.starts)):
+            if i in replaced:
+                end = self.end(i)
+                pieces += [self.text[pos:start], replaced[i]]
+                pos = end
+                if replaced[i]:
+                    names.append(name)
+                    starts.append(start + shift)
+                shift += len(replaced[i]) - (end - start)
+            else:
+                names.append(name)
+                starts.append(start + shift)
+        pieces.append(self.text[pos:])
+        text = "".join(pieces)
+        if replaced.get(len(self.names) - 1) == "" and text.strip():
+            text = text.rstrip() + newline  # no blank lines left dangling after the removed last section
+
+        for section, block in appended:
+            if text and not text.endswith("\n"):
+                text += newline
+            if text.strip() and not text.endswith(newline * 2):
+                text += newline
+            names.append(section)
+            starts.append(len(text))
+            text += block
+
+        self.text, self.names, self.starts = text, names, starts
+        return True
+
+    def save(self):
+        """Write the in-memory text (atomically) and remember the new stamp so our own write is not re-read"""
+        data = self.text.encode("utf-8")
+        if self.text.strip():
+            atomic_write(self.path, data)
+        else:
+            self.path.unlink(missing_ok=True)
+        self.stamp = self.stat()
+        return len(data)
+
+
+class CredentialStore:
+    """Collects every profile update of a renewal cycle and commits them in one locked, atomic write per file.
+    The files stay indexed in memory between commits, so a commit costs the changed key lines, not a full parse."""
+
+    def __init__(self, aws_dir=None):
+        self.aws_dir = Path(aws_dir) if aws_dir else Path.home() / ".aws"
+        self.files = {name: IniFile(self.aws_dir / name) for name in ("credentials", "config")}
+        self._credentials = {}
+        self._config = {}
+        self._lock = threading.Lock()
+        self.stats = {"commits": 0, "files_read": 0, "files_written": 0, "bytes_written": 0}
+
+    def stage(self, profile, creds, region, credential_process=None):
+        """Queue a profile update - nothing touches disk until commit().
+        With `credential_process` the profile gets that entry instead of static keys (which would take precedence)."""
+        section = "default" if profile == "default" else f"profile {profile}"
+        with self._lock:
+            if credential_process:
+                self._credentials[profile] = None
+                self._config[section] = {"region": region, "credential_process": credential_process}
+            else:
+                self._credentials[profile] = {
+                    "aws_access_key_id": creds["AccessKeyId"],
+                    "aws_secret_access_key": creds["SecretAccessKey"],
+                    "aws_session_token": creds["SessionToken"],
+                }
+                self._config[section] = {"region": region, "credential_process": None}
+
+    def remove(self, profile):
+        """Queue removal of a profile's credentials and config sections"""
+        section = "default" if profile == "default" else f"profile {profile}"
+        with self._lock:
+            self._credentials[profile] = None
+            self._config[section] = None
+
+    def pending(self):
+        with self._lock:
+            return len(self._credentials)
+
+    def commit(self):
+        """Apply all staged updates - one read + one write per file, under the cross-process lock"""
+        with self._lock:
+            credentials, self._credentials = self._credentials, {}
+            config, self._config = self._config, {}
+        if not credentials and not config:
+            return 0
+
+        self.aws_dir.mkdir(exist_ok=True)
+        with FileLock(self.aws_dir / ".awsManager.lock"):
+            self._apply(self.files["credentials"], credentials)
+            self._apply(self.files["config"], config)
+        self.stats["commits"] += 1
+        return len(credentials)
+
+    def _apply(self, ini, updates):
+        # None removes a whole section / a single key
+        if not updates:
+            return
+        if ini.refresh():
+            self.stats["files_read"] += 1
+        if not ini.patch(updates):
+            return
+        self.stats["files_written"] += 1
+        self.stats["bytes_written"] += ini.save()
+
+
+
+# --- RENEWAL SCHEDULER ---
+
+def iso_utc(timestamp):
+    """Epoch seconds -> "2026-10-17T03:12:45Z", the format of STS expirations"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_expiration(value):
+    """STS Expiration (ISO-8601 string from CLI/XML, or epoch number) -> epoch seconds"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+class RenewalScheduler:
+    """Priority queue of profile renewals keyed on each credential's expiry.
+    Waits on a Condition, so stop() and renew_now() wake it instantly and idle time costs no wakeups.
+    `clock` (epoch seconds) is time.time - tests pass a fake one."""
+
+    def __init__(self, margin_seconds=300, jitter_seconds=60, max_sleep_seconds=900, clock=time.time):
+        self.margin_seconds = margin_seconds
+        self.jitter_seconds = jitter_seconds
+        self.max_sleep_seconds = max_sleep_seconds
+        self.clock = clock
+        self._heap = []
+        self._due = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def schedule_at(self, profile, due):
+        """(Re)schedule a profile at an absolute epoch time - the latest call wins"""
+        with self._cond:
+            self._due[profile] = due
+            heapq.heappush(self._heap, (due, next(self._seq), profile))
+            self._cond.notify_all()
+
+    def schedule_expiry(self, profile, expires_at):
+        """Schedule a renewal `margin` (+ random jitter) before the credential expires"""
+        due = expires_at - self.margin_seconds - random.uniform(0, self.jitter_seconds)
+        self.schedule_at(profile, max(due, self.clock()))
+        return due
+
+    def renew_now(self, profiles=None):
+        """Make the given profiles (default: all scheduled ones) due immediately"""
+        with self._cond:
+            targets = list(self._due) if profiles is None else profiles
+        now = self.clock()
+        for profile in targets:
+            self.schedule_at(profile, now)
+
+    def remove(self, profile):
+        with self._cond:
+            self._due.pop(profile, None)
+            self._cond.notify_all()
+
+    def next_due(self):
+        with self._cond:
+            return min(self._due.values(), default=None)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def wait_due(self, deadline):
+        """Block until profiles are due, the deadline passes or stop() is called.
+        Returns the due profiles (everything due within the jitter window is batched together), or [] to end."""
+        with self._cond:
+            while not self._stopped:
+                now = self.clock()
+                while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)  # superseded or removed entry
+
+                if self._heap and self._heap[0][0] <= now:
+                    batch = []
+                    while self._heap and self._heap[0][0] <= now + self.jitter_seconds:
+                        due, _, profile = heapq.heappop(self._heap)
+                        if self._due.get(profile) == due:
+                            del self._due[profile]
+                            batch.append(profile)
+                    return batch
+
+                if now >= deadline:
+                    return []
+                wake_at = min(self._heap[0][0], deadline) if self._heap else deadline
+                self._cond.wait(min(wake_at - now, self.max_sleep_seconds))
+            return []
+
+
+# --- RETRY AND CIRCUIT BREAKER ---
+
+THROTTLING_CODES = ("Throttling", "ThrottlingException", "TooManyRequestsException", "RequestLimitExceeded",
+                    "Rate exceeded", "SlowDown", "HTTP 429")
+PERMANENT_CODES = ("AccessDenied", "AccessDeniedException", "NoSuchEntity", "ResourceNotFoundException",
+                   "ValidationError", "ValidationException", "MalformedPolicyDocument", "RegionDisabledException",
+                   "InvalidClientTokenId", "ExpiredToken", "InvalidToken", "is not authorized to perform")
+
+
+def classify_error(message):
+    """STS / CodeArtifact error text -> "throttling", "permanent" or "transient" (network, 5xx, anything unknown)"""
+    message = str(message)
+    if any(code in message for code in THROTTLING_CODES):
+        return "throttling"
+    if any(code in message for code in PERMANENT_CODES):
+        return "permanent"
+    return "transient"
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for throttling / transient errors; permanent errors fail at once"""
+
+    def __init__(self, attempts=3, base_seconds=0.5, max_seconds=8):
+        self.attempts = attempts
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+
+    def delay(self, attempt, kind):
+        # Throttling backs off twice as hard - STS is telling us to slow down, not that it blipped
+        base = self.base_seconds * (2 if kind == "throttling" else 1)
+        return random.uniform(0, min(self.max_seconds, base * 2 ** attempt))
+
+    def call(self, operation, on_retry=None, should_stop=lambda: False):
+        """Run `operation()` -> (success, result) until it succeeds, fails permanently or runs out of attempts.
+        Returns (success, result, kind) where kind is None on success."""
+        for attempt in range(self.attempts + 1):
+            success, result = operation()
+            if success:
+                return True, result, None
+            kind = classify_error(result)
+            if kind == "permanent" or attempt == self.attempts or should_stop():
+                return False, result, kind
+            delay = self.delay(attempt, kind)
+            if on_retry:
+                on_retry(attempt + 1, delay, kind, result)
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    """Per-profile breaker: opens after repeated failures (sooner when they are permanent), then lets one probe
+    through after a cooldown that doubles every time the probe fails. Open profiles cost no STS calls or cycle time."""
+
+    def __init__(self, failures=5, permanent_failures=2, cooldown_seconds=900, max_cooldown_seconds=6 * 3600):
+        self.failures = failures
+        self.permanent_failures = permanent_failures
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self._lock = threading.Lock()
+        self._state = {}  # profile -> {"failures", "permanent", "cooldown", "retry_at", "reason"}
+
+    def allow(self, profile, now=None):
+        """False while the breaker is open; True when closed or when the cooldown is over (half-open probe)"""
+        with self._lock:
+            state = self._state.get(profile)
+            return not state or not state.get("retry_at") or (now or time.time()) >= state["retry_at"]
+
+    def retry_at(self, profile):
+        with self._lock:
+            return (self._state.get(profile) or {}).get("retry_at")
+
+    def record_success(self, profile):
+        """Close the breaker; True if it had been open"""
+        with self._lock:
+            state = self._state.pop(profile, None)
+        return bool(state and state.get("retry_at"))
+
+    def record_failure(self, profile, kind, reason, now=None):
+        """Count a failure (after retries); True when this opens (or re-opens) the breaker.
+        Throttling does not count: STS throttles the caller across every account, so it says nothing about this
+        profile - the shared STS rate limit and the retry backoff deal with it, and healthy accounts keep renewing."""
+        if kind == "throttling":
+            return False
+        with self._lock:
+            state = self._state.setdefault(profile, {"failures": 0, "permanent": 0, "cooldown": 0, "retry_at": None})
+            state["failures"] += 1
+            state["permanent"] = state["permanent"] + 1 if kind == "permanent" else 0
+            state["reason"] = reason
+            if state["retry_at"] or state["failures"] >= self.failures or state["permanent"] >= self.permanent_failures:
+                # Opening, or a half-open probe failed - back off further
+                state["cooldown"] = min(self.max_cooldown_seconds, state["cooldown"] * 2 or self.cooldown_seconds)
+                state["retry_at"] = (now or time.time()) + state["cooldown"]
+                return True
+            return False
+
+    def open_profiles(self):
+        """{profile: (retry_at, reason)} for every open breaker"""
+        with self._lock:
+            return {profile: (state["retry_at"], state["reason"])
+                    for profile, state in self._state.items() if state.get("retry_at")}
+
+    def remove(self, profile):
+        with self._lock:
+            self._state.pop(profile, None)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` calls per second on average, bursts of up to `burst`.
+    acquire() blocks until a token is free (False if `should_stop` fires first)."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, should_stop=lambda: False):
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.acquired += 1
+                    self.waited_seconds += now - started
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if should_stop():
+                return False
+            time.sleep(min(wait, 0.5))
+
+
+@functools.lru_cache(maxsize=None)
+def token_bucket(rate, burst):
+    return TokenBucket(rate, burst)
+
+
+def sts_limiter(config):
+    """The process-wide STS rate limiter (None = unlimited) - every worker and identity shares the same bucket"""
+    rate = float(config.get('sts_rate_per_second', 0) or 0)
+    return token_bucket(rate, float(config.get('sts_burst', 0) or rate)) if rate > 0 else None
+
+
+# --- CREDENTIAL PROCESS CACHE ---
+
+def state_dir():
+    """Per-user directory for the manager's runtime state (~/.aws/awsManager)"""
+    return Path.home() / ".aws" / "awsManager"
+
+
+def credential_process_command(profile):
+    """The `credential_process` command line that asks this program for a profile's credentials.
+    From source it runs the small awsManagerCreds.py launcher: run as a script, this 4k-line module would be
+    recompiled (no .pyc for __main__) and pull in imports the cache-hit path never needs on every SDK refresh."""
+    if getattr(sys, "frozen", False):
+        return f'"{sys.executable}" creds {profile}'
+    python = sys.executable
+    # pythonw.exe has no stdout - the SDK would read nothing
+    if python.lower().endswith("pythonw.exe"):
+        python = python[:-len("pythonw.exe")] + "python.exe"
+    return f'"{python}" "{Path(__file__).resolve().with_name("awsManagerCreds.py")}" {profile}'
+
+
+def credential_document(creds):
+    """STS Credentials -> credential_process (Version 1) document with an ISO-8601 UTC Expiration"""
+    try:
+        expires = parse_expiration(creds["Expiration"])
+    except (KeyError, TypeError, ValueError):
+        expires = time.time() + 3600
+    return {
+        "Version": 1,
+        "AccessKeyId": creds["AccessKeyId"],
+        "SecretAccessKey": creds["SecretAccessKey"],
+        "SessionToken": creds["SessionToken"],
+        "Expiration": datetime.fromtimestamp(expires, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+class CredentialCache:
+    """credential_process documents per profile, written by the running worker and read by `creds`"""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory else state_dir() / "cache"
+
+    def path(self, profile):
+        return self.directory / f"{profile}.json"
+
+    def put(self, profile, creds):
+        doc = credential_document(creds)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Rebuilt every renewal - atomic rename is enough, durability (fsync) is not needed
+        atomic_write(self.path(profile), json.dumps(doc).encode("utf-8"), fsync=False)
+
+    def get(self, profile):
+        """Cached document if it is still valid, else None"""
+        try:
+            with open(self.path(profile), "rb") as f:
+                doc = json.loads(f.read())
+            if parse_expiration(doc["Expiration"]) > time.time():
+                return doc
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def remove(self, profile):
+        try:
+            self.path(profile).unlink()
+        except FileNotFoundError:
+            pass
+
+
+
+# --- CODEARTIFACT TOKEN CACHE ---
+
+class CodeArtifactTokenCache:
+    """One CodeArtifact authorization token with its expiration, shared by npm and pip. Persisted with 0600
+    permissions (the token sits in .npmrc / pip.ini in clear anyway) so a restart reuses it too."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else state_dir() / "codeartifact.json"
+        self._lock = threading.Lock()
+        try:
+            self.entry = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entry = None
+
+    def get(self, source, min_seconds=0):
+        """The token if it was issued for `source` and stays valid for `min_seconds`, else None"""
+        with self._lock:
+            entry = self.entry
+        if entry and entry.get("source") == source and entry.get("expiration", 0) > time.time() + min_seconds:
+            return entry["token"]
+        return None
+
+    def put(self, source, token, expiration):
+        entry = {"source": source, "token": token, "expiration": expiration}
+        with self._lock:
+            self.entry = entry
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.path, json.dumps(entry).encode("utf-8"), mode=0o600, fsync=False)
+        except OSError as e:
+            logger.warning(f"Could not persist the CodeArtifact token: {e}")
+
+
+# --- PACKAGE MANAGER CONFIG ---
+# Direct edits of the files `npm config set` / `aws codeartifact login` would rewrite - only our keys are touched,
+# files are written only when something changed, and nothing is spawned.
+
+CODEARTIFACT_ID = "codeartifact"                # Maven <server> id and .pypirc repository name
+GRADLE_TOKEN_PROPERTY = "codeartifactToken"     # gradle.properties key build scripts read the token from
+PACKAGE_ENTRIES_NAME = "package-config.json"    # entries we created in twine / Maven / Gradle config, see owned_entries()
+
+
+def read_text(path):
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return ""
+
+
+def write_if_changed(path, old, new):
+    """Write `new` (atomically, keeping the file's permissions) unless it equals `old`; True when written.
+    A file left with nothing in it is deleted, as if it had never been created."""
+    if new == old:
+        return False
+    if not new.strip():
+        path.unlink(missing_ok=True)
+        return True
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(path, new.encode("utf-8"), fsync=False)
+    return True
+
+
+def join_lines(lines, original):
+    newline = "\r\n" if "\r\n" in original else "\n"
+    return newline.join(lines) + newline if lines else ""
+
+
+def patch_key_values(path, updates):
+    """Set / remove (None) `key=value` lines (.npmrc, gradle.properties) in place; other lines stay as they are"""
+    text = read_text(path)
+    lines, done = [], set()
+    for line in text.splitlines():
+        key = line.split("=", 1)[0].strip() if "=" in line and not line.lstrip().startswith(("#", ";")) else None
+        if key in updates:
+            if key not in done and updates[key] is not None:
+                lines.append(f"{key}={updates[key]}")
+            done.add(key)  # later duplicates are dropped
+            continue
+        lines.append(line)
+    lines += [f"{key}={value}" for key, value in updates.items() if key not in done and value is not None]
+    return write_if_changed(path, text, join_lines(lines, text))
+
+
+def ini_line(key, value):
+    # A value starting with a newline is a multi-line list (continuation lines) - no space before it
+    return f"{key} ={value}" if value.startswith("\n") else f"{key} = {value}"
+
+
+def patch_ini_lines(lines, section, updates):
+    """Set / remove (None) keys of one INI section in a list of lines; updates=None removes the whole section.
+    Comments, other sections, key order and continuation lines of untouched keys are preserved."""
+    start = end = None
+    for i, line in enumerate(lines):
+        match = INI_HEADER_RE.match(line)
+        if match and start is not None:
+            end = i
+            break
+        if match and match.group(1).strip() == section:
+            start = i
+    if start is None:
+        if not updates or all(value is None for value in updates.values()):
+            return lines
+        lines = list(lines)
+        if lines and lines[-1].strip():
+            lines.append("")
+        return lines + [f"[{section}]"] + [ini_line(key, value) for key, value in updates.items() if value is not None]
+    end = len(lines) if end is None else end
+    if updates is None:
+        head = lines[:start]
+        while head and not head[-1].strip() and end == len(lines):
+            head.pop()  # no blank line left dangling at the end of the file
+        return head + lines[end:]
+
+    body, done, i = [], set(), start + 1
+    while i < end:
+        line = lines[i]
+        extent = 1
+        while i + extent < end and lines[i + extent][:1] in (" ", "\t") and lines[i + extent].strip():
+            extent += 1  # continuation lines belong to the key above
+        match = INI_KEY_RE.match(line)
+        key = match.group(1).strip().lower() if match else None
+        wanted = {k.lower(): k for k in updates}
+        if key in wanted:
+            value = updates[wanted[key]]
+            if key not in done and value is not None:
+                body.append(ini_line(wanted[key], value))
+            done.add(key)
+        else:
+            body.extend(lines[i:i + extent])
+        i += extent
+    # New keys go after the last non-blank line of the section
+    tail = len(body)
+    while tail and not body[tail - 1].strip():
+        tail -= 1
+    added = [ini_line(key, value) for key, value in updates.items() if key.lower() not in done and value is not None]
+    body = body[:tail] + added + body[tail:]
+    return lines[:start + 1] + body + lines[end:]
+
+
+def patch_ini(path, section, updates):
+    text = read_text(path)
+    lines = patch_ini_lines(text.splitlines(), section, updates)
+    return write_if_changed(path, text, join_lines(lines, text))
+
+
+def owned_entries():
+    """twine / Maven / Gradle entries this app created ({tool: {...}}). The ids and keys are the ones the AWS docs
+    tell people to write by hand, so an entry we did not create is the user's and is never removed."""
+    try:
+        return json.loads((state_dir() / PACKAGE_ENTRIES_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def record_entry(tool, entry):
+    """Remember (entry) or forget (None) what we created for `tool`"""
+    owned = owned_entries()
+    if owned.get(tool) == entry:
+        return
+    if entry is None:
+        owned.pop(tool, None)
+    else:
+        owned[tool] = entry
+    state_dir().mkdir(parents=True, exist_ok=True)
+    atomic_write(state_dir() / PACKAGE_ENTRIES_NAME, json.dumps(owned).encode("utf-8"), fsync=False)
+
+
+def codeartifact_host(config):
+    return (f"{config['codeartifact_domain']}-{config['codeartifact_domain_owner']}"
+            f".d.codeartifact.{config['codeartifact_region']}.amazonaws.com")
+
+
+def npmrc_path():
+    return Path(os.environ.get("NPM_CONFIG_USERCONFIG") or Path.home() / ".npmrc")
+
+
+def pip_config_paths():
+    """Where pip reads user config: the file `pip config set` writes first, then legacy locations we only clean"""
+    if os.environ.get("PIP_CONFIG_FILE"):
+        return [Path(os.environ["PIP_CONFIG_FILE"])]
+    if sys.platform == "win32":
+        appdata = os.environ.get("APPDATA")
+        paths = [Path(appdata) / "pip" / "pip.ini"] if appdata else []
+        return paths + [Path.home() / "pip" / "pip.ini"]
+    xdg = Path(os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config") / "pip" / "pip.conf"
+    mac = Path.home() / "Library" / "Application Support" / "pip" / "pip.conf"
+    paths = [mac, xdg] if sys.platform == "darwin" and mac.parent.exists() else [xdg]
+    return paths + [Path.home() / ".pip" / "pip.conf"]
+
+
+def configure_npm(config, token):
+    """registry + //host/npm/repo/:_authToken in .npmrc; token=None removes them (registry only if it is ours)"""
+    registry = f"https://{codeartifact_host(config)}/npm/{config['codeartifact_npm_repository']}/"
+    path = npmrc_path()
+    if token is None:
+        current = {line.split("=", 1)[0].strip(): line.split("=", 1)[1].strip()
+                   for line in read_text(path).splitlines() if "=" in line}
+        updates = {f"{registry[len('https:'):]}:_authToken": None}
+        if current.get("registry", "").strip('"') == registry:
+            updates["registry"] = None
+        return patch_key_values(path, updates)
+    return patch_key_values(path, {"registry": registry, f"{registry[len('https:'):]}:_authToken": token})
+
+
+def configure_pip(config, token):
+    """[global] index-url with the token in pip's user config; token=None removes an index-url pointing at us"""
+    paths = pip_config_paths()
+    if token is not None:
+        index_url = f"https://aws:{token}@{codeartifact_host(config)}/pypi/{config['codeartifact_pip_repository']}/simple/"
+        return patch_ini(paths[0], "global", {"index-url": index_url})
+    changed = False
+    for path in paths:
+        if codeartifact_host(config) in read_text(path):
+            cp = configparser.ConfigParser(interpolation=None)
+            cp.read_string(read_text(path))
+            if codeartifact_host(config) in cp.get("global", "index-url", fallback=""):
+                changed = patch_ini(path, "global", {"index-url": None}) or changed
+    return changed
+
+
+def configure_twine(config, token):
+    """[codeartifact] repository in ~/.pypirc (listed in [distutils] index-servers); token=None removes what we
+    added - the section only if we created it, and its index-servers entry"""
+    path = Path.home() / ".pypirc"
+    text = read_text(path)
+    cp = configparser.ConfigParser(interpolation=None)
+    cp.read_string(text)
+    servers = cp.get("distutils", "index-servers", fallback="").split()
+    owned = owned_entries().get("twine")
+    lines = text.splitlines()
+    if token is None:
+        if not owned:
+            return False
+        if owned.get("section"):
+            lines = patch_ini_lines(lines, CODEARTIFACT_ID, None)
+        # Our listing goes, and so does any listing of a section we just removed - never leave one dangling
+        servers = [s for s in servers if s != CODEARTIFACT_ID]
+    else:
+        owned = owned or {"section": not cp.has_section(CODEARTIFACT_ID), "listed": CODEARTIFACT_ID not in servers}
+        servers += [] if CODEARTIFACT_ID in servers else [CODEARTIFACT_ID]
+        lines = patch_ini_lines(lines, CODEARTIFACT_ID, {
+            "repository": f"https://{codeartifact_host(config)}/pypi/{config['codeartifact_pip_repository']}/",
+            "username": "aws",
+            "password": token,
+        })
+    if token is None or owned.get("listed"):
+        lines = patch_ini_lines(lines, "distutils", {"index-servers": "".join(f"\n    {s}" for s in servers) or None})
+    changed = write_if_changed(path, text, join_lines(lines, text))
+    record_entry("twine", owned if token is not None and (owned["section"] or owned["listed"]) else None)
+    return changed
+
+
+def configure_maven(config, token):
+    """<server id="codeartifact"> credentials in ~/.m2/settings.xml, edited as text so the rest stays byte-identical"""
+    path = Path.home() / ".m2" / "settings.xml"
+    text = read_text(path)
+    server_re = re.compile(rf"[ \t]*<server>\s*<id>\s*{CODEARTIFACT_ID}\s*</id>.*?</server>[ \t]*\r?\n?", re.S)
+    match = server_re.search(text)
+    if token is None:
+        owned = owned_entries().get("maven")
+        if not owned:
+            return False  # a <server> the user wrote is theirs to keep
+        record_entry("maven", None)
+        if not match:
+            return False
+        new = text[:match.start()] + text[match.end():]
+        if owned.get("file") and re.fullmatch(r"(<\?xml[^>]*\?>)?\s*<settings>\s*<servers>\s*</servers>\s*</settings>\s*", new):
+            new = ""  # the file was ours too
+        return write_if_changed(path, text, new)
+
+    password = xml_escape(token)
+    if match:
+        block = re.sub(r"<password>.*?</password>", lambda _: f"<password>{password}</password>", match.group(0), flags=re.S)
+        new = text[:match.start()] + block + text[match.end():]
+    else:
+        server = (f"    <server>\n      <id>{CODEARTIFACT_ID}</id>\n      <username>aws</username>\n"
+                  f"      <password>{password}</password>\n    </server>\n")
+        if "</servers>" in text:
+            index = text.index("</servers>")
+            index = text.rfind("\n", 0, index) + 1
+            new = text[:index] + server + text[index:]
+        elif "</settings>" in text:
+            index = text.index("</settings>")
+            new = text[:index] + f"  <servers>\n{server}  </servers>\n" + text[index:]
+        else:
+            new = f'<?xml version="1.0" encoding="UTF-8"?>\n<settings>\n  <servers>\n{server}  </servers>\n</settings>\n'
+        record_entry("maven", {"server": True, "file": not text.strip()})
+    return write_if_changed(path, text, new)
+
+
+def configure_gradle(config, token):
+    """codeartifactToken in ~/.gradle/gradle.properties (or $GRADLE_USER_HOME); token=None removes it if we added it"""
+    home = Path(os.environ.get("GRADLE_USER_HOME") or Path.home() / ".gradle")
+    path = home / "gradle.properties"
+    present = any(line.split("=", 1)[0].strip() == GRADLE_TOKEN_PROPERTY for line in read_text(path).splitlines())
+    if token is None:
+        if not (present and owned_entries().get("gradle")):
+            return False
+        record_entry("gradle", None)
+    elif not present:
+        record_entry("gradle", {"property": True})
+    return patch_key_values(path, {GRADLE_TOKEN_PROPERTY: token})
+
+
+PACKAGE_TOOLS = {
+    "npm": configure_npm,
+    "pip": configure_pip,
+    "twine": configure_twine,
+    "maven": configure_maven,
+    "gradle": configure_gradle,
+}
+
+
+# --- USAGE TRACKING ---
+
+def record_access(profile):
+    """Stamp a profile as used - `creds` calls this on every SDK refresh, the running worker picks the stamps up"""
+    stamp = state_dir() / "access" / profile
+    try:
+        stamp.touch()
+    except FileNotFoundError:
+        stamp.parent.mkdir(parents=True, exist_ok=True)
+        stamp.touch()
+
+
+class UsageTracker:
+    """Last access per profile (from `creds` stamps and the local endpoint) plus the STS calls lazy renewal saved.
+    Persisted to ~/.aws/awsManager/usage.json so warm profiles stay warm across restarts."""
+
+    KEEP_DAYS = 30
+
+    def __init__(self, warm_seconds, directory=None, name="usage.json"):
+        self.warm_seconds = warm_seconds
+        self.directory = Path(directory) if directory else state_dir()
+        self.path = self.directory / name
+        self.last_access = {}
+        self.saved = {}
+        self._lock = threading.Lock()
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.last_access = data.get("last_access", {})
+            self.saved = data.get("sts_calls_saved", {})
+        except (OSError, ValueError):
+            pass
+
+    def touch(self, profile, when=None):
+        with self._lock:
+            self.last_access[profile] = max(when or time.time(), self.last_access.get(profile, 0))
+
+    def scan(self):
+        """Fold new `creds` stamps in; returns the profiles accessed since the previous scan"""
+        fresh = []
+        try:
+            entries = list(os.scandir(self.directory / "access"))
+        except OSError:
+            return fresh
+        with self._lock:
+            for entry in entries:
+                try:
+                    when = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if when > self.last_access.get(entry.name, 0):
+                    self.last_access[entry.name] = when
+                    fresh.append(entry.name)
+        return fresh
+
+    def is_warm(self, profile, now=None):
+        with self._lock:
+            return (now or time.time()) - self.last_access.get(profile, 0) < self.warm_seconds
+
+    def record_saved(self, count):
+        day = datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            self.saved[day] = self.saved.get(day, 0) + count
+            for old in sorted(self.saved)[:-self.KEEP_DAYS]:
+                del self.saved[old]
+
+    def saved_today(self):
+        with self._lock:
+            return self.saved.get(datetime.now().strftime("%Y-%m-%d"), 0)
+
+    def save(self):
+        with self._lock:
+            data = {"last_access": dict(self.last_access), "sts_calls_saved": dict(self.saved)}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.path, json.dumps(data, indent=2).encode("utf-8"), fsync=False)
+
+
+# --- MFA SESSION CACHE ---
+
+def mfa_device_arn(config):
+    return f"arn:aws:iam::{config['main_iam_acct_num']}:mfa/{config['user']}"
+
+
+def dpapi(data, protect):
+    """Windows DPAPI (CryptProtectData / CryptUnprotectData) - bound to the logged-on user, no key to manage"""
+    import ctypes
+    from ctypes import wintypes
+
+    class DATA_BLOB(ctypes.Structure):
+        _fields_ = [("cbData", wintypes.DWORD), ("pbData", ctypes.POINTER(ctypes.c_char))]
+
+    buffer = ctypes.create_string_buffer(data, len(data))
+    blob_in = DATA_BLOB(len(data), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char)))
+    blob_out = DATA_BLOB()
+    call = ctypes.windll.crypt32.CryptProtectData if protect else ctypes.windll.crypt32.CryptUnprotectData
+    CRYPTPROTECT_UI_FORBIDDEN = 0x01
+    if not call(ctypes.byref(blob_in), None, None, None, None, CRYPTPROTECT_UI_FORBIDDEN, ctypes.byref(blob_out)):
+        raise ctypes.WinError()
+    try:
+        return ctypes.string_at(blob_out.pbData, blob_out.cbData)
+    finally:
+        ctypes.windll.kernel32.LocalFree(blob_out.pbData)
+
+
+def session_vault(config):
+    """The vault of this config's identity - broker identities each get their own entry"""
+    name = config.get("identity_name")
+    return SessionVault(name=f"mfa-session-{name}" if name else "mfa-session")
+
+
+def resumable_session(config):
+    """True when the worker will resume the cached MFA session instead of asking for a code"""
+    identity = f"{mfa_device_arn(config)}|{config['source_profile']}"
+    return bool(config.get("resume_mfa_session", True)
+                and session_vault(config).load(identity, config.get("resume_min_minutes", 30) * 60))
+
+
+# STS errors meaning the MFA session itself is no good (as opposed to one role being denied / throttled)
+SESSION_REJECTED_CODES = ("ExpiredToken", "InvalidClientTokenId", "InvalidToken")
+
+
+class SessionVault:
+    """The 36-hour MFA session, kept so a restart can resume it without STS or a new MFA code.
+
+    Windows: encrypted with DPAPI (user scope) in ~/.aws/awsManager/mfa-session.bin. Elsewhere: the OS keyring
+    (Keychain, Secret Service, KWallet) when the optional `keyring` package finds one (pip install keyring).
+    Without one it falls back to a 0600 file - permission-based protection like ~/.aws/credentials, not encryption."""
+
+    DPAPI_MAGIC = b"AWD1"
+    PLAIN_MAGIC = b"AWP1"
+    KEYRING_SERVICE = "awsManager"
+
+    def __init__(self, directory=None, name="mfa-session"):
+        self.directory = Path(directory) if directory else state_dir()
+        self.name = name
+        self.path = self.directory / f"{name}.bin"
+
+    def _keyring(self):
+        """The keyring module if it has a usable backend (not the "fail" / null ones), else None"""
+        if sys.platform == "win32":
+            return None
+        try:
+            import keyring
+            return keyring if keyring.get_keyring().priority > 0 else None
+        except Exception:
+            return None
+
+    def save(self, identity, creds):
+        """Store the session for `identity` (MFA device + source profile) until its Expiration"""
+        plain = json.dumps({"identity": identity, "credentials": creds}).encode("utf-8")
+        if sys.platform == "win32":
+            sealed = self.DPAPI_MAGIC + dpapi(plain, True)
+        else:
+            keyring = self._keyring()
+            if keyring is not None:
+                try:
+                    keyring.set_password(self.KEYRING_SERVICE, self.name, plain.decode("utf-8"))
+                    self._unlink()
+                    return
+                except Exception as e:
+                    logger.warning(f"Keyring unavailable ({e}) - keeping the MFA session in a 0600 file")
+            sealed = self.PLAIN_MAGIC + plain
+        self.directory.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.path, sealed, mode=0o600)
+
+    def _read(self):
+        keyring = self._keyring()
+        if keyring is not None:
+            stored = keyring.get_password(self.KEYRING_SERVICE, self.name)
+            if stored:
+                return stored.encode("utf-8")
+        sealed = self.path.read_bytes()
+        if sealed.startswith(self.DPAPI_MAGIC):
+            return dpapi(sealed[len(self.DPAPI_MAGIC):], False)
+        if sealed.startswith(self.PLAIN_MAGIC):
+            return sealed[len(self.PLAIN_MAGIC):]
+        raise ValueError("unknown session file format")
+
+    def load(self, identity, min_seconds=0):
+        """The stored STS Credentials if they belong to `identity` and stay valid for `min_seconds`, else None"""
+        try:
+            data = json.loads(self._read())
+            creds = data["credentials"]
+            if data["identity"] == identity and parse_expiration(creds["Expiration"]) > time.time() + min_seconds:
+                return creds
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring cached MFA session: {e}")
+        return None
+
+    def _unlink(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        self._unlink()
+        keyring = self._keyring()
+        if keyring is not None:
+            try:
+                keyring.delete_password(self.KEYRING_SERVICE, self.name)
+            except Exception:
+                pass
+
+
+# --- ACCOUNT INVENTORY ---
+
+INVENTORY_NAMES = ("inventory.yaml", "inventory.yml", "inventory.json", "inventory.ini")
+
+
+def inventory_path(config):
+    """The inventory file to use: CONFIG['inventory_path'], else the first ~/.aws/awsManager/inventory.* found, else None"""
+    if config.get("inventory_path"):
+        return Path(config["inventory_path"]).expanduser()
+    for name in INVENTORY_NAMES:
+        path = state_dir() / name
+        if path.exists():
+            return path
+    return None
+
+
+def split_list(value):
+    """'a, b' / ['a', 'b'] / None -> ['a', 'b']"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return [str(item).strip() for item in value]
+
+
+def ini_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def read_inventory_file(path):
+    """Parse a YAML / JSON / INI inventory into {"defaults": {}, "settings": {}, "accounts": [...]}"""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    suffix = path.suffix.lower()
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"{path.name}: PyYAML is not installed (pip install pyyaml) - or use inventory.json / inventory.ini")
+        data = yaml.safe_load(text) or {}
+    elif suffix == ".json":
+        data = json.loads(text)
+    elif suffix == ".ini":
+        cp = configparser.ConfigParser(interpolation=None)
+        cp.read_string(text, source=str(path))
+        data = {"defaults": {}, "settings": {}, "accounts": []}
+        for section in cp.sections():
+            values = dict(cp[section])
+            if section == "defaults":
+                data[section] = values
+            elif section == "settings":
+                # INI has no types - read numbers / true / false / null the way JSON would
+                data[section] = {key: ini_value(value) for key, value in values.items()}
+            elif section.startswith("account "):
+                roles = {}
+                for item in split_list(values.pop("roles", "")):
+                    role, _, profile = item.partition("=")
+                    roles[role.strip()] = profile.strip() or None
+                data["accounts"].append(dict(values, name=section[len("account "):].strip(), roles=roles or None))
+    else:
+        raise ValueError(f"{path.name}: unsupported inventory format (use .yaml, .yml, .json or .ini)")
+    if not isinstance(data, dict) or not isinstance(data.get("accounts"), list):
+        raise ValueError(f"{path.name}: expected a top-level 'accounts' list")
+    return data
+
+
+class Inventory:
+    """Renewable profiles (one per account + role) indexed by profile name and by tag.
+
+    Inventory file (YAML shown; JSON is the same structure, INI uses [defaults] / [settings] / [account <name>]):
+
+        defaults: {role_name: GroupAccess-Developers-Recording, region: us-west-2}
+        settings: {renewal_concurrency: 16}            # CONFIG overrides, read at startup
+        accounts:
+          - {name: dev-test-perf, id: "934137132601", tags: [dev, perf]}
+          - name: wfoprod
+            id: "918987959928"
+            region: us-east-1
+            roles: {GroupAccess-Developers-Recording: null, ReadOnly: wfoprod-readonly}
+
+    The first role of an account keeps the account name as its profile; further roles get `<account>-<role>`
+    unless the role maps to an explicit profile name.
+    """
+
+    def __init__(self, profiles, settings=None, path=None):
+        self.profiles = profiles
+        self.settings = settings or {}
+        self.path = path
+        self.by_name = {}
+        self.by_tag = {}
+        for profile in profiles:
+            if profile["name"] in self.by_name:
+                raise ValueError(f"duplicate profile name: {profile['name']}")
+            self.by_name[profile["name"]] = profile
+            for tag in profile["tags"]:
+                self.by_tag.setdefault(tag, []).append(profile)
+
+    @classmethod
+    def from_accounts(cls, accounts, config):
+        """The built-in AWS_ACCOUNTS list, with CONFIG's role and region"""
+        return cls.from_data({"accounts": accounts}, config)
+
+    @classmethod
+    def from_data(cls, data, config, path=None):
+        defaults = data.get("defaults") or {}
+        default_role = defaults.get("role_name") or config["role_name"]
+        default_region = defaults.get("region") or config["default_region"]
+        default_tags = split_list(defaults.get("tags"))
+        profiles = []
+        for account in data["accounts"]:
+            if not account.get("name") or not account.get("id"):
+                raise ValueError(f"account entry needs 'name' and 'id': {account}")
+            roles = account.get("roles") or account.get("role_name") or default_role
+            if not isinstance(roles, dict):
+                roles = {role: None for role in split_list(roles)}
+            tags = tuple(sorted(set(default_tags + split_list(account.get("tags")))))
+            for index, (role, profile_name) in enumerate(roles.items()):
+                profiles.append({
+                    "name": profile_name or (account["name"] if index == 0 else f"{account['name']}-{role}"),
+                    "id": str(account["id"]),
+                    "account": account["name"],
+                    "role_name": role,
+                    "region": account.get("region") or default_region,
+                    "tags": tags,
+                })
+        return cls(profiles, data.get("settings"), path)
+
+    @classmethod
+    def load(cls, config):
+        """Inventory from the configured file, or from the built-in AWS_ACCOUNTS when there is none"""
+        path = inventory_path(config)
+        if path is None:
+            return cls.from_accounts(AWS_ACCOUNTS, config)
+        return cls.from_data(read_inventory_file(path), config, path)
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def select(self, names=None, tags=None):
+        """Profiles matching any of `names` and carrying all of `tags` (both optional), in inventory order"""
+        selected = self.profiles
+        if tags:
+            # Start from the smallest tag bucket, then check the rest
+            bucket = min((self.by_tag.get(tag, []) for tag in tags), key=len)
+            selected = [p for p in bucket if all(tag in p["tags"] for tag in tags)]
+        if names:
+            wanted = set(names)
+            selected = [p for p in selected if p["name"] in wanted]
+        return selected
+
+    def search(self, text, limit=None):
+        """Filter for pickers: every word must match a profile name / account id, `tag:x` must be a tag"""
+        words = text.lower().split()
+        tags = [w[4:] for w in words if w.startswith("tag:") and len(w) > 4]
+        words = [w for w in words if not w.startswith("tag:")]
+        matches = []
+        for profile in self.select(tags=tags):
+            if all(w in profile["name"].lower() or w in profile["id"] for w in words):
+                matches.append(profile)
+                if limit and len(matches) >= limit:
+                    break
+        return matches
+
+    def diff(self, other):
+        """(added, removed, changed) profile names going from self to `other`"""
+        added = [name for name in other.by_name if name not in self.by_name]
+        removed = [name for name in self.by_name if name not in other.by_name]
+        changed = [name for name, profile in other.by_name.items()
+                   if name in self.by_name and self.by_name[name] != profile]
+        return added, removed, changed
+
+
+class InventoryWatcher(threading.Thread):
+    """Polls the inventory file's mtime/size and calls on_change(inventory) with each valid new version.
+    A broken edit is logged and ignored - the last good inventory stays in effect."""
+
+    def __init__(self, inventory, config, on_change, interval=None):
+        super().__init__(name="inventory-watcher", daemon=True)
+        self.inventory = inventory
+        self.config = config
+        self.on_change = on_change
+        self.interval = interval or config.get("inventory_poll_seconds", 2)
+        self._stop_event = threading.Event()
+        self._stamp = self._current_stamp()
+
+    def _current_stamp(self):
+        path = inventory_path(self.config)
+        try:
+            st = path.stat() if path else None
+        except OSError:
+            st = None
+        return path, st and (st.st_mtime_ns, st.st_size)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            stamp = self._current_stamp()
+            if stamp == self._stamp:
+                continue
+            self._stamp = stamp
+            if stamp[1] is None:
+                # Deleted / mid-save by an editor - never drop every profile because of it
+                continue
+            try:
+                inventory = Inventory.load(self.config)
+            except Exception as e:
+                logger.warning(f"Inventory reload failed, keeping the previous one: {e}")
+                continue
+            # Only edited log_* settings - one also given on the command line keeps that value until edited
+            logging_changed = {key: value for key, value in inventory.settings.items()
+                               if key.startswith("log_") and self.inventory.settings.get(key) != value}
+            added, removed, changed = self.inventory.diff(inventory)
+            self.inventory = inventory
+            if logging_changed:
+                self.config.update(logging_changed)
+                reconfigure_logging(self.config)
+                logger.info(f"Logging settings reloaded: {', '.join(sorted(logging_changed))}")
+            if added or removed or changed:
+                logger.info(f"Inventory reloaded: {len(added)} added, {len(removed)} removed, {len(changed)} changed",
+                            extra={"fields": {"operation": "inventory", "added": len(added),
+                                              "removed": len(removed), "changed": len(changed)}})
+                self.on_change(inventory)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+# --- LOCAL CREDENTIALS ENDPOINT ---
+
+class CredentialsRequestHandler(BaseHTTPRequestHandler):
+    """GET /creds/<profile> with the Authorization token -> container-credentials JSON"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        token = self.headers.get("Authorization", "").encode("utf-8")
+        if not hmac.compare_digest(token, self.server.token.encode("utf-8")):
+            return self.reply(401, {"message": "Invalid or missing authorization token"})
+
+        profile = self.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        doc = self.server.lookup(profile)
+        if doc is None:
+            return self.reply(404, {"message": f"No credentials for profile '{profile}'"})
+        self.reply(200, {
+            "AccessKeyId": doc["AccessKeyId"],
+            "SecretAccessKey": doc["SecretAccessKey"],
+            "Token": doc["SessionToken"],
+            "Expiration": doc["Expiration"],
+        })
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class LocalCredentialsServer(ThreadingHTTPServer):
+    """Loopback AWS_CONTAINER_CREDENTIALS_FULL_URI endpoint. Each request runs on its own thread and reads the
+    worker's in-memory credentials - it only waits when usage-driven renewal has to fetch a cold profile."""
+
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops connections under bursts
+
+    def __init__(self, lookup, host="127.0.0.1", port=0):
+        super().__init__((host, port), CredentialsRequestHandler)
+        self.lookup = lookup
+        self.token = secrets.token_urlsafe(32)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="credentials-server", daemon=True).start()
+        # Publish where/how to connect for scripts that set up containers
+        state_dir().mkdir(parents=True, exist_ok=True)
+        atomic_write(state_dir() / "endpoint.json",
+                     json.dumps({"url": self.url, "token": self.token, "pid": os.getpid()}).encode("utf-8"))
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        try:
+            (state_dir() / "endpoint.json").unlink()
+        except OSError:
+            pass
+
+
+
+# --- SINGLE INSTANCE ---
+
+def gui_options(argv):
+    """Options of a GUI launch - parsed by the launch itself and, after a hand-off, by the running instance"""
+    parser = argparse.ArgumentParser(prog="awsManager.py", description="AWS Credential Manager (GUI)")
+    parser.add_argument("--renew", action="store_true", help="renew every profile now")
+    parser.add_argument("--default", dest="default_profile", default="", help="profile mirrored into [default]")
+    return parser.parse_known_args(argv)[0]  # leftovers are Qt's own (-platform, -style...)
+
+
+class InstanceServer:
+    """Keeps the GUI to one process per user. The first launch listens on a local socket - AF_UNIX
+    (state_dir()/instance.sock) where the platform has it, else loopback TCP with the port and a token in
+    state_dir()/instance.json - and later launches hand their arguments over and exit (send_to_instance)."""
+
+    SOCKET_NAME = "instance.sock"
+    INFO_NAME = "instance.json"
+    QUEUED = "Queued for the starting instance"
+
+    def __init__(self):
+        self.handler = None
+        self.pending = []
+        self.lock = threading.Lock()
+        self.token = secrets.token_urlsafe(32)
+        self.sock = None
+        self.path = None
+
+    def bind(self, replace_stale=False):
+        """Claim the instance address - raises FileExistsError while another instance holds it"""
+        state_dir().mkdir(parents=True, exist_ok=True)
+        if hasattr(socket, "AF_UNIX"):
+            self.path = state_dir() / self.SOCKET_NAME
+            if replace_stale:
+                self.path.unlink(missing_ok=True)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.bind(str(self.path))
+            except OSError as e:
+                sock.close()
+                if e.errno == errno.EADDRINUSE:
+                    raise FileExistsError(str(self.path)) from e
+                raise
+            os.chmod(self.path, 0o600)
+        else:
+            self.path = state_dir() / self.INFO_NAME
+            if replace_stale:
+                self.path.unlink(missing_ok=True)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(("127.0.0.1", 0))
+            sock.listen(8)
+            # Published only once listening, and complete: a launch that read the port earlier (or an empty file)
+            # would be refused, take the file for stale and start a second instance. The hard link fails when
+            # another launch got there first, so the info file is still the lock.
+            tmp = self.path.with_name(f".{self.INFO_NAME}.{os.getpid()}.tmp")
+            try:
+                with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+                    json.dump({"port": sock.getsockname()[1], "token": self.token, "pid": os.getpid()}, f)
+                os.link(tmp, self.path)
+            except OSError:
+                sock.close()
+                raise
+            finally:
+                tmp.unlink(missing_ok=True)
+            self.sock = sock
+            return self
+        sock.listen(8)
+        self.sock = sock
+        return self
+
+    def start(self):
+        threading.Thread(target=self.serve, name="instance-server", daemon=True).start()
+        return self
+
+    def serve(self):
+        sock = self.sock
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return  # closed by stop()
+            with conn:
+                try:
+                    conn.settimeout(2)
+                    request = json.loads(conn.makefile("rb").readline() or b"{}")
+                    if self.path.name == self.INFO_NAME and not hmac.compare_digest(str(request.get("token", "")), self.token):
+                        success, message = False, "Invalid instance token"
+                    else:
+                        try:
+                            options = gui_options(request.get("argv", []))
+                        except SystemExit:  # argparse gave up on the arguments (or was asked for --help)
+                            success, message = False, "Invalid arguments"
+                        else:
+                            success, message = self.dispatch(options)
+                    conn.sendall(json.dumps({"ok": success, "message": message}).encode("utf-8") + b"\n")
+                except (OSError, ValueError) as e:
+                    debug_log(f"InstanceServer: bad request: {e}")
+
+    def dispatch(self, options):
+        """Hand options to the GUI - or hold them until it attaches, when the launch is still starting up"""
+        with self.lock:
+            if self.handler is None:
+                self.pending.append(options)
+                return True, self.QUEUED
+            handler = self.handler
+        return handler(options)
+
+    def attach(self, handler):
+        """Route hand-offs to `handler(options) -> (success, message)`, which must not block (it runs on the server thread)"""
+        with self.lock:
+            self.handler = handler
+            pending, self.pending = self.pending, []
+        for options in pending:
+            handler(options)
+
+    def stop(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+
+def pid_alive(pid):
+    """Whether a process with this pid exists - without signalling it (os.kill(pid, 0) terminates it on Windows)"""
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        PROCESS_QUERY_LIMITED_INFORMATION, STILL_ACTIVE, ERROR_ACCESS_DENIED = 0x1000, 259, 5
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+        try:
+            code = ctypes.c_ulong()
+            return not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) or code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def send_to_instance(argv, timeout=2.0):
+    """Hand a launch's arguments to the running instance: (success, message), or None when none is running.
+    Only a missing socket / info file, a refused connection or a dead pid count as "none" - an instance that
+    accepted but did not answer in time is busy, not gone, and must not be replaced."""
+    directory = state_dir()
+    try:
+        if hasattr(socket, "AF_UNIX"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address, token = str(directory / InstanceServer.SOCKET_NAME), ""
+        else:
+            info = json.loads((directory / InstanceServer.INFO_NAME).read_text(encoding="utf-8"))
+            if not pid_alive(info["pid"]):
+                return None
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address, token = ("127.0.0.1", info["port"]), info["token"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None  # no info file, or not one bind() published (it only ever links in complete ones)
+    except OSError as e:
+        return False, f"Cannot reach the running instance: {e}"
+    with sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(address)
+            sock.sendall(json.dumps({"token": token, "argv": argv}).encode("utf-8") + b"\n")
+            reply = json.loads(sock.makefile("rb").readline() or b"{}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            return None
+        except socket.timeout:
+            return False, f"The running instance is busy (no answer within {timeout:g}s) - try again in a moment"
+        except (OSError, ValueError) as e:
+            return False, f"The running instance did not answer: {e}"
+    return bool(reply.get("ok")), reply.get("message", "")
+
+
+def claim_instance(argv):
+    """(server, None) for the first launch, (None, (success, message)) once handed to a running instance,
+    (None, None) when the address cannot be claimed at all - the launch then simply runs on its own"""
+    for attempt in range(3):
+        reply = send_to_instance(argv)
+        if reply is not None:
+            return None, reply
+        try:
+            # Refused / missing / dead pid: any socket or info file left behind belongs to a crashed instance
+            return InstanceServer().bind(replace_stale=attempt > 0).start(), None
+        except FileExistsError:
+            time.sleep(0.05)  # another launch claimed it a moment ago - hand off to that one
+        except OSError as e:
+            debug_log(f"claim_instance: {e}")
+            break
+    return None, None
+
+
+# --- CONTROL API ---
+
+class ControlRequestHandler(BaseHTTPRequestHandler):
+    """GET /status, POST /renew[?profile=a,b], POST /stop, POST /set-default?profile=x -> JSON.
+    POST /access?profile=x is how `creds` reports a cold profile under the usage policy.
+    Status is pre-serialized by the target, so a request never waits on the renewal thread."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # Headers and body go out in separate writes - on TCP, avoid the 40 ms delayed-ACK stall (no-op on Unix sockets)
+        self.disable_nagle_algorithm = self.server.token is not None
+        super().setup()
+
+    def log_message(self, format, *args):
+        pass
+
+    def authorized(self):
+        token = self.server.token
+        if token is None:
+            return True  # Unix socket: the file's permissions are the access control
+        if hmac.compare_digest(self.headers.get("Authorization", "").encode("utf-8"), token.encode("utf-8")):
+            return True
+        self.reply(401, {"message": "Invalid or missing authorization token"})
+        return False
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        if self.path.split("?", 1)[0] != "/status":
+            return self.reply(404, {"message": f"Unknown path {self.path}"})
+        self.send_body(200, self.server.target.status_json())
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.authorized():
+            return
+        path, _, query = self.path.partition("?")
+        action = path.strip("/")
+        if action not in ("renew", "stop", "set-default", "access"):
+            return self.reply(404, {"message": f"Unknown path {self.path}"})
+        profiles = [p for value in parse_qs(query).get("profile", []) for p in value.split(",") if p]
+        success, message = self.server.target.control(action, profiles)
+        self.reply(200 if success else 400, {"ok": success, "message": message})
+
+    def reply(self, status, payload):
+        self.send_body(status, json.dumps(payload).encode("utf-8"))
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if hasattr(socket, "AF_UNIX"):  # socketserver has no UnixStreamServer on Windows
+    class UnixControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+        token = None
+
+
+class HttpControlServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class ControlServer:
+    """Local control API for scripts and shell prompts: HTTP on state_dir()/control.sock where the platform has
+    Unix sockets (curl --unix-socket ~/.aws/awsManager/control.sock http://localhost/status), else on a loopback
+    port with a token. Where and how to connect is published in state_dir()/control.json.
+
+    `target` (a worker or the identity broker) provides status_json() -> bytes and control(action, profiles)."""
+
+    INFO_NAME = "control.json"
+    SOCKET_NAME = "control.sock"
+
+    def __init__(self, target, config):
+        self.target = target
+        self.config = config
+        self.server = None
+        self.info = None
+
+    def start(self):
+        """Bind and serve - returns False when another process already serves the control API"""
+        directory = state_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        if hasattr(socket, "AF_UNIX") and self.config.get('control_transport', 'auto') != "http":
+            path = directory / self.SOCKET_NAME
+            if path.exists():
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    probe.connect(str(path))
+                    return False
+                except OSError:
+                    path.unlink()  # left behind by a process that died
+                finally:
+                    probe.close()
+            self.server = UnixControlServer(str(path), ControlRequestHandler)
+            os.chmod(path, 0o600)
+            self.info = {"socket": str(path), "pid": os.getpid()}
+        else:
+            self.server = HttpControlServer(("127.0.0.1", int(self.config.get('control_port', 0))), ControlRequestHandler)
+            self.server.token = secrets.token_urlsafe(32)
+            self.info = {"url": f"http://127.0.0.1:{self.server.server_address[1]}", "token": self.server.token, "pid": os.getpid()}
+        self.server.target = self.target
+        # Lets `creds` (awsManagerCreds.py) tell a usage-tracking worker from one renewing everything
+        self.info["access"] = bool(getattr(self.target, "tracks_access", False))
+        threading.Thread(target=self.server.serve_forever, name="control-api", daemon=True).start()
+        atomic_write(directory / self.INFO_NAME, json.dumps(self.info).encode("utf-8"))
+        return True
+
+    def describe(self):
+        if "socket" in self.info:
+            return f"curl --unix-socket {self.info['socket']} http://localhost/status"
+        return f"{self.info['url']}/status (token in {state_dir() / self.INFO_NAME})"
+
+    def stop(self):
+        if not self.server:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        for name in (self.INFO_NAME, self.SOCKET_NAME if "socket" in self.info else None):
+            if name:
+                try:
+                    (state_dir() / name).unlink()
+                except OSError:
+                    pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client over a Unix socket"""
+
+    def __init__(self, socket_path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def control_info():
+    """control.json of the running instance (where to connect, whether it tracks access), or None"""
+    try:
+        return json.loads((state_dir() / ControlServer.INFO_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def control_request(method, path, timeout=2.0):
+    """One control API call: (HTTP status, JSON document), or None when no instance is serving it"""
+    info = control_info()
+    if info is None:
+        return None
+    try:
+        if "socket" in info:
+            conn, headers = UnixHTTPConnection(info["socket"], timeout), {}
+        else:
+            address = urlsplit(info["url"])
+            conn, headers = http.client.HTTPConnection(address.hostname, address.port, timeout=timeout), {"Authorization": info["token"]}
+    except (OSError, ValueError, KeyError):
+        return None
+    try:
+        conn.request(method, path, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+
+
+# --- METRICS ---
+
+class Metrics:
+    """Latency histograms + success/failure counters per (operation, account) - thread-safe, in memory"""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self.started = time.time()
+
+    def observe(self, operation, account, seconds, success):
+        with self._lock:
+            series = self._series.get((operation, account))
+            if series is None:
+                series = self._series[(operation, account)] = {
+                    "count": 0, "ok": 0, "error": 0, "sum": 0.0, "max": 0.0, "last": 0.0,
+                    "buckets": [0] * len(self.BUCKETS),
+                }
+            series["count"] += 1
+            series["ok" if success else "error"] += 1
+            series["sum"] += seconds
+            series["max"] = max(series["max"], seconds)
+            series["last"] = seconds
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    series["buckets"][i] += 1
+
+    def snapshot(self):
+        """JSON-friendly copy: {"operation/account": {count, ok, error, avg_ms, max_ms, last_ms}}"""
+        with self._lock:
+            items = [(key, dict(series)) for key, series in self._series.items()]
+        return {
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "series": {
+                f"{operation}/{account}" if account else operation: {
+                    "count": series["count"], "ok": series["ok"], "error": series["error"],
+                    "avg_ms": round(series["sum"] / series["count"] * 1000, 1),
+                    "max_ms": round(series["max"] * 1000, 1),
+                    "last_ms": round(series["last"] * 1000, 1),
+                }
+                for (operation, account), series in sorted(items)
+            },
+        }
+
+    def render_prometheus(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            items = sorted((key, dict(series)) for key, series in self._series.items())
+        lines = [
+            "# HELP awsmanager_operation_seconds Latency of credential operations",
+            "# TYPE awsmanager_operation_seconds histogram",
+        ]
+        for (operation, account), series in items:
+            labels = f'operation="{operation}",account="{account}"'
+            for bound, count in zip(self.BUCKETS, series["buckets"]):
+                lines.append(f'awsmanager_operation_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'awsmanager_operation_seconds_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f"awsmanager_operation_seconds_sum{{{labels}}} {series['sum']:.6f}")
+            lines.append(f"awsmanager_operation_seconds_count{{{labels}}} {series['count']}")
+        lines += [
+            "# HELP awsmanager_operation_total Credential operations by outcome",
+            "# TYPE awsmanager_operation_total counter",
+        ]
+        for (operation, account), series in items:
+            for outcome in ("ok", "error"):
+                lines.append(f'awsmanager_operation_total{{operation="{operation}",account="{account}",outcome="{outcome}"}} {series[outcome]}')
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path=None):
+        path = Path(path) if path else state_dir() / "metrics.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, json.dumps(self.snapshot(), indent=2).encode("utf-8"), fsync=False)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """GET /metrics -> Prometheus text"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class Signal:
+    """Minimal stand-in for pyqtSignal - connected callbacks run on the emitting thread"""
+
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def emit(self, *args):
+        for slot in list(self._slots):
+            slot(*args)
+
+
+class CallbackSignals:
+    """Plain-Python signal sink for headless runs - same attributes as the GUI's WorkerSignals"""
+
+    def __init__(self):
+        self.status_update = Signal()
+        self.progress_update = Signal()
+        self.finished = Signal()
+        self.log_message = Signal()
+        self.metrics_update = Signal()
+        self.breaker_update = Signal()
+        self.default_changed = Signal()
+
+
+class AWSCredentialWorker(threading.Thread):
+    """Background worker for AWS credential management"""
+
+    def __init__(self, default_profile_name, accounts, mfa_code, config, signals=None, npm_token=False, pip_token=False,
+                 executor=None, metrics=None, primary=True):
+        super().__init__()
+        self.identity = config.get('identity_name', '')
+        self.primary = primary  # only the primary identity mirrors [default] and manages package-manager tokens
+        self.default_profile_name = default_profile_name
+        self.accounts = accounts
+        self.mfa_code = mfa_code
+        self.config = config
+        self.signals = signals or CallbackSignals()
+        self.npm_token = npm_token
+        self.pip_token = pip_token
+        self.should_stop = False
+        self.daemon = True
+        self.backend = create_backend(config)
+        self.backend.sts.log = self.log
+        self.uses_cli = isinstance(self.backend, CliBackend)
+        self.store = CredentialStore()
+        self.cache = CredentialCache()
+        self.credentials = {}
+        self.server = None
+        self.control_server = None
+        self.profile_status = {}  # profile -> latest renewal, for the control API
+        self._status_fragments = {}  # profile -> its '"name": {...}' JSON, serialized once per renewal
+        self._status_versions = itertools.count(1)
+        self.status_version = 0
+        self._status_cache = (None, b"")
+        self.executor = executor  # the broker's shared assume-role pool, else one pool per cycle
+        self.limiter = sts_limiter(config)
+        self.metrics = metrics or Metrics()
+        self.metrics_server = None
+        self.scheduler = RenewalScheduler(
+            margin_seconds=config.get('renewal_margin_minutes', 5) * 60,
+            jitter_seconds=config.get('renewal_jitter_seconds', 60),
+            max_sleep_seconds=config.get('max_sleep_seconds', 900),
+        )
+        self.mfa_creds = None
+        self.session_expires = None
+        self.mfa_session = f"{config['source_profile']}-mfa-session"
+        self.usage = None
+        if config.get('renewal_policy', 'all') == 'usage':
+            self.usage = UsageTracker(config.get('usage_warm_hours', 12) * 3600,
+                                      name=f"usage-{self.identity}.json" if self.identity else "usage.json")
+        self.vault = session_vault(config)
+        self.retry = RetryPolicy(config.get('retry_attempts', 3), config.get('retry_base_seconds', 0.5),
+                                 config.get('retry_max_seconds', 8))
+        self.breaker = CircuitBreaker(
+            failures=config.get('breaker_failures', 5),
+            permanent_failures=config.get('breaker_permanent_failures', 2),
+            cooldown_seconds=config.get('breaker_cooldown_minutes', 15) * 60,
+            max_cooldown_seconds=config.get('breaker_max_cooldown_hours', 6) * 3600,
+        )
+        self.codeartifact_cache = CodeArtifactTokenCache()
+        self.resumed = False
+        self.session_rejected = False
+        self._on_demand = {}  # profile -> Event set when its on-demand renewal attempt finishes
+        self._on_demand_lock = threading.Lock()
         
-        if success:
-            self.statusLabel.setText("⚪ Ready")
-            InfoBar.success(
-                title="Completed",
-                content=message,
-                orient=Qt.Horizontal,
-                isClosable=True,
-                position=InfoBarPosition.TOP,
-                duration=3000,
-                parent=self
-            )
+    def log(self, message, **fields):
+        """Log message - queued for the background writer, structured `fields` go to the JSON format"""
+        if self.identity:
+            message = f"[{self.identity}] {message}"
+            fields.setdefault("identity", self.identity)
+        logger.info(message, extra={"fields": fields})
+        self.signals.log_message.emit(f"[{datetime.now():%H:%M:%S}] {message}")
+        
+    def run_aws_command(self, command):
+        """Run AWS CLI (or npm) command"""
+        return run_command(command)
+
+    def limited(self, call):
+        """Make one STS call once the shared rate limiter lets it through"""
+        if self.limiter and not self.limiter.acquire(lambda: self.should_stop):
+            return False, "Stopped while waiting for the STS rate limiter"
+        return call()
+    
+    def assume_role(self, acct, role_name, user, mfa_session):
+        """Assume the target role for one account, retrying throttled / transient failures with backoff.
+        Runs on a pool thread, returns (acct, success, output, seconds, error kind)"""
+        started = time.perf_counter()
+        target_role = f"arn:aws:iam::{acct['id']}:role/{acct.get('role_name') or role_name}"
+
+        def on_retry(attempt, delay, kind, error):
+            self.log(f"{acct['name']}: {kind} error, retry {attempt}/{self.retry.attempts} in {delay:.1f}s - {str(error).strip()}",
+                     operation="retry", profile=acct['name'], account=acct['id'], kind=kind)
+
+        success, output, kind = self.retry.call(
+            lambda: self.limited(lambda: self.backend.assume_role(target_role, user, mfa_session, self.mfa_creds)),
+            on_retry, lambda: self.should_stop)
+        return acct, success, output, time.perf_counter() - started, kind
+
+    def set_profile(self, profile, creds, region, shared=True):
+        """Stage credentials + region for ~/.aws - written by the next commit_profiles().
+        Shared (user-facing) profiles also refresh the credential_process cache; in "process" mode
+        they get a credential_process entry instead of static keys."""
+        if shared:
+            self.credentials[profile] = credential_document(creds)
+            self.cache.put(profile, creds)
+            if not self.config.get('write_credentials_file', True):
+                return
+        process = shared and self.config.get('credential_mode', 'file') == 'process'
+        self.store.stage(profile, creds, region, credential_process_command(profile) if process else None)
+
+    def stage_process_entries(self, accounts):
+        """"process" mode: give every selected profile its credential_process entry up front. A profile that is
+        never renewed (cold under the usage policy, or just added to the inventory) still needs one - otherwise
+        the SDK never runs `creds` for it, nothing is stamped and on-demand renewal can never start."""
+        if self.config.get('credential_mode', 'file') != 'process' or not self.config.get('write_credentials_file', True):
+            return
+        default_region = self.config['default_region']
+        for acct in accounts:
+            self.store.stage(acct['name'], None, acct.get('region') or default_region, credential_process_command(acct['name']))
+        self.commit_profiles()
+
+    def commit_profiles(self):
+        """Flush every staged profile to ~/.aws in one atomic write per file"""
+        started = time.perf_counter()
+        try:
+            count = self.store.commit()
+        except Exception:
+            self.metrics.observe("write_profiles", "", time.perf_counter() - started, False)
+            raise
+        if count:
+            self.metrics.observe("write_profiles", "", time.perf_counter() - started, True)
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.log(f"Committed {count} profiles to ~/.aws in {duration_ms:.0f} ms.",
+                     operation="commit", profiles=count, duration_ms=round(duration_ms, 1), outcome="ok")
+
+    def clear_unchecked_tokens(self):
+        """Remove our CodeArtifact entries for unchecked options - the rest of each config file is kept"""
+        if not self.primary:
+            return
+        enabled = self.token_tools()
+        for tool, configure in PACKAGE_TOOLS.items():
+            if tool in enabled:
+                continue
+            try:
+                if configure(self.config, None):
+                    self.log(f"Removed CodeArtifact token from {tool} config")
+            except Exception as e:
+                self.log(f"Failed to clear {tool} token: {e}")
+
+    def start_credentials_server(self):
+        """Serve the in-memory credentials on a loopback port for containers / long-lived SDK processes"""
+        self.server = LocalCredentialsServer(
+            self.lookup_credentials,
+            host=self.config.get('credentials_server_host', '127.0.0.1'),
+            port=self.config.get('credentials_server_port', 0),
+        )
+        self.server.start()
+        self.log(f"Credentials endpoint: {self.server.url}/creds/<profile> "
+                 f"(token in {state_dir() / 'endpoint.json'})")
+        self.log(f"  export AWS_CONTAINER_CREDENTIALS_FULL_URI={self.server.url}/creds/{self.default_profile_name}")
+
+    def start_metrics_server(self):
+        """Prometheus-style /metrics on a loopback port"""
+        self.metrics_server = ThreadingHTTPServer(("127.0.0.1", int(self.config['metrics_port'])), MetricsRequestHandler)
+        self.metrics_server.daemon_threads = True
+        self.metrics_server.metrics = self.metrics
+        threading.Thread(target=self.metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        self.log(f"Metrics endpoint: http://127.0.0.1:{self.metrics_server.server_address[1]}/metrics")
+
+    def start_control_server(self):
+        """Local control API (status / renew / stop / set-default) - see ControlServer"""
+        server = ControlServer(self, self.config)
+        try:
+            started = server.start()
+        except OSError as e:
+            self.log(f"Control API unavailable: {e}")
+            return
+        if not started:
+            self.log("Control API is already served by another AWS Credential Manager process.")
+            return
+        self.control_server = server
+        self.log(f"Control API: {server.describe()}")
+
+    def note_status(self, profile, **fields):
+        """Record a profile's latest renewal for the control API (profile None: only the worker state changed).
+        One dict assignment on the renewal thread - status readers never take a lock it waits for."""
+        if profile is not None:
+            self.profile_status[profile] = fields
+            self._status_fragments[profile] = json.dumps({profile: fields})[1:-1].encode("utf-8")
+        self.status_version = next(self._status_versions)
+
+    def status_json(self):
+        """Control API status - rebuilt only after a change by splicing the per-profile fragments,
+        so polling it is a cached bytes write and a renewal costs one small json.dumps"""
+        version, body = self._status_cache
+        if version == self.status_version:
+            return body
+        version = self.status_version
+        mfa_expiration = (self.mfa_creds or {}).get("Expiration")
+        head = json.dumps({
+            "identity": self.identity or None,
+            "pid": os.getpid(),
+            "running": self.is_alive() and not self.should_stop,
+            "default_profile": self.default_profile_name,
+            "mfa_session_expires_at": str(mfa_expiration) if mfa_expiration else None,
+        })
+        fragments = self._status_fragments
+        profiles = b",".join(fragments.get(acct['name']) or json.dumps({acct['name']: {"outcome": "pending"}})[1:-1].encode("utf-8")
+                             for acct in list(self.accounts))
+        body = head[:-1].encode("utf-8") + b', "profiles": {' + profiles + b"}}"
+        self._status_cache = (version, body)
+        return body
+
+    def control(self, action, profiles):
+        """Control API actions -> (success, message); they only flag the scheduler, never wait for a renewal"""
+        names = {acct['name'] for acct in self.accounts}
+        unknown = [p for p in profiles if p not in names]
+        if unknown:
+            return False, f"Unknown profile: {', '.join(unknown)}"
+        if action == "renew":
+            self.renew_now(profiles or None)
+            return True, f"Renewing {', '.join(profiles) if profiles else 'all profiles'} now"
+        if action == "stop":
+            self.stop()
+            return True, "Stopping"
+        if action == "access":
+            if self.note_access(profiles):
+                return True, "Renewing on demand"
+            return False, "Not renewed on demand (renewal policy 'all', or already fresh)"
+        if action == "set-default":
+            if len(profiles) != 1:
+                return False, "set-default needs exactly one profile"
+            return self.set_default(profiles[0])
+        return False, f"Unknown action '{action}'"
+
+    def has_fresh_credentials(self, profile):
+        doc = self.credentials.get(profile)
+        return doc is not None and parse_expiration(doc["Expiration"]) > time.time() + 60
+
+    def lookup_credentials(self, profile):
+        """Endpoint lookup - with the usage policy it records the access and renews a cold profile on demand first"""
+        if self.usage is None:
+            return self.credentials.get(profile)
+        self.usage.touch(profile)
+        if not self.has_fresh_credentials(profile) and any(a['name'] == profile for a in self.accounts):
+            self.renew_on_demand(profile)
+        return self.credentials.get(profile) if self.has_fresh_credentials(profile) else None
+
+    def renew_on_demand(self, profile):
+        """Queue a renewal for a profile that was just asked for and wait (bounded) until it has been attempted"""
+        with self._on_demand_lock:
+            event = self._on_demand.setdefault(profile, threading.Event())
+        self.log(f"{profile} requested while cold - renewing on demand.", operation="on_demand", profile=profile)
+        self.scheduler.renew_now([profile])
+        event.wait(self.config.get('on_demand_timeout_seconds', 20))
+
+    def finish_on_demand(self, profile=None):
+        """Release callers waiting on a profile's renewal (all of them when `profile` is None)"""
+        with self._on_demand_lock:
+            events = list(self._on_demand.values()) if profile is None else [self._on_demand.get(profile)]
+            if profile is None:
+                self._on_demand.clear()
+            else:
+                self._on_demand.pop(profile, None)
+        for event in events:
+            if event:
+                event.set()
+
+    def note_access(self, profiles):
+        """Usage policy: `creds` found no fresh credentials and said so over the control API - renew the cold ones
+        now. Cache hits only leave their stamps, which skip_cold() folds in; nothing polls for them.
+        Returns whether a renewal was queued - only then is it worth waiting for the cache file."""
+        if self.usage is None:
+            return False
+        for profile in profiles:
+            self.usage.touch(profile)
+        cold = [p for p in profiles if not self.has_fresh_credentials(p)]
+        if cold:
+            self.log(f"Renewing on demand: {', '.join(cold)}", operation="on_demand", profiles=len(cold))
+            self.scheduler.renew_now(cold)
+        return bool(cold)
+
+    @property
+    def tracks_access(self):
+        """Whether `creds` should stamp accesses and ask for on-demand renewals (published in control.json)"""
+        return self.usage is not None
+
+    def skip_cold(self, accounts):
+        """Usage policy: push cold profiles' renewal back without calling STS, return the warm ones.
+        [default]'s source and the CodeArtifact profile are read as static files, so they always stay warm."""
+        self.usage.scan()
+        now = time.time()
+        always_warm = {self.default_profile_name}
+        if self.token_tools():
+            always_warm.add(self.config['codeartifact_source_profile'])
+        warm, cold = [], []
+        for acct in accounts:
+            (warm if acct['name'] in always_warm or self.usage.is_warm(acct['name'], now) else cold).append(acct)
+        for acct in cold:
+            # Check again when the "all" policy would have renewed it next - each check is one saved call
+            self.scheduler.schedule_at(acct['name'], now + 3600 - self.scheduler.margin_seconds)
+        if cold:
+            self.usage.record_saved(len(cold))
+            self.log(f"Lazy renewal: skipped {len(cold)} unused profiles ({self.usage.saved_today()} STS calls saved today).",
+                     operation="lazy_skip", profiles=len(cold), saved_today=self.usage.saved_today())
+        return warm
+
+    def run(self):
+        """Main worker thread logic - Following PowerShell script flow"""
+        try:
+            if self.usage is not None and self.config.get('write_credentials_file', True) \
+                    and self.config.get('credential_mode', 'file') == 'file':
+                # Static keys in ~/.aws/credentials are read without asking us - nothing to track
+                self.log("Usage-driven renewal needs credential_mode 'process' or write_credentials_file off - renewing all profiles.")
+                self.usage = None
+            if self.config.get('credentials_server'):
+                self.start_credentials_server()
+            if self.config.get('metrics_port'):
+                self.start_metrics_server()
+            if self.config.get('control_api', True):
+                self.start_control_server()
+
+            if self.usage is not None and self.control_server is None and not self.identity:
+                self.log("The control API is not running here - cold profiles wait for their next scheduled check "
+                         "instead of renewing on demand.")
+
+            self.signals.progress_update.emit(True)
+            self.clear_unchecked_tokens()
+            self.stage_process_entries(self.accounts)
+            self.signals.status_update.emit("🔐 Authenticating with MFA...")
+
+            source_profile = self.config['source_profile']
+            default_region = self.config['default_region']
+            token_expiration_seconds = self.config['token_expiration_hours'] * 3600
+
+            profile_names = ", ".join(a['name'] for a in self.accounts)
+            self.log("**********************************************************************************************************")
+            if self.default_profile_name:
+                self.log(f"Default profile: {self.default_profile_name}. Renewing for: {profile_names}")
+            else:
+                self.log(f"Renewing for: {profile_names}")
+            self.log("This script will obtain temporary credentials and store them in your AWS CLI configuration.")
+            self.log(f"The selected profile credentials will also be mirrored into [default] for tools like IntelliJ IDEA.")
+            self.log("**********************************************************************************************************")
+
+            mfa_device = mfa_device_arn(self.config)
+
+            self.log(f"MFA Device: {mfa_device}")
+            self.log(f"STS endpoint: {self.backend.sts.describe()}", operation="sts_endpoint")
+
+            identity = f"{mfa_device}|{source_profile}"  # same key as resumable_session()
+            if self.config.get('resume_mfa_session', True):
+                self.mfa_creds = self.vault.load(identity, self.config.get('resume_min_minutes', 30) * 60)
+            if self.mfa_creds:
+                self.resumed = True
+                self.log(f"Resumed the cached MFA session (valid until {self.mfa_creds['Expiration']}) - skipping get-session-token.",
+                         operation="get_session_token", outcome="resumed")
+            elif not self.mfa_code:
+                self.log("No valid cached MFA session and no MFA code.")
+                self.signals.finished.emit(False, "MFA code required - the cached MFA session has expired")
+                return
+            else:
+                mfa_code = self.mfa_code
+                if isinstance(mfa_code, TOTP):
+                    # Generated here, right before use: never a code about to expire or one already sent
+                    wait = mfa_code.wait_seconds()
+                    if wait:
+                        self.log(f"Waiting {wait:.0f}s for the next MFA window (current code is used or about to expire).")
+                        self.signals.status_update.emit(f"⏳ Waiting {wait:.0f}s for a fresh MFA code...")
+                    mfa_code = mfa_code.fresh_code()
+
+                self.log(f"Running: sts get-session-token ({type(self.backend).__name__})...")
+                started = time.perf_counter()
+                success, output = self.limited(
+                    lambda: self.backend.get_session_token(mfa_device, token_expiration_seconds, mfa_code, source_profile))
+                self.metrics.observe("get_session_token", source_profile, time.perf_counter() - started, success)
+
+                if not success:
+                    self.log(f"MFA authentication failed: {output}")
+                    self.signals.finished.emit(False, f"MFA failed: {output}")
+                    return
+
+                self.mfa_creds = output
+                self.log("Renewed AWS CLI Session with temporary credentials with MFA info...")
+                try:
+                    self.vault.save(identity, self.mfa_creds)
+                except Exception as e:
+                    self.log(f"Could not cache the MFA session: {e}")
+
+            self.signals.status_update.emit("⚙️ Configuring MFA session...")
+
+            if self.uses_cli:
+                # The aws CLI can only pick the session up from a profile; the native backend gets self.mfa_creds
+                self.set_profile(self.mfa_session, self.mfa_creds, default_region, shared=False)
+            else:
+                self.store.remove(self.mfa_session)  # plaintext copy left by an earlier cli-backend run
+            self.commit_profiles()
+
+            try:
+                self.session_expires = parse_expiration(self.mfa_creds["Expiration"])
+            except (KeyError, TypeError, ValueError):
+                self.session_expires = time.time() + token_expiration_seconds
+            self.log(f"Successfully cached token until {datetime.fromtimestamp(self.session_expires):%Y-%m-%d %H:%M} ..")
+
+            self.signals.progress_update.emit(False)
+
+            # First pass renews everything; afterwards each profile comes back when its own credentials near expiry
+            self.scheduler.renew_now([acct['name'] for acct in self.accounts])
+
+            while not self.should_stop:
+                due = self.scheduler.wait_due(self.session_expires)
+                if not due:
+                    break
+
+                accounts = [acct for acct in self.accounts if acct['name'] in due]
+                self.signals.progress_update.emit(True)
+                self.signals.status_update.emit(f"🔄 Renewing {len(accounts)} profiles...")
+                renewed = self.renew_cycle(accounts)
+                self.signals.progress_update.emit(False)
+
+                if self.resumed and renewed == 0 and self.session_rejected:
+                    # Revoked or otherwise unusable - drop it so the next start asks for a fresh MFA code
+                    self.vault.clear()
+                    self.log("The cached MFA session was rejected - start again with a new MFA code.")
+                    self.signals.finished.emit(False, "Cached MFA session rejected - please start again")
+                    return
+                self.resumed = False
+
+                hours_left = max(0, int((self.session_expires - time.time()) // 3600))
+                next_due = self.scheduler.next_due()
+                if next_due is not None:
+                    next_text = datetime.fromtimestamp(min(next_due, self.session_expires)).strftime("%H:%M")
+                    self.signals.status_update.emit(f"✅ Running ({hours_left}h, next {next_text})")
+                    self.log(f"Keep this window open - next renewal at {next_text}, MFA session ends in {hours_left}h.")
+
+            if self.should_stop:
+                self.signals.finished.emit(True, "Stopped by user")
+                self.log("Process stopped by user")
+            else:
+                self.signals.finished.emit(True, "MFA token credentials have expired. Please restart this script.")
+                self.log("MFA token credentials have expired. Please restart this script.")
+
+        except Exception as e:
+            self.log(f"Error: {str(e)}")
+            self.signals.finished.emit(False, f"Error: {str(e)}")
+        finally:
+            self.finish_on_demand()
+            if self.usage is not None:
+                self.usage.save()
+            if self.server:
+                self.server.stop()
+            if self.metrics_server:
+                self.metrics_server.shutdown()
+                self.metrics_server.server_close()
+            if self.control_server:
+                self.control_server.stop()
+            self.note_status(None)
+
+    def renew_cycle(self, accounts):
+        """Assume-role into the given accounts concurrently, write the profiles and refresh CodeArtifact tokens"""
+        user = self.config['user']
+        role_name = self.config['role_name']
+        default_region = self.config['default_region']
+        codeartifact_source_profile = self.config['codeartifact_source_profile']
+
+        DEFAULT_SESSION = "default"
+        CODEARTIFACT_SESSION = "default-codeartifact"
+
+        if self.usage is not None:
+            accounts = self.skip_cold(accounts)
+            if not accounts:
+                self.usage.save()
+                return None
+
+        codeartifact_creds = None
+        codeartifact_acct = None
+        renewal_failed = False
+        renewed = 0
+        call_seconds = 0.0
+        slowest = ("", 0.0)
+        cycle_started = time.perf_counter()
+
+        # Profiles behind an open breaker cost nothing this cycle - they come back for a probe when it half-opens
+        paused = {acct['name'] for acct in accounts if not self.breaker.allow(acct['name'])}
+        for name in paused:
+            self.scheduler.schedule_at(name, self.breaker.retry_at(name))
+        if paused:
+            accounts = [acct for acct in accounts if acct['name'] not in paused]
+
+        # Fire all assume-role calls at once (bounded pool) and handle results as they finish,
+        # so one slow account no longer holds up the rest of the cycle.
+        if self.executor:
+            pool = self.executor
+            self.log(f"Renewing {len(accounts)} profiles (shared pool of {self.config.get('broker_pool_size', 16)})...")
+        else:
+            max_workers = max(1, min(int(self.config.get('renewal_concurrency', 8)), len(accounts)))
+            pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="assume-role")
+            self.log(f"Renewing {len(accounts)} profiles ({max_workers} at a time)...")
+
+        try:
+            futures = [pool.submit(self.assume_role, acct, role_name, user, self.mfa_session) for acct in accounts]
+
+            for future in as_completed(futures):
+                if self.should_stop:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+                acct, success, creds, elapsed, kind = future.result()
+                call_seconds += elapsed
+                target_profile_name = acct['name']
+                self.metrics.observe("assume_role", target_profile_name, elapsed, success)
+                if elapsed > slowest[1]:
+                    slowest = (target_profile_name, elapsed)
+
+                if not success:
+                    self.log(f"Failed to assume role for {target_profile_name} (Account: {acct['id']}) after {elapsed:.2f}s ({kind}): {creds}",
+                             operation="assume_role", profile=target_profile_name, account=acct['id'],
+                             duration_ms=round(elapsed * 1000, 1), outcome="error", kind=kind)
+                    renewal_failed = True
+                    if any(code in str(creds) for code in SESSION_REJECTED_CODES):
+                        self.session_rejected = True
+                    reason = (str(creds).strip().splitlines() or [""])[-1][:200]
+                    paused_until = None
+                    if self.breaker.record_failure(target_profile_name, kind, reason):
+                        retry_at = paused_until = self.breaker.retry_at(target_profile_name)
+                        self.log(f"⚡ {target_profile_name} paused until {datetime.fromtimestamp(retry_at):%H:%M} after repeated {kind} failures.",
+                                 operation="breaker", profile=target_profile_name, state="open", kind=kind)
+                        self.scheduler.schedule_at(target_profile_name, retry_at)
+                    else:
+                        retry_at = time.time() + self.config.get('retry_failed_seconds', 60)
+                        self.scheduler.schedule_at(target_profile_name, retry_at)
+                    self.note_status(target_profile_name, **{k: v for k, v in (self.profile_status.get(target_profile_name) or {}).items()
+                                                             if k in ("expires_at", "renewed_at", "latency_ms")},
+                                     outcome="error", kind=kind, error=reason, failed_at=iso_utc(time.time()),
+                                     next_renewal=iso_utc(retry_at), paused_until=paused_until and iso_utc(paused_until))
+                    self.finish_on_demand(target_profile_name)
+                    continue
+
+                if self.breaker.record_success(target_profile_name):
+                    self.log(f"{target_profile_name} recovered - breaker closed.",
+                             operation="breaker", profile=target_profile_name, state="closed")
+
+                region = acct.get('region') or default_region
+                self.set_profile(target_profile_name, creds, region)
+                self.finish_on_demand(target_profile_name)
+                renewed += 1
+                try:
+                    next_renewal = self.scheduler.schedule_expiry(target_profile_name, parse_expiration(creds["Expiration"]))
+                except (KeyError, TypeError, ValueError):
+                    next_renewal = time.time() + 59 * 60
+                    self.scheduler.schedule_at(target_profile_name, next_renewal)
+                self.note_status(target_profile_name, outcome="ok", expires_at=str(creds.get("Expiration")),
+                                 renewed_at=iso_utc(time.time()), latency_ms=round(elapsed * 1000, 1),
+                                 next_renewal=iso_utc(next_renewal))
+                self.log(f"{target_profile_name} profile renewed ({elapsed:.2f}s).",
+                         operation="assume_role", profile=target_profile_name, account=acct['id'],
+                         duration_ms=round(elapsed * 1000, 1), outcome="ok")
+
+                # If this is the user-selected default profile, mirror credentials into [default]
+                if target_profile_name == self.default_profile_name:
+                    self.set_profile(DEFAULT_SESSION, creds, region)
+                    self.log(f"Mirrored {target_profile_name} credentials into [{DEFAULT_SESSION}] profile.")
+
+                if target_profile_name == codeartifact_source_profile:
+                    codeartifact_creds = creds
+                    codeartifact_acct = acct
+                    if self.token_tools():
+                        self.set_profile(CODEARTIFACT_SESSION, creds, default_region, shared=False)
+        finally:
+            if pool is not self.executor:
+                pool.shutdown(wait=True)
+
+        # One batched write for the whole cycle (the CLI backend reads these profiles back)
+        self.commit_profiles()
+
+        cycle_seconds = time.perf_counter() - cycle_started
+        self.log(f"Renewed {renewed}/{len(accounts)} profiles in {cycle_seconds:.2f}s "
+                 f"(sum of per-account calls: {call_seconds:.2f}s).",
+                 operation="cycle", profiles=len(accounts), renewed=renewed,
+                 duration_ms=round(cycle_seconds * 1000, 1), outcome="ok" if not renewal_failed else "partial")
+
+        # Use the dev-test-perf credentials for CodeArtifact (npm/pip) if requested - one cached token serves both
+        if self.token_tools() and codeartifact_creds and not self.should_stop:
+            try:
+                token = self.codeartifact_token(codeartifact_acct, CODEARTIFACT_SESSION, codeartifact_creds)
+                if token:
+                    self.apply_codeartifact_token(token)
+            except Exception as e:
+                self.log(f"Error generating CodeArtifact token: {e}")
+        elif self.token_tools() and any(a['name'] == codeartifact_source_profile for a in accounts):
+            self.log(f"Skipping CodeArtifact: {codeartifact_source_profile} credentials not available.")
+
+        if renewal_failed:
+            self.log("One or more profiles failed to renew - they will be retried shortly.")
+
+        summary = f"{renewed}/{len(accounts)} ok · {cycle_seconds:.1f}s"
+        if slowest[0]:
+            summary += f" · slowest {slowest[0]} {slowest[1]:.2f}s"
+        open_breakers = self.breaker.open_profiles()
+        if open_breakers:
+            summary += f" · {len(open_breakers)} paused"
+        self.signals.breaker_update.emit(self.breaker_summary(open_breakers))
+        if self.usage is not None:
+            summary += f" · {self.usage.saved_today()} STS calls saved today"
+            self.usage.save()
+        self.signals.metrics_update.emit(summary)
+        if self.config.get('metrics_snapshot', True):
+            try:
+                self.metrics.write_snapshot()
+            except OSError as e:
+                self.log(f"Failed to write metrics snapshot: {e}")
+        return renewed
+
+    def breaker_summary(self, open_breakers):
+        """One line per paused profile for the UI - empty when every breaker is closed"""
+        return "\n".join(f"⚡ {profile} paused until {datetime.fromtimestamp(retry_at):%H:%M} - {reason}"
+                         for profile, (retry_at, reason) in sorted(open_breakers.items()))
+
+    def codeartifact_token(self, acct, profile, creds):
+        """The cached CodeArtifact token - fetched only when missing, close to expiring or issued for another identity"""
+        source = "|".join((acct['id'], acct.get('role_name') or self.config['role_name'], self.config['codeartifact_domain'],
+                           self.config['codeartifact_domain_owner'], self.config['codeartifact_region']))
+        margin = self.config.get('codeartifact_refresh_minutes', 75) * 60
+        token = self.codeartifact_cache.get(source, margin)
+        if token:
+            return token
+
+        started = time.perf_counter()
+        success, result, _ = self.retry.call(lambda: self.backend.get_authorization_token(profile, creds),
+                                             should_stop=lambda: self.should_stop)
+        self.metrics.observe("codeartifact_token", acct['name'], time.perf_counter() - started, success)
+        if not success:
+            self.log(f"Failed to get CodeArtifact token: {result}")
+            return None
+        self.codeartifact_cache.put(source, result["token"], result["expiration"])
+        self.log(f"Generated CodeArtifact Token using {acct['name']} credentials "
+                 f"(valid until {datetime.fromtimestamp(result['expiration']):%H:%M}).")
+        return result["token"]
+
+    def token_tools(self):
+        """Package managers to configure: npm / pip from the UI options plus CONFIG['codeartifact_extra_tools']"""
+        if not self.primary:
+            return []
+        tools = (["npm"] if self.npm_token else []) + (["pip"] if self.pip_token else [])
+        return tools + [t for t in self.config.get('codeartifact_extra_tools', []) if t in PACKAGE_TOOLS and t not in tools]
+
+    def apply_codeartifact_token(self, token):
+        """Write `token` into each tool's config file - files already holding it are left untouched"""
+        for tool in self.token_tools():
+            started = time.perf_counter()
+            try:
+                changed = PACKAGE_TOOLS[tool](self.config, token)
+            except Exception as e:
+                self.metrics.observe("package_config", tool, time.perf_counter() - started, False)
+                self.log(f"Failed to configure {tool} for CodeArtifact: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            self.metrics.observe("package_config", tool, elapsed, True)
+            if changed:
+                self.log(f"Updated {tool} with CodeArtifact Token ({elapsed * 1000:.1f} ms).",
+                         operation="package_config", tool=tool, duration_ms=round(elapsed * 1000, 2), outcome="ok")
+
+    def renew_now(self, profiles=None):
+        """Renew the given profiles (default: all) immediately instead of waiting for their expiry"""
+        self.scheduler.renew_now(profiles)
+
+    def set_default(self, profile):
+        """Mirror another profile into [default] from now on - renewed right away so [default] switches at once"""
+        if not any(acct['name'] == profile for acct in self.accounts):
+            return False, f"Unknown profile '{profile}'"
+        self.default_profile_name = profile
+        self.note_status(None)
+        self.signals.default_changed.emit(profile)  # the window's picker follows a switch made over the control API
+        self.log(f"Default profile switched to {profile}.", operation="set_default", profile=profile)
+        self.scheduler.renew_now([profile])
+        return True, f"Default profile: {profile}"
+
+    def apply_inventory(self, accounts):
+        """Swap in a new account list without a restart or new MFA prompt - only the differences are applied:
+        added/changed profiles are renewed now, removed ones are unscheduled and deleted from ~/.aws"""
+        old = {acct['name']: acct for acct in self.accounts}
+        new = {acct['name']: acct for acct in accounts}
+        added = [name for name in new if name not in old]
+        removed = [name for name in old if name not in new]
+        changed = [name for name in new if name in old and new[name] != old[name]]
+        if not (added or removed or changed):
+            return
+        self.accounts = list(accounts)
+        self.note_status(None)
+
+        for name in removed:
+            self.scheduler.remove(name)
+            self.breaker.remove(name)
+            self.credentials.pop(name, None)
+            self.cache.remove(name)
+            if self.config.get('write_credentials_file', True):
+                self.store.remove(name)
+        if removed:
+            self.commit_profiles()
+        if self.default_profile_name in removed:
+            self.log(f"Default profile {self.default_profile_name} left the inventory - [default] is no longer renewed.")
+        if added or changed:
+            self.stage_process_entries([new[name] for name in added + changed])
+            self.scheduler.renew_now(added + changed)
+
+        self.log(f"Inventory applied: +{len(added)} -{len(removed)} ~{len(changed)} profiles ({len(accounts)} total).",
+                 operation="inventory", added=len(added), removed=len(removed), changed=len(changed))
+
+    def stop(self):
+        """Stop the worker thread"""
+        self.should_stop = True
+        self.note_status(None)
+        self.scheduler.stop()
+        self.finish_on_demand()
+
+
+# --- LOG QUERY ---
+# LOG_RECORD_RE (record headers) is defined with the log handlers - RotatingLogHandler reads it too.
+
+LOG_NEXT_RECORD_RE = re.compile(rb'\n(?=\[\d{4}-\d\d-\d\d[ T]|\{"ts": ")')
+# Plain substrings, not a regex: bytes.find runs them at memory speed, an alternation regex crawls
+LOG_ERROR_MARKERS = tuple(m.encode("utf-8") for m in ("❌", "⚠", "Error", "error", "ERROR", "Failed", "failed", "Traceback",
+                                                       "Exception", '"level": "WARNING"', '"level": "CRITICAL"'))
+
+
+def log_time_key(value, end=False, now=None):
+    """--since / --until value -> sortable "YYYY-MM-DD HH:MM:SS" key.
+    Accepts "2026-10-17 03:00[:00]", "2026-10-17" (whole day), "03:00" (today) and "90s" / "30m" / "2h" / "1d" ago."""
+    now = now or datetime.now()
+    value = value.strip()
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value)
+    if match:
+        seconds = float(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+        return datetime.fromtimestamp(now.timestamp() - seconds).strftime("%Y-%m-%d %H:%M:%S")
+    if re.fullmatch(r"\d\d?:\d\d(:\d\d)?", value):
+        value = f"{now:%Y-%m-%d} {value}"
+    if re.fullmatch(r"\d{4}-\d\d-\d\d", value):
+        value += " 23:59:59" if end else " 00:00:00"
+    try:
+        stamp = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Cannot read time '{value}' - use 2026-10-17 03:00, 03:00 or 2h") from None
+    return stamp.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def log_history(path, backup_count):
+    """The log file and its rotated backups that exist, oldest first (.N .. .1, then the live file)"""
+    path = Path(path)
+    files = [Path(f"{path}.{n}") for n in range(backup_count, 0, -1)] + [path]
+    return [f for f in files if f.exists()]
+
+
+def log_record_key(mm, pos):
+    """Sortable timestamp of the record starting at pos, None for a continuation line (traceback...)"""
+    match = LOG_RECORD_RE.match(mm, pos)
+    return match and f"{match.group(1).decode()} {match.group(2).decode()}"
+
+
+def log_record_starts(mm, needles, start, end, whole_word=False):
+    """Sorted start offsets of the records in mm[start:end] containing any of the needles (bytes)"""
+    starts = set()
+    for needle in needles:
+        pos = mm.find(needle, start, end)
+        while pos >= 0:
+            hit, pos = pos, mm.find(needle, pos + 1, end)
+            if whole_word and (re.match(rb"[\w-]", mm[hit - 1:hit] if hit else b"") or
+                               re.match(rb"[\w-]", mm[hit + len(needle):hit + len(needle) + 1])):
+                continue
+            line = mm.rfind(b"\n", start, hit) + 1
+            while line > start and not LOG_RECORD_RE.match(mm, line):
+                line = max(start, mm.rfind(b"\n", start, line - 1) + 1)
+            starts.add(line)
+    return sorted(starts)
+
+
+class LogIndex:
+    """Sidecar index (aws_manager.log.idx) of a log and its rotated backups: a timestamp -> byte offset entry
+    per `block` bytes, plus the offsets of error records. Entries are keyed by inode, so rotation (a rename)
+    keeps them valid, and the live file is only indexed from where the previous query stopped."""
+
+    VERSION = 1
+
+    def __init__(self, path, block=64 * 1024):
+        self.path = Path(path)
+        self.sidecar = Path(f"{path}.idx")
+        self.block = block
+        self.files = {}
+        self.dirty = False
+        try:
+            doc = json.loads(self.sidecar.read_text(encoding="utf-8"))
+            if doc.get("version") == self.VERSION and doc.get("block") == block:
+                self.files = doc["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def entry(self, ident, mm, size):
+        """Index entry of one mapped file: {"head", "size", "last", "entries": [[key, offset], ...], "errors": [offset, ...]}"""
+        head = mm[:min(size, 256)].hex()
+        cached = self.files.get(ident)
+        if cached and cached["head"] == head and cached["size"] == size:
+            return cached
+        entries, errors, start = [], [], 0
+        if cached and cached["head"] == head and cached["size"] < size:
+            # Same file, appended to since - keep what was indexed and continue from its last block
+            start = max(0, cached["size"] - self.block) // self.block * self.block
+            entries = [e for e in cached["entries"] if e[1] < start]
+            errors = [offset for offset in cached["errors"] if offset < start]
+
+        offset = start
+        while offset < size:
+            match = LOG_RECORD_RE.search(mm, offset)
+            if not match:
+                break
+            key = f"{match.group(1).decode()} {match.group(2).decode()}"
+            if not entries or key >= entries[-1][0]:
+                entries.append([key, match.start()])
+            offset = max(match.start() + 1, (match.start() // self.block + 1) * self.block)
+        new_errors = log_record_starts(mm, LOG_ERROR_MARKERS, start, size)
+        errors += [offset for offset in new_errors if not errors or offset > errors[-1]]
+
+        last = None
+        for last in LOG_RECORD_RE.finditer(mm, max(0, size - self.block)):
+            pass
+        last_key = f"{last.group(1).decode()} {last.group(2).decode()}" if last else (entries[-1][0] if entries else None)
+        self.files[ident] = {"head": head, "size": size, "last": last_key, "entries": entries, "errors": errors}
+        self.dirty = True
+        return self.files[ident]
+
+    def save(self, keep):
+        """Write the sidecar if anything changed, dropping files that rotated out of the history"""
+        for ident in set(self.files) - set(keep):
+            del self.files[ident]
+            self.dirty = True
+        if self.dirty:
+            doc = {"version": self.VERSION, "block": self.block, "files": self.files}
+            try:
+                atomic_write(self.sidecar, json.dumps(doc, separators=(",", ":")).encode("utf-8"), mode=0o644, fsync=False)
+            except OSError as e:
+                debug_log(f"LogIndex: cannot save {self.sidecar}: {e}")
+            self.dirty = False
+
+
+class LogQuery:
+    """Time range / profile / error filters over a log and its rotated backups, without reading whole files:
+    the files are memory-mapped, the index turns a time range into a byte range and lists the error records,
+    and profile names are found with bytes.find over the mapping - only candidate records are copied out."""
+
+    def __init__(self, since=None, until=None, names=(), errors=False):
+        self.since = since
+        self.until = until
+        self.errors = errors
+        self.names = [n.encode("utf-8") for n in names]
+        self.names_re = re.compile(b"|".join(rb"(?<![\w-])" + re.escape(n) + rb"(?![\w-])" for n in self.names)) if names else None
+        self.stats = {"files": 0, "files_skipped": 0, "bytes_mapped": 0, "bytes_scanned": 0, "records": 0}
+
+    def byte_range(self, entry, size):
+        """[start, end) of the file that can hold records inside since..until"""
+        keys = [key for key, _ in entry["entries"]]
+        start, end = 0, size
+        if self.since and keys:
+            i = bisect.bisect_left(keys, self.since)
+            start = entry["entries"][i - 1][1] if i > 0 else 0
+        if self.until and keys:
+            j = bisect.bisect_right(keys, self.until)
+            end = entry["entries"][j][1] if j < len(keys) else size
+        return start, end
+
+    def wanted(self, key, record):
+        if key is None or (self.since and key < self.since) or (self.until and key > self.until):
+            return False
+        if self.errors and not any(m in record for m in LOG_ERROR_MARKERS):
+            return False
+        return not self.names_re or bool(self.names_re.search(record))
+
+    def scan(self, mm, entry, start, end):
+        """(key, record bytes) of every matching record in mm[start:end]"""
+        if self.errors:
+            errors = entry["errors"]
+            starts = errors[bisect.bisect_left(errors, start):bisect.bisect_left(errors, end)]
+        elif self.names:
+            self.stats["bytes_scanned"] += end - start
+            starts = log_record_starts(mm, self.names, start, end, whole_word=True)
         else:
-            self.statusLabel.setText("❌ Error")
-            InfoBar.error(
-                title="Failed",
-                content=message,
-                orient=Qt.Horizontal,
-                isClosable=True,
-                position=InfoBarPosition.TOP,
-                duration=5000,
-                parent=self
+            self.stats["bytes_scanned"] += end - start
+            starts = None  # every record in the range, in order
+
+        pos = start
+        for rec_start in (starts if starts is not None else itertools.repeat(None)):
+            rec_start = pos if rec_start is None else rec_start
+            if rec_start >= end:
+                return
+            following = LOG_NEXT_RECORD_RE.search(mm, rec_start, end)
+            pos = following.start() + 1 if following else end
+            key = log_record_key(mm, rec_start)
+            if starts is None and self.until and key and key > self.until:
+                return
+            record = mm[rec_start:pos]
+            if self.wanted(key, record):
+                self.stats["records"] += 1
+                yield key, record if record.endswith(b"\n") else record + b"\n"
+
+    def run(self, path, backup_count):
+        """Matching records of one log history, oldest first"""
+        index = LogIndex(path)
+        keep = []
+        try:
+            for file in log_history(path, backup_count):
+                st = file.stat()
+                if not st.st_size:
+                    continue
+                with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    size = len(mm)
+                    keep.append(str(st.st_ino))
+                    entry = index.entry(keep[-1], mm, size)
+                    first = entry["entries"][0][0] if entry["entries"] else None
+                    if (self.since and entry["last"] and entry["last"] < self.since) or (self.until and first and first > self.until):
+                        self.stats["files_skipped"] += 1
+                        continue
+                    self.stats["files"] += 1
+                    self.stats["bytes_mapped"] += size
+                    yield from self.scan(mm, entry, *self.byte_range(entry, size))
+        finally:
+            index.save(keep)
+
+
+# --- IDENTITY BROKER ---
+
+def identity_config(config, name, settings, primary):
+    """CONFIG for one broker identity: its settings on top. Process-wide services (metrics port and snapshot,
+    package-manager tokens) stay with the primary identity; the broker serves the credentials endpoint and the
+    control API itself."""
+    merged = dict(config, **settings, identity_name=name, credentials_server=False, control_api=False)
+    if not primary:
+        merged.update(metrics_port=None, metrics_snapshot=False)
+    return merged
+
+
+class IdentityBroker:
+    """Runs one AWSCredentialWorker per identity (IAM user + MFA device + source profile + accounts) in one process.
+
+    Each identity keeps its own MFA session, scheduler and breakers. They share one bounded assume-role pool, the
+    process-wide STS token bucket (so together they stay under STS throttling), the metrics and one credentials
+    endpoint. Identities are dicts: {"name", "settings": CONFIG overrides, "accounts", "mfa_code", "default_profile"};
+    the first one is the primary."""
+
+    def __init__(self, identities, config, signals=None, npm_token=False, pip_token=False):
+        self.config = config
+        self.signals = signals or CallbackSignals()
+        self.pool = ThreadPoolExecutor(max_workers=int(config.get('broker_pool_size', 16)), thread_name_prefix="assume-role")
+        self.metrics = Metrics()
+        self.limiter = sts_limiter(config)
+        self.server = None
+        self.control_server = None
+        self.workers = []
+        self.state = {}  # identity -> {"status", "last_cycle", "finished", "success", "message"}
+        self._lock = threading.Lock()
+
+        owners = {}
+        for index, identity in enumerate(identities):
+            name = identity["name"]
+            if name in self.state:
+                raise ValueError(f"duplicate identity name: {name}")
+            for acct in identity["accounts"]:
+                if acct['name'] in owners:
+                    raise ValueError(f"profile {acct['name']} belongs to both {owners[acct['name']]} and {name}")
+                owners[acct['name']] = name
+            primary = index == 0
+            worker = AWSCredentialWorker(
+                identity.get("default_profile") if primary else None, identity["accounts"], identity.get("mfa_code"),
+                identity_config(config, name, identity.get("settings", {}), primary), self.forward(name),
+                npm_token=primary and npm_token, pip_token=primary and pip_token,
+                executor=self.pool, metrics=self.metrics, primary=primary,
             )
-    
-    def closeEvent(self, event):
-        """Handle window close - minimize to tray"""
-        if not self.shouldReallyClose:
-            event.ignore()
-            self.hide()
-            self.trayIcon.show()
-            self.trayIcon.showMessage(
-                "AWS Credential Manager",
-                "Application minimized to system tray",
-                QSystemTrayIcon.Information,
-                2000
+            self.workers.append(worker)
+            self.state[name] = {"status": "starting", "last_cycle": "", "finished": False, "success": None, "message": ""}
+
+    def forward(self, name):
+        """Signals for one worker - logs pass through (already prefixed), the rest feeds the per-identity status"""
+        signals = CallbackSignals()
+        signals.log_message.connect(self.signals.log_message.emit)
+        signals.status_update.connect(lambda text: self.update(name, status=text))
+        signals.metrics_update.connect(lambda text: self.cycle_done(name, text))
+        signals.breaker_update.connect(lambda text: self.signals.breaker_update.emit(
+            "\n".join(f"[{name}] {line}" for line in text.splitlines())))
+        signals.finished.connect(lambda success, message: self.worker_finished(name, success, message))
+        return signals
+
+    def update(self, name, **fields):
+        with self._lock:
+            self.state[name].update(fields)
+        self.signals.status_update.emit(self.status_line())
+
+    def cycle_done(self, name, summary):
+        self.update(name, last_cycle=summary)
+        self.signals.metrics_update.emit(f"[{name}] {summary}")
+
+    def worker_finished(self, name, success, message):
+        self.update(name, finished=True, success=success, message=message, status="✅ stopped" if success else "❌ failed")
+        with self._lock:
+            states = list(self.state.values())
+        if all(state["finished"] for state in states):
+            failed = [n for n, state in self.state.items() if not state["success"]]
+            self.signals.finished.emit(not failed, f"Failed: {', '.join(failed)}" if failed else message)
+
+    def lookup_credentials(self, profile):
+        """Endpoint lookup, answered by the identity that owns the profile"""
+        for worker in self.workers:
+            if profile in worker.credentials or any(acct['name'] == profile for acct in worker.accounts):
+                return worker.lookup_credentials(profile)
+        return None
+
+    def status(self):
+        """Per identity: state, profiles, renewals / errors so far, throughput and paused profiles"""
+        series = self.metrics.snapshot()["series"]
+        minutes = max(time.time() - self.metrics.started, 1) / 60
+        rows = []
+        for worker in self.workers:
+            with self._lock:
+                state = dict(self.state[worker.identity])
+            calls = [series[key] for key in (f"assume_role/{acct['name']}" for acct in worker.accounts) if key in series]
+            ok = sum(call["ok"] for call in calls)
+            count = sum(call["count"] for call in calls)
+            rows.append({
+                "identity": worker.identity,
+                "status": state["status"],
+                "profiles": len(worker.accounts),
+                "renewed": ok,
+                "errors": sum(call["error"] for call in calls),
+                "renewals_per_minute": round(ok / minutes, 1),
+                "avg_ms": round(sum(call["avg_ms"] * call["count"] for call in calls) / count, 1) if count else None,
+                "paused": len(worker.breaker.open_profiles()),
+                "last_cycle": state["last_cycle"],
+            })
+        return rows
+
+    @property
+    def tracks_access(self):
+        return any(worker.tracks_access for worker in self.workers)
+
+    def status_json(self):
+        """Control API status - the workers' cached documents spliced together, nothing is re-serialized"""
+        parts = b",".join(json.dumps(worker.identity).encode("utf-8") + b":" + worker.status_json() for worker in self.workers)
+        return b'{"pid":' + str(os.getpid()).encode() + b',"identities":{' + parts + b"}}"
+
+    def control(self, action, profiles):
+        """Control API actions, routed to the identity that owns each profile"""
+        if action == "stop":
+            self.stop()
+            return True, "Stopping all identities"
+        owners = {acct['name']: worker for worker in self.workers for acct in worker.accounts}
+        unknown = [p for p in profiles if p not in owners]
+        if unknown:
+            return False, f"Unknown profile: {', '.join(unknown)}"
+        if action == "set-default":
+            if len(profiles) != 1 or owners[profiles[0]] is not self.workers[0]:
+                return False, f"set-default needs one profile of the primary identity ({self.workers[0].identity})"
+            return self.workers[0].set_default(profiles[0])
+        if action == "access":
+            queued = [worker.note_access([p for p in profiles if owners[p] is worker]) for worker in self.workers]
+            if any(queued):
+                return True, "Renewing on demand"
+            return False, "Not renewed on demand (renewal policy 'all', or already fresh)"
+        if action == "renew":
+            for worker in self.workers:
+                mine = [p for p in profiles if owners[p] is worker]
+                if mine or not profiles:
+                    worker.renew_now(mine or None)
+            return True, f"Renewing {', '.join(profiles) if profiles else 'all profiles'} now"
+        return False, f"Unknown action '{action}'"
+
+    def status_line(self):
+        """e.g. "prod: ✅ Running (35h, next 14:05) 12/min · nonprod: 🔄 Renewing 40 profiles... 80/min" """
+        line = " · ".join(f"{row['identity']}: {row['status']} {row['renewals_per_minute']:g}/min"
+                          + (f" ({row['paused']} paused)" if row['paused'] else "") for row in self.status())
+        if self.limiter and self.limiter.waited_seconds >= 0.1:
+            line += f" · rate limit held calls for {self.limiter.waited_seconds:.1f}s"
+        return line
+
+    def start(self):
+        if self.config.get('credentials_server'):
+            self.server = LocalCredentialsServer(
+                self.lookup_credentials,
+                host=self.config.get('credentials_server_host', '127.0.0.1'),
+                port=self.config.get('credentials_server_port', 0),
             )
-        else:
-            if self.worker:
-                self.worker.stop()
-            self.trayIcon.hide()
-            event.accept()
-    
-    def reallyClose(self):
-        """Actually close the application"""
-        self.shouldReallyClose = True
-        self.close()
+            self.server.start()
+            self.signals.log_message.emit(f"Credentials endpoint for all identities: {self.server.url}/creds/<profile> "
+                                          f"(token in {state_dir() / 'endpoint.json'})")
+        if self.config.get('control_api', True):
+            server = ControlServer(self, self.config)
+            try:
+                if server.start():
+                    self.control_server = server
+                    self.signals.log_message.emit(f"Control API for all identities: {server.describe()}")
+            except OSError as e:
+                self.signals.log_message.emit(f"Control API unavailable: {e}")
+        for worker in self.workers:
+            worker.start()
 
+    def is_alive(self):
+        return any(worker.is_alive() for worker in self.workers)
 
-def main():
-    """Main entry point"""
-    
-    # Enable high DPI scaling
-    QApplication.setHighDpiScaleFactorRoundingPolicy(
-        Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
-    QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
-    QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
-    
-    app = QApplication(sys.argv)
-    app.setApplicationName("awsCredentialsManager")
-    
-    window = AWSManagerWindow()
-    window.show()
-    
-    sys.exit(app.exec_())
+    def join(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self.workers:
+            worker.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        if not self.is_alive():
+            self.close()
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def close(self):
+        if self.server:
+            self.server.stop()
+            self.server = None
+        if self.control_server:
+            self.control_server.stop()
+            self.control_server = None
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def daemon_mfa_code(config, totp_env, mfa_code="", label=""):
+    """The MFA input for one identity: None when its cached session resumes, else `mfa_code`, a TOTP from the
+    `totp_env` secret or a prompt. Raises ValueError when there is none."""
+    prefix = f"[{label}] " if label else ""
+    if mfa_code:
+        return mfa_code
+    if resumable_session(config):
+        print(f"{prefix}Resuming the cached MFA session - no MFA code needed")
+        return None
+    secret = os.environ.get(totp_env, "")
+    if secret:
+        try:
+            return totp_from_config(secret, config)
+        except ValueError as e:
+            raise ValueError(f"Invalid TOTP secret in {totp_env}: {e}")
+    if sys.stdin.isatty():
+        code = input(f"{prefix}MFA code: ").strip()
+        if code:
+            return code
+    raise ValueError(f"No MFA code{' for ' + label if label else ''}: set {totp_env} or pass --mfa-code")
+
+
+def run_daemon(argv):
+    """Headless renewer - runs AWSCredentialWorker in the foreground without loading Qt"""
+    # The inventory's settings override CONFIG, so load it before the defaults below are read
+    pre = argparse.ArgumentParser(add_help=False)
+    pre.add_argument("--inventory", default="")
+    inventory_file = pre.parse_known_args(argv)[0].inventory
+    if inventory_file:
+        CONFIG["inventory_path"] = inventory_file
+    try:
+        inventory = Inventory.load(CONFIG)
+    except Exception as e:
+        print(f"Cannot load inventory: {e}", file=sys.stderr)
+        return 2
+    CONFIG.update(inventory.settings)
+
+    parser = argparse.ArgumentParser(prog="awsManager.py daemon", description="Renew AWS credentials without the GUI")
+    parser.add_argument("--inventory", default="", help="YAML/JSON/INI accounts file (reloaded on change)")
+    parser.add_argument("--accounts", default="", help="comma-separated profile names (default: all)")
+    parser.add_argument("--tags", default="", help="comma-separated tags - only profiles carrying all of them")
+    parser.add_argument("--default", dest="default_profile", default="", help="profile mirrored into [default]")
+    parser.add_argument("--totp-env", default="awsSecretHere", help="environment variable holding the MFA secret")
+    parser.add_argument("--mfa-code", default="", help="one-time MFA code (instead of --totp-env)")
+    parser.add_argument("--identity", default="", help="with CONFIG['identities']: comma-separated identities to run (default: all)")
+    parser.add_argument("--backend", choices=["native", "cli"], default=CONFIG.get("credential_backend", "native"))
+    parser.add_argument("--credential-mode", choices=["file", "process"], default=CONFIG.get("credential_mode", "file"),
+                        help="'process' writes credential_process entries instead of static keys")
+    parser.add_argument("--serve-credentials", action="store_true",
+                        help="serve AWS_CONTAINER_CREDENTIALS_FULL_URI on a loopback port")
+    parser.add_argument("--port", type=int, default=CONFIG.get("credentials_server_port", 0))
+    parser.add_argument("--no-credentials-file", action="store_true",
+                        help="don't write account keys to ~/.aws/credentials (use creds / the endpoint instead)")
+    parser.add_argument("--metrics-port", type=int, default=CONFIG.get("metrics_port"),
+                        help="serve Prometheus text on http://127.0.0.1:<port>/metrics")
+    parser.add_argument("--renewal-policy", choices=["all", "usage"], default=CONFIG.get("renewal_policy", "all"),
+                        help="'usage' keeps only recently used profiles warm and renews the rest on demand")
+    parser.add_argument("--log-format", choices=["text", "json"], default=CONFIG.get("log_format", "text"))
+    parser.add_argument("--npm", action="store_true", help="configure npm with a CodeArtifact token")
+    parser.add_argument("--pip", action="store_true", help="configure pip with a CodeArtifact token")
+    args = parser.parse_args(argv)
+    CONFIG["log_format"] = args.log_format
+    setup_logging(CONFIG)
+    log_startup()
+
+    signals = CallbackSignals()
+    signals.log_message.connect(print)
+    signals.metrics_update.connect(lambda summary: print(f"[cycle] {summary}"))
+    signals.breaker_update.connect(lambda text: text and print(text))
+    result = {"success": False}
+    signals.finished.connect(lambda success, message: result.update(success=success))
+
+    config = dict(
+        CONFIG,
+        credential_backend=args.backend,
+        credential_mode=args.credential_mode,
+        credentials_server=args.serve_credentials or CONFIG.get("credentials_server", False),
+        credentials_server_port=args.port,
+        write_credentials_file=CONFIG.get("write_credentials_file", True) and not args.no_credentials_file,
+        metrics_port=args.metrics_port,
+        renewal_policy=args.renewal_policy,
+    )
+    if config.get("identities"):
+        return run_identities(args, config, signals, result)
+
+    wanted = split_list(args.accounts)
+    tags = split_list(args.tags)
+    accounts = inventory.select(wanted, tags)
+    unknown = set(wanted) - set(inventory.by_name)
+    if unknown or not accounts:
+        print(f"Unknown or no accounts: {', '.join(sorted(unknown)) or args.accounts}", file=sys.stderr)
+        return 2
+    default_profile = args.default_profile or accounts[0]['name']
+
+    try:
+        mfa_code = daemon_mfa_code(CONFIG, args.totp_env, args.mfa_code)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    worker = AWSCredentialWorker(
+        default_profile, accounts, mfa_code, config, signals,
+        npm_token=args.npm, pip_token=args.pip
+    )
+    watcher = InventoryWatcher(inventory, CONFIG, lambda new: worker.apply_inventory(new.select(wanted, tags)))
+    # Ctrl+C / service stop -> clean worker shutdown
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stop())
+
+    worker.start()
+    watcher.start()
+    while worker.is_alive():
+        worker.join(0.5)  # short joins keep the main thread responsive to signals on Windows
+    watcher.stop()
+    return 0 if result["success"] else 1
+
+
+def run_identities(args, config, signals, result):
+    """Daemon for CONFIG['identities'] - one IdentityBroker, one worker per identity. Each entry is
+    {"name", "accounts", "tags", "mfa_secret_env", "default_profile", **CONFIG overrides (user, source_profile,
+    main_iam_acct_num, role_name, inventory_path...)}; --accounts / --tags narrow every identity's selection."""
+    selected = split_list(args.identity)
+    entries = [dict(entry) for entry in config["identities"] if not selected or entry.get("name") in selected]
+    if not entries or any(not entry.get("name") for entry in entries):
+        print(f"No identities to run (every CONFIG['identities'] entry needs a name): {args.identity}", file=sys.stderr)
+        return 2
+    if args.mfa_code and len(entries) > 1:
+        print("--mfa-code works with one identity - pick it with --identity", file=sys.stderr)
+        return 2
+
+    identities, watchers = [], []
+    for entry in entries:
+        name = entry.pop("name")
+        names = split_list(entry.pop("accounts", ""))
+        tags = split_list(entry.pop("tags", "")) + split_list(args.tags)
+        totp_env = entry.pop("mfa_secret_env", args.totp_env)
+        default_profile = entry.pop("default_profile", "") or args.default_profile
+        own_config = identity_config(config, name, entry, primary=not identities)
+        try:
+            inventory = Inventory.load(own_config)  # role / region defaults come from the identity's settings
+            mfa_code = daemon_mfa_code(own_config, totp_env, args.mfa_code, label=name)
+        except Exception as e:
+            print(f"[{name}] {e}", file=sys.stderr)
+            return 2
+
+        def pick(inventory, names=names, tags=tags):
+            accounts = inventory.select(names, tags)
+            return [a for a in accounts if a['name'] in split_list(args.accounts)] if args.accounts else accounts
+
+        accounts = pick(inventory)
+        if not accounts:
+            print(f"[{name}] no accounts selected", file=sys.stderr)
+            return 2
+        identities.append({"name": name, "settings": entry, "accounts": accounts, "mfa_code": mfa_code,
+                           "default_profile": default_profile or accounts[0]['name']})
+        watchers.append((inventory, own_config, name, pick))
+
+    try:
+        broker = IdentityBroker(identities, config, signals, npm_token=args.npm, pip_token=args.pip)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    workers = {worker.identity: worker for worker in broker.workers}
+    watchers = [InventoryWatcher(inventory, own_config, lambda new, w=workers[name], pick=pick: w.apply_inventory(pick(new)))
+                for inventory, own_config, name, pick in watchers]
+    signals.metrics_update.connect(lambda summary: print(f"[identities] {broker.status_line()}"))
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: broker.stop())
+
+    broker.start()
+    for watcher in watchers:
+        watcher.start()
+    while broker.is_alive():
+        broker.join(0.5)
+    for watcher in watchers:
+        watcher.stop()
+    return 0 if result["success"] else 1
+
+
+def run_logs(argv):
+    """Query aws_manager.log / aws_manager_debug.log and their rotated backups (no Qt, no logging setup)"""
+    parser = argparse.ArgumentParser(prog="awsManager.py logs", description="Search the log history, rotated files included")
+    parser.add_argument("--since", default="", help="start time: 2026-10-17 03:00, 03:00 (today) or 2h / 30m / 1d ago")
+    parser.add_argument("--until", default="", help="end time, same formats")
+    parser.add_argument("--profile", default="", help="comma-separated profile names or account ids")
+    parser.add_argument("--errors", action="store_true", help="only failures, warnings and tracebacks")
+    parser.add_argument("--log", choices=["main", "debug", "all"], default="main", help="which log to search (default: main)")
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many records (default: all)")
+    parser.add_argument("--stats", action="store_true", help="print files, bytes scanned and timing to stderr")
+    args = parser.parse_args(argv)
+
+    try:
+        since = log_time_key(args.since) if args.since else None
+        until = log_time_key(args.until, end=True) if args.until else None
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    names = [n.strip() for n in args.profile.split(",") if n.strip()]
+    paths = {"main": [LOG_PATH], "debug": [DEBUG_LOG_PATH], "all": [LOG_PATH, DEBUG_LOG_PATH]}[args.log]
+    queries = [LogQuery(since, until, names, args.errors) for _ in paths]
+
+    started = time.perf_counter()
+    backups = CONFIG.get("log_backup_count", 5)
+    # Each history is already in time order - merging them keeps the combined output in order too
+    records = heapq.merge(*(query.run(path, backups) for query, path in zip(queries, paths)), key=lambda r: r[0])
+    out = sys.stdout.buffer
+    count = 0
+    try:
+        for _, record in itertools.islice(records, args.limit or None):
+            out.write(record)
+            count += 1
+        out.flush()
+    except BrokenPipeError:  # | head - silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        records.close()
+
+    if args.stats:
+        totals = {key: sum(q.stats[key] for q in queries) for key in queries[0].stats}
+        print(f"{count} records in {(time.perf_counter() - started) * 1000:.0f} ms - {totals['files']} files searched, "
+              f"{totals['files_skipped']} skipped, {totals['bytes_scanned'] / 1e6:.1f} of {totals['bytes_mapped'] / 1e6:.1f} MB scanned",
+              file=sys.stderr)
+    return 0 if count else 1
+
+
+def run_ctl(argv):
+    """Control API client - status / renew / stop / set-default on the running GUI or daemon (no Qt, no logging setup)"""
+    parser = argparse.ArgumentParser(prog="awsManager.py ctl", description="Talk to the running AWS Credential Manager")
+    parser.add_argument("action", choices=["status", "renew", "stop", "set-default"])
+    parser.add_argument("profiles", nargs="*", help="renew: profiles to renew (default: all); set-default: the profile")
+    args = parser.parse_args(argv)
+
+    if args.action == "status":
+        reply = control_request("GET", "/status")
+    else:
+        query = f"?{urlencode({'profile': ','.join(args.profiles)})}" if args.profiles else ""
+        reply = control_request("POST", f"/{args.action}{query}")
+    if reply is None:
+        print("AWS Credential Manager is not running (no control API found).", file=sys.stderr)
+        return 1
+    status, doc = reply
+    print(json.dumps(doc, indent=2) if args.action == "status" else doc.get("message", doc))
+    return 0 if status == 200 else 1
+
+
+def run_creds(argv):
+    """credential_process helper - prints the cached credentials of one profile (no Qt, no STS)"""
+    if len(argv) != 1:
+        print("usage: awsManager.py creds <profile>", file=sys.stderr)
+        return 2
+    profile = argv[0]
+    cache = CredentialCache()
+    if (control_info() or {}).get("access"):
+        record_access(profile)
+    doc = cache.get(profile)
+    if doc is None:
+        # Cold profile - ask the running worker, and wait for the cache file only if it queued a renewal.
+        # No manager, a non-usage policy or an unknown profile fail at once: an SDK must not stall here.
+        reply = control_request("POST", f"/access?{urlencode({'profile': profile})}")
+        if reply is None:
+            print(f"No fresh credentials cached for '{profile}' - is AWS Credential Manager running?", file=sys.stderr)
+            return 1
+        if reply[0] != 200:
+            print(f"No fresh credentials cached for '{profile}': {reply[1].get('message', reply[0])}", file=sys.stderr)
+            return 1
+        deadline = time.time() + CONFIG.get("on_demand_timeout_seconds", 20)
+        while doc is None and time.time() < deadline:
+            time.sleep(0.1)
+            doc = cache.get(profile)
+    if doc is None:
+        print(f"On-demand renewal of '{profile}' did not finish in time - see the AWS Credential Manager log.", file=sys.stderr)
+        return 1
+    sys.stdout.write(json.dumps(doc))
+    return 0
+
+
+def main(argv=None):
+    """Main entry point - headless subcommands, otherwise the GUI"""
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Hot path: SDKs spawn this on every refresh, keep it free of logging and startup work
+    if argv and argv[0] == "creds":
+        return run_creds(argv[1:])
+
+    if argv and argv[0] == "daemon":
+        return run_daemon(argv[1:])
+
+    if argv and argv[0] == "logs":
+        return run_logs(argv[1:])
+
+    if argv and argv[0] == "ctl":
+        return run_ctl(argv[1:])
+
+    # A second launch hands its arguments to the running instance and exits - before logging, Qt or a worker start
+    options = gui_options(argv)
+    instance, reply = claim_instance(argv)
+    if reply is not None:
+        if sys.stdout is not None:
+            print(reply[1])
+        return 0 if reply[0] else 1
+
+    # The inventory's settings (log_* included) override CONFIG, so load it before logging starts - as run_daemon does
+    try:
+        inventory, inventory_error = Inventory.load(CONFIG), None
+    except Exception as e:
+        inventory, inventory_error = Inventory.from_accounts(AWS_ACCOUNTS, CONFIG), e
+    CONFIG.update(inventory.settings)
+
+    setup_logging(CONFIG)
+    log_startup()
+    if inventory_error:
+        logger.error(f"Cannot load inventory, using the built-in accounts: {inventory_error}")
+
+    # Qt / qfluentwidgets load only here. Register this module under its import name so the
+    # GUI module shares CONFIG and the worker when we run as __main__.
+    sys.modules.setdefault("awsManager", sys.modules[__name__])
+    import awsManagerGui
+    return awsManagerGui.main(options, instance, inventory)
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
 
 
 
@@ -924,4 +4299,5 @@ if __name__ == '__main__':
 
 
 # pyinstaller --onefile --windowed --name "AWSCredentialsManager" --icon "your_icon.ico" --add-data "background.jpg;." awsManager.py
-# pyinstaller --onefile --windowed --name "AWSCredentialsManager" --add-data "background.jpg;." --hidden-import "qfluentwidgets" --hidden-import "qframelesswindow" awsManager.py
\ No newline at end of file
+# pyinstaller --onefile --windowed --name "AWSCredentialsManager" --add-data "background.jpg;." --hidden-import "qfluentwidgets" --hidden-import "qframelesswindow" awsManager.py
+# pyinstaller --onedir --windowed --name "AWSCredentialsManager" --add-data "background.jpg;." --hidden-import "qfluentwidgets" --hidden-import "qframelesswindow" awsManager.py   # no unpacking per launch - see benchmarks/startupTime.py
\ No newline at end of file
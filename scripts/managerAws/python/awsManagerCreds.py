@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+credential_process launcher - what ~/.aws/config entries run in credential_mode "process"
+
+Usage:
+    python awsManagerCreds.py <profile>
+
+SDKs spawn this on every credential refresh, so the cache-hit path stays on os/sys/time: it reads the
+document the running worker keeps in ~/.aws/awsManager/cache and prints it. The full awsManager module (4k
+lines, http/xml/logging imports) is loaded only on a miss, where `creds` asks the running worker to renew on
+demand - and fails at once when there is none, or it will not.
+"""
+
+import os
+import sys
+import time
+
+
+def state_dir():
+    # Same directory as awsManager.state_dir(), without importing it
+    return os.path.join(os.path.expanduser("~"), ".aws", "awsManager")
+
+
+def cached_document(profile):
+    """The cached credential_process document if it is still valid, else None"""
+    try:
+        with open(os.path.join(state_dir(), "cache", f"{profile}.json"), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # Not json.loads - importing json pulls in re, which costs more than the rest of this path. The worker writes
+    # these files itself, with "Expiration": "%Y-%m-%dT%H:%M:%SZ" (UTC), so the strings compare in time order.
+    start = data.find(b'"Expiration"')
+    fields = data[start:].split(b'"', 4) if start != -1 else []
+    if len(fields) == 5 and fields[3] > time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()).encode("ascii"):
+        return data
+    return None
+
+
+def tracks_access():
+    """Whether the running worker has the usage policy - it says so in control.json (written by ControlServer
+    with json.dumps' default separators, so a substring test does without json)"""
+    try:
+        with open(os.path.join(state_dir(), "control.json"), "rb") as f:
+            return b'"access": true' in f.read()
+    except OSError:
+        return False
+
+
+def record_access(profile):
+    """Usage policy: stamp the profile as used for the worker's next warm/cold decision"""
+    stamp = os.path.join(state_dir(), "access", profile)
+    try:
+        try:
+            os.utime(stamp)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(stamp), exist_ok=True)
+            open(stamp, "ab").close()
+    except OSError:
+        pass
+
+
+def main(argv):
+    if len(argv) == 1:
+        if tracks_access():
+            record_access(argv[0])
+        data = cached_document(argv[0])
+        if data is not None:
+            sys.stdout.buffer.write(data)
+            return 0
+    # Miss (or bad arguments): the full helper renews on demand under the usage policy and reports errors
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import awsManager
+    return awsManager.run_creds(argv)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
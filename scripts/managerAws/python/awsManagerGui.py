@@ -0,0 +1,985 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AWS Credential Manager - GUI (PyQt5 + qfluentwidgets)
+Loaded by awsManager.main() only when the window is actually shown.
+"""
+
+import sys
+import os
+import subprocess
+import threading
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+from PyQt5.QtCore import Qt, pyqtSignal, QObject, QSize, QEvent, QTimer, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QIcon, QColor, QPixmap, QPainter, QLinearGradient, QBrush, QFont, QImageReader
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QSystemTrayIcon, QMenu, QAction, QLabel, QSpacerItem,
+                             QSizePolicy, QListView, QStackedWidget, QAbstractItemView)
+from qfluentwidgets import (
+    setTheme, Theme, setThemeColor, isDarkTheme,
+    PrimaryPushButton, PushButton, ComboBox, LineEdit,
+    TitleLabel, SubtitleLabel, BodyLabel, CaptionLabel, StrongBodyLabel,
+    ProgressRing, InfoBar, InfoBarPosition, MessageBox, MessageBoxBase,
+    FluentIcon as FIF, SplitTitleBar, CheckBox, HyperlinkButton, SearchLineEdit
+)
+
+from awsManager import (AWS_ACCOUNTS, CONFIG, LOG_PATH, AWSCredentialWorker, Inventory, InventoryWatcher, totp_from_config, debug_log,
+                        resumable_session, LogRing, LogTail, format_log_line)
+
+def resource_path(name):
+    """Path to bundled resource - works both as script and pyinstaller onefile exe"""
+    base = getattr(sys, "_MEIPASS", str(Path(__file__).parent))
+    return str(Path(base) / name)
+
+
+def isWin11():
+    """Check if running on Windows 11"""
+    return sys.platform == 'win32' and sys.getwindowsversion().build >= 22000
+
+if isWin11():
+    from qframelesswindow import AcrylicWindow as Window
+else:
+    from qframelesswindow import FramelessWindow as Window
+
+
+class WorkerSignals(QObject):
+    """Signals for background worker thread"""
+    status_update = pyqtSignal(str)
+    progress_update = pyqtSignal(bool)
+    finished = pyqtSignal(bool, str)
+    log_message = pyqtSignal(str)
+    metrics_update = pyqtSignal(str)
+    breaker_update = pyqtSignal(str)
+    default_changed = pyqtSignal(str)
+
+def scaleToFill(image, width, height, ratio):
+    """`image` (QImage or QPixmap) scaled to cover width x height logical pixels at device pixel `ratio`,
+    centre-cropped to exactly that size - QImage is safe to scale off the UI thread, QPixmap is not"""
+    target = QSize(round(width * ratio), round(height * ratio))
+    scaled = image.scaled(target, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+    cropped = scaled.copy((scaled.width() - target.width()) // 2, (scaled.height() - target.height()) // 2,
+                          target.width(), target.height())
+    cropped.setDevicePixelRatio(ratio)
+    return cropped
+
+
+class BackgroundImageWidget(QWidget):
+    """Widget with background image and AWS cloud logo.
+    The JPEG is decoded off the UI thread, and scaled copies are cached per (width, height, device pixel ratio):
+    a repaint is a single blit, and a resize rescales once, after it settles."""
+
+    CACHE_SIZE = 6
+    RESIZE_DEBOUNCE_MS = 150
+
+    imageLoaded = pyqtSignal(object, object)  # source QImage, {(w, h, ratio): pre-rendered QImage}
+
+    def __init__(self, parent=None, presetSizes=()):
+        super().__init__(parent)
+        self.sourceImage = None
+        self.cache = OrderedDict()
+        self.presetSizes = list(presetSizes)
+        self.resizeTimer = QTimer(self)
+        self.resizeTimer.setSingleShot(True)
+        self.resizeTimer.setInterval(self.RESIZE_DEBOUNCE_MS)
+        self.resizeTimer.timeout.connect(self.renderCurrentSize)
+        self.imageLoaded.connect(self.onImageLoaded)
+        self.loadBackgroundImage()
+        
+    def loadBackgroundImage(self):
+        """Decode the background image - and pre-render the preset sizes for every screen - on a background thread"""
+        bg_path = Path(resource_path("background.jpg"))
+        if not bg_path.exists():
+            return
+        ratios = {screen.devicePixelRatio() for screen in QApplication.screens()} or {1.0}
+        targets = [(width, height, ratio) for width, height in self.presetSizes for ratio in sorted(ratios)]
+        threading.Thread(target=self.decodeImage, args=(str(bg_path), targets), name="background-decode", daemon=True).start()
+
+    def decodeImage(self, path, targets):
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        image = reader.read()
+        if image.isNull():
+            debug_log(f"BackgroundImageWidget: cannot decode {path}: {reader.errorString()}")
+            return
+        self.imageLoaded.emit(image, {key: scaleToFill(image, *key) for key in targets})
+
+    def onImageLoaded(self, image, rendered):
+        self.sourceImage = image
+        for key, scaled in rendered.items():
+            self.cache[key] = QPixmap.fromImage(scaled)
+        self.update()
+
+    def cacheKey(self):
+        return (self.width(), self.height(), self.devicePixelRatioF())
+
+    def renderCurrentSize(self):
+        """Rescale for the size / screen the widget has settled on"""
+        key = self.cacheKey()
+        if self.sourceImage is None or key in self.cache:
+            return
+        self.cache[key] = QPixmap.fromImage(scaleToFill(self.sourceImage, *key))
+        while len(self.cache) > self.CACHE_SIZE:
+            self.cache.popitem(last=False)
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resizeTimer.start()  # restarted by every step of a drag - the smooth rescale waits for the last one
+
+    def paintEvent(self, event):
+        """Paint background image with AWS logo"""
+        painter = QPainter(self)
+        key = self.cacheKey()
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            self.cache.move_to_end(key)
+            painter.drawPixmap(0, 0, pixmap)
+            return
+
+        if self.sourceImage is not None and not self.resizeTimer.isActive():
+            self.resizeTimer.start()  # new screen (DPI change) - no resize event announces it
+        if self.cache:
+            # Until the rescale lands, stretch the most recent copy - a fast, unfiltered blit
+            painter.drawPixmap(self.rect(), next(reversed(self.cache.values())))
+        else:
+            gradient = QLinearGradient(0, 0, self.width(), self.height())
+            gradient.setColorAt(0.0, QColor(0, 120, 212))
+            gradient.setColorAt(0.5, QColor(0, 160, 240))
+            gradient.setColorAt(1.0, QColor(0, 120, 212))
+            painter.fillRect(self.rect(), QBrush(gradient))
+        
+
+class LogListModel(QAbstractListModel):
+    """List model over a LogRing - rows are read straight from the ring, nothing is copied"""
+
+    ERROR_COLOR = QColor("#F87171")
+
+    def __init__(self, ring, parent=None):
+        super().__init__(parent)
+        self.ring = ring
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ring)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        line = self.ring[index.row()]
+        if role == Qt.DisplayRole:
+            return line
+        if role == Qt.ForegroundRole and ("❌" in line or "Error" in line or "Failed" in line):
+            return self.ERROR_COLOR
+        return None
+
+    def appendLines(self, lines):
+        """Add a batch of lines as one remove + one insert (or one reset when the batch fills the ring)"""
+        if not lines:
+            return
+        if len(lines) >= self.ring.capacity:
+            self.beginResetModel()
+            self.ring.clear()
+            self.ring.extend(lines)
+            self.endResetModel()
+            return
+        overflow = len(self.ring) + len(lines) - self.ring.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self.ring.discard(overflow)
+            self.endRemoveRows()
+        first = len(self.ring)
+        self.beginInsertRows(QModelIndex(), first, first + len(lines) - 1)
+        self.ring.extend(lines)
+        self.endInsertRows()
+
+
+class LogPanel(QWidget):
+    """Live log view - tails aws_manager.log into a fixed-size ring shown by a virtualized list.
+    Reads are incremental (from the last file offset) and coalesced: a burst of log lines costs one read and
+    one repaint per frame. Polling runs only while the panel is visible."""
+
+    FRAME_MS = 33
+    POLL_MS = 500
+
+    openFileRequested = pyqtSignal()
+
+    def __init__(self, path, capacity, parent=None):
+        super().__init__(parent)
+        self.tail = LogTail(path)
+        self.model = LogListModel(LogRing(capacity), self)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(16, 40, 8, 16)  # clear of the title bar buttons
+        layout.setSpacing(6)
+
+        header = QHBoxLayout()
+        self.countLabel = CaptionLabel(Path(path).name)
+        self.countLabel.setStyleSheet("color: gray;")
+        header.addWidget(self.countLabel)
+        header.addStretch()
+        openLink = HyperlinkButton(url="", text="Open file", parent=self)
+        openLink.clicked.connect(self.openFileRequested)
+        header.addWidget(openLink)
+        layout.addLayout(header)
+
+        font = QFont("Consolas", 9)
+        font.setStyleHint(QFont.Monospace)
+        self.view = QListView(self)
+        self.view.setModel(self.model)
+        self.view.setFont(font)
+        self.view.setUniformItemSizes(True)  # rows are never measured one by one - only visible rows are laid out
+        self.view.setWordWrap(False)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.view.setStyleSheet("""
+            QListView {
+                background: rgba(0, 0, 0, 170);
+                color: #E5E7EB;
+                border: none;
+                border-radius: 6px;
+                padding: 4px;
+            }
+        """)
+        layout.addWidget(self.view)
+
+        self.frameTimer = QTimer(self)
+        self.frameTimer.setSingleShot(True)
+        self.frameTimer.setInterval(self.FRAME_MS)
+        self.frameTimer.timeout.connect(self.refresh)
+        self.pollTimer = QTimer(self)
+        self.pollTimer.setInterval(self.POLL_MS)
+        self.pollTimer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.pollTimer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.pollTimer.stop()
+        self.frameTimer.stop()
+
+    def scheduleRefresh(self, *_):
+        """A log line was emitted - read it within the next frame, together with whatever follows it"""
+        if self.isVisible() and not self.frameTimer.isActive():
+            self.frameTimer.start()
+
+    def refresh(self):
+        try:
+            lines = self.tail.read_new()
+        except OSError as e:
+            debug_log(f"LogPanel.refresh: {e}")
+            return
+        if not lines:
+            return
+        scrollBar = self.view.verticalScrollBar()
+        following = scrollBar.value() >= scrollBar.maximum() - 2
+        self.model.appendLines([format_log_line(line) for line in lines])
+        self.countLabel.setText(f"{self.tail.path.name} · last {len(self.model.ring)} lines")
+        if following:
+            self.view.scrollToBottom()
+
+
+
+class MFADialog(MessageBoxBase):
+    """Simple MFA Dialog"""
+    
+    def __init__(self, account_name, parent=None):
+        super().__init__(parent)
+        self.titleLabel = SubtitleLabel(f"Mfa Code")
+        self.titleLabel.setAlignment(Qt.AlignCenter)
+        self.mfaInput = LineEdit(self)
+        self.mfaInput.setMaxLength(6)
+        self.mfaInput.setClearButtonEnabled(True)
+        self.warningLabel = CaptionLabel("MFA code must be 6 digits")
+        self.warningLabel.setStyleSheet("color: #d13438;")
+        self.warningLabel.setHidden(True)
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.mfaInput)
+        self.viewLayout.addWidget(self.warningLabel)
+        
+        self.widget.setMinimumWidth(320)
+        self.yesButton.setText("Go !")
+        self.cancelButton.setText("Exit !")
+        
+        self.mfaInput.setFocus()
+    
+    def validate(self):
+        """Validate MFA code"""
+        mfa_code = self.mfaInput.text()
+        isValid = len(mfa_code) == 6 and mfa_code.isdigit()
+        self.warningLabel.setHidden(isValid)
+        return isValid
+
+
+class AWSManagerWindow(Window):
+    """Main AWS Credential Manager Window - Login Style"""
+
+    # Pickers with more profiles than this get a filter box; the combo itself never holds more than COMBO_LIMIT
+    FILTER_THRESHOLD = 30
+    COMBO_LIMIT = 100
+    PANEL_WIDTH = 320
+    WINDOW_SIZE = (600, 425)
+    LOG_WINDOW_SIZE = (1000, 425)  # log lines need the width - the window grows while the log panel is open
+
+    inventoryChanged = pyqtSignal(object)
+    instanceCommand = pyqtSignal(object)
+    
+    def __init__(self, inventory=None):
+        super().__init__()
+        
+        self.worker = None
+        self.is_running = False
+        self.shouldReallyClose = False
+
+        # Loaded by awsManager.main() - its settings are already in CONFIG (and in effect for logging)
+        self.inventory = inventory or Inventory.from_accounts(AWS_ACCOUNTS, CONFIG)
+        
+        setTheme(Theme.AUTO)
+        setThemeColor('#0078d4')
+        
+        self.initUI()
+        self.initWindow()
+        self.initSystemTray()
+        self.startInventoryWatcher()
+        self.instanceCommand.connect(self.applyInstanceCommand)
+        
+    def initUI(self):
+        """Initialize UI - Clean and elegant"""
+        
+        # Main horizontal layout
+        mainLayout = QHBoxLayout(self)
+        mainLayout.setContentsMargins(0, 0, 0, 0)
+        mainLayout.setSpacing(0)
+        
+        # Left side - Background image with AWS logo, or the live log panel
+        self.backgroundWidget = BackgroundImageWidget(self, presetSizes=[(self.WINDOW_SIZE[0] - self.PANEL_WIDTH, self.WINDOW_SIZE[1])])
+        self.logPanel = LogPanel(LOG_PATH, CONFIG.get("log_view_lines", 5000), self)
+        self.logPanel.openFileRequested.connect(self.openLogFile)
+        self.leftStack = QStackedWidget(self)
+        self.leftStack.addWidget(self.backgroundWidget)
+        self.leftStack.addWidget(self.logPanel)
+        mainLayout.addWidget(self.leftStack)
+        
+        # Right side - Clean control panel
+        self.controlPanel = QWidget(self)
+        self.controlPanel.setFixedWidth(self.PANEL_WIDTH)
+        self.controlPanel.setStyleSheet("""
+            QWidget {
+                background: transparent;
+            }
+            QLabel {
+                font: 13px 'Segoe UI';
+            }
+        """)
+        
+        panelLayout = QVBoxLayout(self.controlPanel)
+        panelLayout.setContentsMargins(25, 25, 25, 25)
+        panelLayout.setSpacing(10)
+        
+        # Top spacer
+        panelLayout.addSpacerItem(QSpacerItem(20, 60, QSizePolicy.Minimum, QSizePolicy.Expanding))
+        
+        # Logo - blue fluent cloud icon rendered into a fixed pixmap (can't overflow onto the title)
+        logoLabel = QLabel()
+        logoLabel.setPixmap(FIF.CLOUD.icon(color=QColor("#60A5FA")).pixmap(84, 84))
+        logoLabel.setFixedSize(84, 84)
+        logoLabel.setAlignment(Qt.AlignCenter)
+        panelLayout.addWidget(logoLabel, 0, Qt.AlignCenter)
+
+        panelLayout.addSpacerItem(QSpacerItem(20, 24, QSizePolicy.Minimum, QSizePolicy.Fixed))
+
+        # Title - styled, below the logo
+        titleLabel = SubtitleLabel("AWS Credentials Manager")
+        titleLabel.setAlignment(Qt.AlignCenter)
+        titleLabel.setStyleSheet("font: 600 14px 'Segoe UI'; letter-spacing: 0.5px; color: #60A5FA;")
+        panelLayout.addWidget(titleLabel)
+
+        panelLayout.addSpacerItem(QSpacerItem(20, 30, QSizePolicy.Minimum, QSizePolicy.Fixed))
+
+        # Filter box for large inventories - "prod eu" matches names/ids, "tag:prod" matches tags
+        self.accountFilter = SearchLineEdit()
+        self.accountFilter.setFixedWidth(190)
+        self.accountFilter.textChanged.connect(lambda _: self.filterTimer.start())
+        panelLayout.addWidget(self.accountFilter, 0, Qt.AlignCenter)
+
+        # Debounce typing so each keystroke doesn't rebuild the combo
+        self.filterTimer = QTimer(self)
+        self.filterTimer.setSingleShot(True)
+        self.filterTimer.setInterval(150)
+        self.filterTimer.timeout.connect(self.populateAccounts)
+
+        self.accountCombo = ComboBox()
+        self.accountCombo.setFixedWidth(190)
+        panelLayout.addWidget(self.accountCombo, 0, Qt.AlignCenter)
+        self.populateAccounts('dev-test-perf')
+
+        panelLayout.addSpacerItem(QSpacerItem(20, 10, QSizePolicy.Minimum, QSizePolicy.Fixed))
+
+        # CodeArtifact token options - unchecked by default, side by side
+        tokenRow = QHBoxLayout()
+        tokenRow.setSpacing(16)
+        self.npmTokenCheck = CheckBox("npm")
+        self.pipTokenCheck = CheckBox("pip")
+        tokenRow.addStretch()
+        tokenRow.addWidget(self.npmTokenCheck)
+        tokenRow.addWidget(self.pipTokenCheck)
+        tokenRow.addStretch()
+        panelLayout.addLayout(tokenRow)
+
+        panelLayout.addSpacerItem(QSpacerItem(20, 15, QSizePolicy.Minimum, QSizePolicy.Fixed))
+        
+        # Start button - compact, centered
+        self.startButton = PrimaryPushButton(FIF.PLAY, "Start")
+        self.startButton.setFixedSize(110, 32)
+        self.startButton.clicked.connect(self.onStartClicked)
+        panelLayout.addWidget(self.startButton, 0, Qt.AlignCenter)
+
+        # Stop button
+        self.stopButton = PushButton(FIF.PAUSE, "Stop")
+        self.stopButton.setFixedSize(110, 32)
+        self.stopButton.clicked.connect(self.onStopClicked)
+        self.stopButton.hide()
+        panelLayout.addWidget(self.stopButton, 0, Qt.AlignCenter)
+        
+        panelLayout.addSpacerItem(QSpacerItem(20, 10, QSizePolicy.Minimum, QSizePolicy.Fixed))
+        
+        # View logs link
+        debug_log("initUI: creating viewLogsLink HyperlinkButton")
+        self.viewLogsLink = HyperlinkButton(
+            url="",
+            text="View Logs",
+            parent=self.controlPanel
+        )
+        self.viewLogsLink.clicked.connect(self.onViewLogsClicked)
+        debug_log("initUI: viewLogsLink.clicked connected to onViewLogsClicked")
+        panelLayout.addWidget(self.viewLogsLink, 0, Qt.AlignCenter)
+        
+        panelLayout.addSpacerItem(QSpacerItem(20, 20, QSizePolicy.Minimum, QSizePolicy.Fixed))
+        
+        # Status area - centered
+        statusContainer = QWidget()
+        statusLayout = QHBoxLayout(statusContainer)
+        statusLayout.setContentsMargins(0, 0, 0, 0)
+        statusLayout.setSpacing(8)
+        
+        statusLayout.addStretch()
+        
+        self.progressRing = ProgressRing()
+        self.progressRing.setFixedSize(16, 16)
+        self.progressRing.hide()
+        statusLayout.addWidget(self.progressRing)
+        
+        self.statusLabel = CaptionLabel("⚪ Ready")
+        self.statusLabel.setStyleSheet("color: gray;")
+        statusLayout.addWidget(self.statusLabel)
+        
+        statusLayout.addStretch()
+        
+        panelLayout.addWidget(statusContainer)
+
+        # Per-cycle renewal summary (profiles ok, cycle time, slowest account)
+        self.metricsLabel = CaptionLabel("")
+        self.metricsLabel.setStyleSheet("color: gray; font-size: 11px;")
+        self.metricsLabel.setAlignment(Qt.AlignCenter)
+        self.metricsLabel.hide()
+        panelLayout.addWidget(self.metricsLabel)
+
+        # Profiles paused by their circuit breaker (deleted role, no permission, persistent errors)
+        self.breakerLabel = CaptionLabel("")
+        self.breakerLabel.setStyleSheet("color: #F59E0B; font-size: 11px;")
+        self.breakerLabel.setAlignment(Qt.AlignCenter)
+        self.breakerLabel.setWordWrap(True)
+        self.breakerLabel.hide()
+        panelLayout.addWidget(self.breakerLabel)
+        
+        # Bottom spacer
+        panelLayout.addSpacerItem(QSpacerItem(20, 60, QSizePolicy.Minimum, QSizePolicy.Expanding))
+        
+        mainLayout.addWidget(self.controlPanel)
+        
+    def initWindow(self):
+        """Initialize window properties"""
+        
+        # Set split title bar (like login) - no icon/text over the background image
+        self.setTitleBar(SplitTitleBar(self))
+        self.titleBar.iconLabel.hide()
+        self.titleBar.titleLabel.hide()
+        self.titleBar.raise_()
+        
+        # self.titleBar.titleLabel.setText("🔐 AWS Credential Manager")
+        self.titleBar.titleLabel.setStyleSheet("""
+            QLabel {
+                background: transparent;
+                font: 13px 'Segoe UI';
+                padding: 0 4px;
+                color: white;
+            }
+        """)
+        
+        # Window properties - fixed size
+        self.setWindowIcon(QIcon(resource_path("managerAws.ico")))
+        self.setWindowTitle("AWS Credential Manager")
+        self.setFixedSize(*self.WINDOW_SIZE)
+        
+        # Center on screen
+        desktop = QApplication.desktop().availableGeometry()
+        w, h = desktop.width(), desktop.height()
+        self.move(w//2 - self.width()//2, h//2 - self.height()//2)
+        
+        # Apply Mica effect for Windows 11
+        if isWin11():
+            try:
+                self.windowEffect.setMicaEffect(self.winId(), isDarkMode=isDarkTheme())
+            except:
+                pass
+        
+        # Fallback background
+        if not isWin11():
+            color = QColor(25, 33, 42) if isDarkTheme() else QColor(240, 244, 249)
+            self.setStyleSheet(f"AWSManagerWindow{{background: {color.name()}}}")
+    
+    def initSystemTray(self):
+        """Initialize system tray"""
+        
+        self.trayIcon = QSystemTrayIcon(self)
+        self.trayIcon.setIcon(QIcon(resource_path("managerAws.ico")))
+        self.trayIcon.setToolTip("AWS Credential Manager")
+        
+        trayMenu = QMenu()
+        
+        showAction = QAction("Show Window", self)
+        showAction.triggered.connect(self.showNormal)
+        trayMenu.addAction(showAction)
+
+        renewAction = QAction("Renew Now", self)
+        renewAction.triggered.connect(self.onRenewNowClicked)
+        trayMenu.addAction(renewAction)
+        
+        trayMenu.addSeparator()
+        
+        exitAction = QAction("Exit", self)
+        exitAction.triggered.connect(self.reallyClose)
+        trayMenu.addAction(exitAction)
+        
+        self.trayIcon.setContextMenu(trayMenu)
+        self.trayIcon.activated.connect(self.onTrayIconActivated)
+    
+    def changeEvent(self, event):
+        """Minimize button hides to system tray - same behavior as managerAws.ps1"""
+        if event.type() == QEvent.WindowStateChange and self.isMinimized():
+            event.ignore()
+            QTimer.singleShot(0, self.hide)
+            self.trayIcon.show()
+            self.trayIcon.showMessage(
+                "AWS Credential Manager",
+                "Application minimized to system tray",
+                QSystemTrayIcon.Information,
+                2000
+            )
+            return
+        super().changeEvent(event)
+
+    def onTrayIconActivated(self, reason):
+        """Handle tray icon activation"""
+        if reason == QSystemTrayIcon.DoubleClick:
+            self.showNormal()
+            self.activateWindow()
+    
+    def onAccountSelected(self, index):
+        """Handle account icon selection"""
+        self.accountCombo.setCurrentIndex(index)
+    
+    def getSelectedAccount(self):
+        """Get currently selected account"""
+        return self.inventory.get(self.accountCombo.currentText())
+
+    def populateAccounts(self, selected=None):
+        """Refill the account combo from the inventory and the filter text, keeping the selection when it still matches"""
+        selected = selected or self.accountCombo.currentText()
+        filtering = len(self.inventory.profiles) > self.FILTER_THRESHOLD
+        self.accountFilter.setVisible(filtering)
+        self.accountFilter.setPlaceholderText(f"Filter {len(self.inventory.profiles)} profiles (tag:name)")
+        matches = self.inventory.search(self.accountFilter.text() if filtering else "", limit=self.COMBO_LIMIT)
+        names = [profile['name'] for profile in matches]
+
+        self.accountCombo.blockSignals(True)
+        self.accountCombo.clear()
+        self.accountCombo.addItems(names)
+        self.accountCombo.setCurrentIndex(names.index(selected) if selected in names else 0)
+        self.accountCombo.blockSignals(False)
+
+    def showSelectedProfile(self, name):
+        """Select a profile in the picker only - also the slot for default switches made over the control API"""
+        if self.accountCombo.currentText() == name:
+            return
+        self.accountFilter.blockSignals(True)
+        self.accountFilter.setText("")
+        self.populateAccounts(selected=name)
+        if self.accountCombo.currentText() != name and self.accountFilter.isVisible():
+            self.accountFilter.setText(name)  # beyond the combo's first COMBO_LIMIT entries
+            self.populateAccounts(selected=name)
+        self.accountFilter.blockSignals(False)
+
+    def selectProfile(self, name):
+        """Select a profile in the picker - and, while renewing, mirror it into [default] from now on"""
+        self.showSelectedProfile(name)
+        if self.worker and self.is_running:
+            success, message = self.worker.set_default(name)
+            (InfoBar.success if success else InfoBar.error)(
+                title="Default Profile",
+                content=message,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+
+    def onInstanceHandoff(self, options):
+        """Another launch handed its arguments over - runs on the instance server thread, so only check and signal"""
+        if options.default_profile and self.inventory.get(options.default_profile) is None:
+            return False, f"Unknown profile '{options.default_profile}'"
+        self.instanceCommand.emit(options)
+        return True, "Handed over to the running AWS Credential Manager"
+
+    def applyInstanceCommand(self, options):
+        """Show the window, then apply --default / --renew from the other launch"""
+        self.showNormal()
+        self.raise_()
+        self.activateWindow()
+        if options.default_profile:
+            self.selectProfile(options.default_profile)
+        if options.renew:
+            self.onRenewNowClicked()
+
+    def startInventoryWatcher(self):
+        """Reload the inventory file when it changes - the watcher thread hands new versions over via a signal"""
+        self.inventoryChanged.connect(self.onInventoryChanged)
+        self.inventoryWatcher = InventoryWatcher(self.inventory, CONFIG, self.inventoryChanged.emit)
+        self.inventoryWatcher.start()
+
+    def onInventoryChanged(self, inventory):
+        """Apply an edited inventory to the picker and, if running, to the worker (no restart, no MFA)"""
+        self.inventory = inventory
+        self.populateAccounts()
+        if self.worker and self.is_running:
+            self.worker.apply_inventory(inventory.profiles)
+        self.updateStatus(f"📋 Inventory reloaded ({len(inventory.profiles)} profiles)")
+    
+    def onStartClicked(self):
+        """Handle start button - show MFA dialog or auto-generate code"""
+        account = self.getSelectedAccount()
+        if account is None:
+            InfoBar.warning(
+                title="No profile",
+                content="No profile matches the filter.",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+            return
+        mfa_secret_key = CONFIG.get("mfa_secret_key", "")
+
+        # A still-valid MFA session from the last run - no prompt, no get-session-token
+        if resumable_session(CONFIG):
+            InfoBar.info(
+                title="MFA Session",
+                content="Resuming the cached MFA session",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=2000,
+                parent=self
+            )
+            self.startCredentialProcess(account, None)
+            return
+        
+        if not mfa_secret_key:
+            mfaDialog = MFADialog(account['name'], self)
+            
+            if mfaDialog.exec():
+                mfa_code = mfaDialog.mfaInput.text()
+                self.startCredentialProcess(account, mfa_code)
+        else:
+            # The worker generates the code right before sending it (waiting out a used / expiring window there)
+            try:
+                totp = totp_from_config(mfa_secret_key, CONFIG)
+            except ValueError as e:
+                debug_log(f"onStartClicked: invalid MFA secret: {e}")
+                totp = None
+            
+            if not totp:
+                InfoBar.error(
+                    title="MFA Generation Error",
+                    content="Failed to generate MFA code automatically. Please check your secret key configuration.",
+                    orient=Qt.Horizontal,
+                    isClosable=True,
+                    position=InfoBarPosition.TOP,
+                    duration=5000,
+                    parent=self
+                )
+                return
+            
+            InfoBar.info(
+                title="Auto MFA",
+                content=f"MFA code generated automatically ({totp.remaining():.0f}s left in this window)",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=2000,
+                parent=self
+            )
+            self.startCredentialProcess(account, totp)
+    
+    def startCredentialProcess(self, account, mfa_code):
+        """Start credential process"""
+
+        self.is_running = True
+        self.startButton.hide()
+        self.stopButton.show()
+        self.accountCombo.setEnabled(False)
+        self.accountFilter.setEnabled(False)
+        self.npmTokenCheck.setEnabled(False)
+        self.pipTokenCheck.setEnabled(False)
+
+        self.updateStatus("🔄 Starting...")
+
+        InfoBar.success(
+            title="Starting",
+            content=f"Default: {account['name']} | All profiles will be renewed",
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=2000,
+            parent=self
+        )
+
+        signals = WorkerSignals()
+        signals.status_update.connect(self.updateStatus)
+        signals.progress_update.connect(self.updateProgress)
+        signals.finished.connect(self.onProcessFinished)
+        signals.metrics_update.connect(self.updateMetrics)
+        signals.breaker_update.connect(self.updateBreakers)
+        signals.log_message.connect(self.logPanel.scheduleRefresh)
+        signals.default_changed.connect(self.showSelectedProfile)
+
+        self.worker = AWSCredentialWorker(
+            account['name'], self.inventory.profiles, mfa_code, CONFIG, signals,
+            npm_token=self.npmTokenCheck.isChecked(),
+            pip_token=self.pipTokenCheck.isChecked()
+        )
+        self.worker.start()
+    
+    def onStopClicked(self):
+        """Handle stop button"""
+        if self.worker:
+            self.updateStatus("⏸️ Stopping...")
+            self.worker.stop()
+    
+    def onRenewNowClicked(self):
+        """Handle tray 'Renew Now' - wake the worker's scheduler immediately"""
+        if self.worker and self.is_running:
+            self.updateStatus("🔄 Renewing now...")
+            self.worker.renew_now()
+    
+    def onViewLogsClicked(self):
+        """Toggle the live log panel in place of the background image"""
+        showing = self.leftStack.currentWidget() is self.logPanel
+        debug_log(f"onViewLogsClicked: {'hiding' if showing else 'showing'} log panel")
+        if not showing and not LOG_PATH.exists():
+            self.createLogPlaceholder()
+        self.setFixedSize(*(self.WINDOW_SIZE if showing else self.LOG_WINDOW_SIZE))
+        self.leftStack.setCurrentWidget(self.backgroundWidget if showing else self.logPanel)
+        self.viewLogsLink.setText("View Logs" if showing else "Hide Logs")
+
+    def createLogPlaceholder(self):
+        """First line of a not-yet-written log file - returns False (after telling the user) when it cannot be created"""
+        log_file = LOG_PATH
+        if not log_file.exists():
+            debug_log("createLogPlaceholder: file does not exist, creating placeholder")
+            try:
+                log_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(log_file, "a", encoding="utf-8") as f:
+                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    f.write(f"[{timestamp}] Log file created. Start the service to see activity.\n")
+                debug_log("createLogPlaceholder: placeholder created successfully")
+            except Exception as e:
+                debug_log(f"createLogPlaceholder: failed to create placeholder: {e}\n{traceback.format_exc()}")
+                InfoBar.error(
+                    title="Cannot Create Log",
+                    content=str(e),
+                    orient=Qt.Horizontal,
+                    isClosable=True,
+                    position=InfoBarPosition.TOP,
+                    duration=4000,
+                    parent=self
+                )
+                return False
+        return True
+
+    def openLogFile(self):
+        """Open the whole log file in an external editor"""
+        log_file = LOG_PATH
+        if not self.createLogPlaceholder():
+            return
+
+        if sys.platform != 'win32':
+            opener = "open" if sys.platform == 'darwin' else "xdg-open"
+            try:
+                subprocess.Popen([opener, str(log_file)])
+            except Exception as e:
+                debug_log(f"openLogFile: {opener} failed: {e}")
+                InfoBar.error(
+                    title="Cannot Open Log",
+                    content=f"{e}",
+                    orient=Qt.Horizontal,
+                    isClosable=True,
+                    position=InfoBarPosition.TOP,
+                    duration=4000,
+                    parent=self
+                )
+            return
+
+        # Open with notepad directly - .log files often have no file association,
+        # which causes os.startfile to silently do nothing.
+        try:
+            debug_log(f"openLogFile: launching notepad for {log_file}")
+            subprocess.Popen(["notepad.exe", str(log_file)])
+            debug_log("openLogFile: notepad launched successfully")
+        except Exception as e:
+            debug_log(f"openLogFile: notepad failed: {e}\n{traceback.format_exc()}")
+            # Fallback to os.startfile in case notepad isn't on PATH for some reason
+            try:
+                debug_log("openLogFile: trying os.startfile fallback")
+                os.startfile(str(log_file))
+                debug_log("openLogFile: os.startfile fallback returned")
+            except Exception as e2:
+                debug_log(f"openLogFile: os.startfile fallback failed: {e2}\n{traceback.format_exc()}")
+                InfoBar.error(
+                    title="Cannot Open Log",
+                    content=f"{e2}",
+                    orient=Qt.Horizontal,
+                    isClosable=True,
+                    position=InfoBarPosition.TOP,
+                    duration=4000,
+                    parent=self
+                )
+    
+    def updateStatus(self, message):
+        """Update status label"""
+        self.statusLabel.setText(message)
+    
+    def updateMetrics(self, summary):
+        """Show the last renewal cycle's summary"""
+        self.metricsLabel.setText(summary)
+        self.metricsLabel.show()
+    
+    def updateBreakers(self, summary):
+        """Show the profiles currently paused by their circuit breaker (empty hides the label)"""
+        lines = summary.splitlines()
+        if not lines:
+            self.breakerLabel.hide()
+            return
+        more = f" (+{len(lines) - 1} more)" if len(lines) > 1 else ""
+        self.breakerLabel.setText(f"{lines[0]}{more}")
+        self.breakerLabel.setToolTip(summary)
+        self.breakerLabel.show()
+    
+    def updateProgress(self, show):
+        """Show/hide progress ring"""
+        if show:
+            self.progressRing.show()
+        else:
+            self.progressRing.hide()
+    
+    def onProcessFinished(self, success, message):
+        """Handle process completion"""
+        
+        self.is_running = False
+        self.startButton.show()
+        self.stopButton.hide()
+        self.accountCombo.setEnabled(True)
+        self.accountFilter.setEnabled(True)
+        self.npmTokenCheck.setEnabled(True)
+        self.pipTokenCheck.setEnabled(True)
+        self.progressRing.hide()
+        
+        if success:
+            self.statusLabel.setText("⚪ Ready")
+            InfoBar.success(
+                title="Completed",
+                content=message,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+        else:
+            self.statusLabel.setText("❌ Error")
+            InfoBar.error(
+                title="Failed",
+                content=message,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=5000,
+                parent=self
+            )
+    
+    def closeEvent(self, event):
+        """Handle window close - minimize to tray"""
+        if not self.shouldReallyClose:
+            event.ignore()
+            self.hide()
+            self.trayIcon.show()
+            self.trayIcon.showMessage(
+                "AWS Credential Manager",
+                "Application minimized to system tray",
+                QSystemTrayIcon.Information,
+                2000
+            )
+        else:
+            if self.worker:
+                self.worker.stop()
+            self.inventoryWatcher.stop()
+            self.trayIcon.hide()
+            event.accept()
+    
+    def reallyClose(self):
+        """Actually close the application"""
+        self.shouldReallyClose = True
+        self.close()
+
+def main(options=None, instance=None, inventory=None):
+    """Main entry point - `instance` is the InstanceServer later launches hand their arguments to,
+    `inventory` the one awsManager.main() loaded (and applied to CONFIG) before logging started"""
+    
+    # Enable high DPI scaling
+    QApplication.setHighDpiScaleFactorRoundingPolicy(
+        Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
+    QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
+    QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
+    
+    app = QApplication(sys.argv)
+    app.setApplicationName("awsCredentialsManager")
+    
+    window = AWSManagerWindow(inventory)
+    if options and options.default_profile:
+        window.selectProfile(options.default_profile)
+    if instance:
+        instance.attach(window.onInstanceHandoff)
+    window.show()
+    
+    try:
+        return app.exec_()
+    finally:
+        if instance:
+            instance.stop()
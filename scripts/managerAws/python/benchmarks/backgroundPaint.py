@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Background paint benchmark - scale-on-every-paint vs the cached BackgroundImageWidget
+
+Usage:
+    python benchmarks/backgroundPaint.py [--paints 200] [--image path/to/large.jpg]
+    QT_SCALE_FACTOR=2 python benchmarks/backgroundPaint.py      # high-DPI screen
+
+Runs on Qt's offscreen platform (no window appears). Measures widget start-up (how long the UI thread
+is held by the image load), steady repaints at the window's size, and a 40-step resize drag that
+repaints at every step - the cost InfoBar animations, status updates and tray restores pay.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt5.QtCore import Qt  # noqa: E402
+from PyQt5.QtGui import QPixmap, QPainter  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QWidget  # noqa: E402
+
+app = QApplication(sys.argv)
+
+import awsManagerGui  # noqa: E402
+from awsManagerGui import BackgroundImageWidget, AWSManagerWindow  # noqa: E402
+
+WIDGET_SIZE = (AWSManagerWindow.WINDOW_SIZE[0] - AWSManagerWindow.PANEL_WIDTH, AWSManagerWindow.WINDOW_SIZE[1])
+
+
+class LegacyBackgroundWidget(QWidget):
+    """The pre-cache widget: synchronous QPixmap load, smooth rescale of the full image in every paintEvent"""
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.backgroundPixmap = QPixmap(str(path))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        scaled = self.backgroundPixmap.scaled(self.size(), Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+        painter.drawPixmap((self.width() - scaled.width()) // 2, (self.height() - scaled.height()) // 2, scaled)
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def repaint_ms(widget, count):
+    """Per-repaint milliseconds (repaint() runs paintEvent synchronously)"""
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        widget.repaint()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def drag_ms(widget, steps):
+    """A resize drag: grow the widget a few pixels at a time, repainting every step, then let it settle"""
+    width, height = WIDGET_SIZE
+    started = time.perf_counter()
+    for step in range(steps):
+        widget.resize(width + step * 4, height + step * 2)
+        app.processEvents()
+        widget.repaint()
+    during = (time.perf_counter() - started) * 1000
+    wait_until(lambda: not getattr(widget, "resizeTimer", None) or not widget.resizeTimer.isActive())
+    widget.repaint()
+    return during / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paints", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=40)
+    parser.add_argument("--image", default="", help="background image (default: the bundled background.jpg)")
+    args = parser.parse_args()
+
+    image = Path(args.image or awsManagerGui.resource_path("background.jpg"))
+    if args.image:
+        awsManagerGui.resource_path = lambda name: str(image) if name == "background.jpg" else name
+
+    started = time.perf_counter()
+    legacy = LegacyBackgroundWidget(image)
+    legacy_startup = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    cached = BackgroundImageWidget(presetSizes=[WIDGET_SIZE])
+    cached_startup = (time.perf_counter() - started) * 1000
+    wait_until(lambda: cached.sourceImage is not None)
+    cached_ready = (time.perf_counter() - started) * 1000
+
+    for widget in (legacy, cached):
+        widget.resize(*WIDGET_SIZE)
+        widget.show()
+    app.processEvents()
+
+    source = QPixmap(str(image)).size()
+    print(f"image {source.width()}x{source.height()}, widget {WIDGET_SIZE[0]}x{WIDGET_SIZE[1]}, "
+          f"device pixel ratio {cached.devicePixelRatioF():g}")
+    print(f"{'':<10} {'startup ms':>10} {'ready ms':>9} {'paint p50':>10} {'paint p95':>10} {'drag ms/step':>13}")
+    for name, widget, startup, ready in (("legacy", legacy, legacy_startup, legacy_startup),
+                                         ("cached", cached, cached_startup, cached_ready)):
+        samples = sorted(repaint_ms(widget, args.paints))
+        drag = drag_ms(widget, args.steps)
+        print(f"{name:<10} {startup:>10.1f} {ready:>9.1f} {statistics.median(samples):>10.3f} "
+              f"{samples[int(len(samples) * 0.95) - 1]:>10.3f} {drag:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
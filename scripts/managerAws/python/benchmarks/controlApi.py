@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Control API benchmark - `status` latency while idle and while a renewal cycle is running
+
+Usage:
+    python benchmarks/controlApi.py                              # 500 accounts, Unix socket
+    python benchmarks/controlApi.py --transport http --accounts 100 --latency-ms 80
+    python benchmarks/controlApi.py --interval-ms 100                # a prompt-style poller instead of back-to-back calls
+
+Starts a worker against a FakeAwsServer in a temporary HOME, then polls GET /status over one keep-alive
+connection from a separate process (the way a shell prompt or monitoring script would) during the first
+renewal cycle and again once it is idle. Reports client-side round trips, the server-side cost of
+status_json() and how long the renewal cycle took with and without a poller hammering the API.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import awsManager  # noqa: E402
+from fakeAws import FakeAwsServer  # noqa: E402
+
+
+def connect():
+    """Keep-alive connection to the control API described in control.json"""
+    info = json.loads((awsManager.state_dir() / awsManager.ControlServer.INFO_NAME).read_text())
+    if "socket" in info:
+        return awsManager.UnixHTTPConnection(info["socket"], 5.0), {}
+    address = urlsplit(info["url"])
+    return http.client.HTTPConnection(address.hostname, address.port, timeout=5.0), {"Authorization": info["token"]}
+
+
+def run_poller(interval):
+    """Child process: GET /status every `interval` seconds (0 = back to back) until stdin closes,
+    then print the round-trip milliseconds"""
+    stop = threading.Event()
+    threading.Thread(target=lambda: (sys.stdin.read(), stop.set()), daemon=True).start()
+    conn, headers = connect()
+    samples = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn.request("GET", "/status", headers=headers)
+        response = conn.getresponse()
+        response.read()
+        samples.append((time.perf_counter() - started) * 1000)
+        if interval:
+            stop.wait(interval)
+    conn.close()
+    print(json.dumps(samples))
+
+
+class Poller:
+    """A run_poller() child process in the current HOME"""
+
+    def __init__(self, interval_ms):
+        self.process = subprocess.Popen([sys.executable, __file__, "--poll", "--interval-ms", str(interval_ms)],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def stop(self):
+        out, _ = self.process.communicate(b"")
+        return json.loads(out)
+
+
+def run_cycle(args, server, poller):
+    """One MFA login + renewal cycle; returns (cycle seconds, status samples during it, idle samples, status_json µs)"""
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = os.environ["USERPROFILE"] = home
+        aws_dir = Path(home) / ".aws"
+        aws_dir.mkdir()
+        (aws_dir / "credentials").write_text("[nice-identity]\naws_access_key_id = AKIDFAKE\naws_secret_access_key = fake\n")
+        config = dict(awsManager.CONFIG, sts_endpoint_url=server.url, codeartifact_endpoint_url=server.url,
+                      metrics_snapshot=False, control_transport=args.transport)
+        accounts = [{"id": f"{100000000000 + i}", "name": f"bench-{i:03d}"} for i in range(args.accounts)]
+
+        done = threading.Event()
+        signals = awsManager.CallbackSignals()
+        signals.metrics_update.connect(lambda text: done.set())
+        worker = awsManager.AWSCredentialWorker(accounts[0]["name"], accounts, "123456", config, signals)
+
+        started = time.perf_counter()
+        worker.start()
+        busy, idle = [], []
+        if poller:
+            while worker.control_server is None and not done.is_set():
+                time.sleep(0.001)
+            child = Poller(args.interval_ms)
+        done.wait()
+        cycle = time.perf_counter() - started
+        if poller:
+            busy = child.stop()
+            child = Poller(args.interval_ms)
+            time.sleep(args.seconds)
+            idle = child.stop()
+
+        # Server side: a cached document, and a re-serialization after a change
+        count = 2000
+        t0 = time.perf_counter()
+        for _ in range(count):
+            worker.status_json()
+        cached_us = (time.perf_counter() - t0) / count * 1e6
+        t0 = time.perf_counter()
+        for _ in range(200):
+            worker.note_status(None)
+            worker.status_json()
+        rebuild_us = (time.perf_counter() - t0) / 200 * 1e6
+
+        worker.stop()
+        worker.join()
+        return cycle, busy, idle, cached_us, rebuild_us
+
+
+def describe(samples):
+    samples = sorted(samples)
+    if not samples:
+        return "no samples"
+    return (f"{len(samples):>7} calls  p50 {statistics.median(samples):.3f}  p99 {samples[int(len(samples) * 0.99) - 1]:.3f}  "
+            f"max {samples[-1]:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--transport", choices=["auto", "http"], default="auto")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--seconds", type=float, default=2.0, help="how long to poll once idle")
+    parser.add_argument("--interval-ms", type=float, default=0, help="pause between status calls (default 0 = back to back)")
+    parser.add_argument("--repeat", type=int, default=2, help="cycles per mode - the fastest of each is compared")
+    parser.add_argument("--poll", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.poll:
+        return run_poller(args.interval_ms / 1000)
+
+    log_dir = Path(tempfile.mkdtemp(prefix="awsManagerBench"))
+    awsManager.LOG_PATH = log_dir / "aws_manager.log"
+    awsManager.DEBUG_LOG_PATH = log_dir / "aws_manager_debug.log"
+    awsManager.setup_logging(awsManager.CONFIG)
+
+    server = FakeAwsServer(latency=args.latency_ms / 1000).start()
+    try:
+        # Alternate the modes - successive cycles in one process drift, so compare the best of each
+        alone, polled = [], []
+        for _ in range(args.repeat):
+            alone.append(run_cycle(args, server, poller=False)[0])
+            polled.append(run_cycle(args, server, poller=True))
+        cycle, busy, idle, cached_us, rebuild_us = min(polled, key=lambda r: r[0])
+    finally:
+        server.stop()
+
+    print(f"accounts={args.accounts} transport={args.transport} latency={args.latency_ms:g}ms interval={args.interval_ms:g}ms")
+    print(f"status during renewal: {describe(busy)}")
+    print(f"status while idle:     {describe(idle)}")
+    print(f"status_json(): cached {cached_us:.2f} µs, after a change {rebuild_us:.0f} µs")
+    print(f"renewal cycle: {min(alone):.2f} s alone, {cycle:.2f} s while polled (best of {args.repeat})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fake AWS for benchmarks - no network, no real AWS
+
+CLI stand-in (for the "cli" backend, CONFIG['aws_cli'] = '"python" "benchmarks/fakeAws.py"'):
+    python benchmarks/fakeAws.py sts assume-role --role-arn ... --query Credentials --output json
+    latency / failures from FAKE_AWS_LATENCY_MS and FAKE_AWS_FAILURE_RATE
+
+HTTP stand-in (for the "native" backend, CONFIG['sts_endpoint_url'] = server.url):
+    server = FakeAwsServer(latency=0.05, failure_rate=0.01).start()
+    server.unavailable = True   # every STS call now answers 503 ServiceUnavailable (regional outage)
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+STS_NS = "https://sts.amazonaws.com/doc/2011-06-15/"
+THROTTLED = ("Throttling", "Rate exceeded")
+
+
+def fake_credentials(lifetime=3600):
+    now = time.time()
+    return {
+        "AccessKeyId": f"ASIAFAKE{random.randrange(10 ** 12):012d}",
+        "SecretAccessKey": "fake" + "x" * 36,
+        "SessionToken": "FwoGZXIvYXdzE" + "t" * 600,
+        "Expiration": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now + lifetime)),
+    }
+
+
+# --- CLI MODE ---
+
+def run_cli(argv):
+    """Mimic the handful of aws CLI calls the worker makes"""
+    time.sleep(float(os.environ.get("FAKE_AWS_LATENCY_MS", "0")) / 1000)
+    if random.random() < float(os.environ.get("FAKE_AWS_FAILURE_RATE", "0")):
+        code, message = THROTTLED
+        operation = "AssumeRole" if argv[:2] == ["sts", "assume-role"] else "Unknown"
+        print(f"\nAn error occurred ({code}) when calling the {operation} operation: {message}", file=sys.stderr)
+        return 254
+
+    command = argv[:2]
+    if command == ["sts", "get-session-token"]:
+        print(json.dumps({"Credentials": fake_credentials(36 * 3600)}))
+    elif command == ["sts", "assume-role"]:
+        print(json.dumps(fake_credentials()))
+    elif command == ["codeartifact", "get-authorization-token"]:
+        expiration = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(time.time() + 12 * 3600))
+        print(f"fake-codeartifact-token\t{expiration}")
+    elif command == ["codeartifact", "login"]:
+        print("Successfully configured pip to use AWS CodeArtifact repository (fake)")
+    else:
+        print(f"fakeAws: unsupported command {' '.join(argv)}", file=sys.stderr)
+        return 252
+    return 0
+
+
+# --- HTTP MODE ---
+
+class FakeAwsHandler(BaseHTTPRequestHandler):
+    """STS Query API (XML) + CodeArtifact GetAuthorizationToken (JSON)"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes - avoid the delayed-ACK stall
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+        with server.lock:
+            server.requests += 1
+            server.request_times.append(time.monotonic())
+        time.sleep(server.latency)
+
+        path = urlsplit(self.path).path
+        if path == "/v1/authorization-token":
+            if random.random() < server.failure_rate:
+                return self.reply(429, json.dumps({"message": THROTTLED[1]}), "application/json",
+                                  {"x-amzn-ErrorType": "ThrottlingException"})
+            payload = {"authorizationToken": "fake-codeartifact-token", "expiration": time.time() + 12 * 3600}
+            return self.reply(200, json.dumps(payload), "application/json")
+
+        action = parse_qs(body).get("Action", [""])[0]
+        if server.unavailable:
+            return self.reply(503, f'<ErrorResponse xmlns="{STS_NS}"><Error><Type>Receiver</Type><Code>ServiceUnavailable</Code>'
+                                   f'<Message>Service is unavailable</Message></Error></ErrorResponse>', "text/xml")
+        if random.random() < server.failure_rate:
+            code, message = THROTTLED
+            return self.reply(400, f'<ErrorResponse xmlns="{STS_NS}"><Error><Type>Sender</Type><Code>{code}</Code>'
+                                   f'<Message>{message}</Message></Error></ErrorResponse>', "text/xml")
+
+        creds = fake_credentials(36 * 3600 if action == "GetSessionToken" else 3600)
+        fields = "".join(f"<{k}>{v}</{k}>" for k, v in creds.items())
+        self.reply(200, f'<{action}Response xmlns="{STS_NS}"><{action}Result><Credentials>{fields}</Credentials>'
+                        f'</{action}Result></{action}Response>', "text/xml")
+
+    def do_GET(self):
+        # Latency probes hit "/" - answer like STS does for an unsigned GET
+        time.sleep(self.server.latency)
+        self.reply(302, "", "text/plain", {"Location": "https://aws.amazon.com/iam"})
+
+    def reply(self, status, body, content_type, headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeAwsServer(ThreadingHTTPServer):
+    """Loopback STS/CodeArtifact stand-in with configurable latency (seconds) and failure rate (0..1)"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, latency=0.0, failure_rate=0.0, port=0):
+        super().__init__(("127.0.0.1", port), FakeAwsHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.unavailable = False
+        self.requests = 0
+        self.request_times = []  # monotonic arrival time of every POST, for rate checks
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="fake-aws", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli(sys.argv[1:]))
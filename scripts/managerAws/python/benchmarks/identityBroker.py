@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Identity broker benchmark - several identities renewing at once through one pool and one STS rate limiter
+
+Usage:
+    python benchmarks/identityBroker.py                                   # 3 identities x 100 accounts, 50 calls/s
+    python benchmarks/identityBroker.py --identities 4 --accounts 200 --rate 100 --pool 32 --latency-ms 80
+
+Every identity logs in with its own MFA session and renews its own accounts against one FakeAwsServer.
+Reports per-identity status and throughput, the total wall time and the highest STS request rate the
+fake server saw in any one-second window (which the shared token bucket must keep at or under --rate + burst).
+"""
+
+import argparse
+import bisect
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import awsManager  # noqa: E402
+from fakeAws import FakeAwsServer  # noqa: E402
+
+
+def peak_rate(times, window=1.0):
+    """Most requests in any `window` seconds"""
+    times = sorted(times)
+    return max((bisect.bisect_right(times, t + window) - i for i, t in enumerate(times)), default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--identities", type=int, default=3)
+    parser.add_argument("--accounts", type=int, default=100, help="accounts per identity")
+    parser.add_argument("--rate", type=float, default=50, help="sts_rate_per_second (0 = unlimited)")
+    parser.add_argument("--burst", type=float, default=0, help="sts_burst (default: same as --rate)")
+    parser.add_argument("--pool", type=int, default=16, help="broker_pool_size")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    log_dir = Path(tempfile.mkdtemp(prefix="awsManagerBench"))
+    awsManager.LOG_PATH = log_dir / "aws_manager.log"
+    awsManager.DEBUG_LOG_PATH = log_dir / "aws_manager_debug.log"
+    awsManager.setup_logging(awsManager.CONFIG)
+
+    home = tempfile.mkdtemp(prefix="awsManagerBench")
+    os.environ["HOME"] = os.environ["USERPROFILE"] = home
+    aws_dir = Path(home) / ".aws"
+    aws_dir.mkdir()
+    (aws_dir / "credentials").write_text("".join(
+        f"[identity-{i}]\naws_access_key_id = AKIDFAKE{i}\naws_secret_access_key = fake\n\n" for i in range(args.identities)))
+
+    server = FakeAwsServer(latency=args.latency_ms / 1000).start()
+    config = dict(awsManager.CONFIG, sts_endpoint_url=server.url, codeartifact_endpoint_url=server.url,
+                  sts_rate_per_second=args.rate, sts_burst=args.burst or args.rate, broker_pool_size=args.pool,
+                  metrics_snapshot=False, resume_mfa_session=False)
+    identities = [{
+        "name": f"id{i}",
+        "settings": {"user": f"bench-user-{i}", "source_profile": f"identity-{i}"},
+        "accounts": [{"id": f"{100000000000 + i * 10000 + n}", "name": f"id{i}-acct-{n:03d}"} for n in range(args.accounts)],
+        "mfa_code": "123456",
+    } for i in range(args.identities)]
+
+    signals = awsManager.CallbackSignals()
+    first_cycles = {}
+    done = threading.Event()
+
+    def on_cycle(summary):
+        name = summary[1:summary.index("]")]
+        first_cycles.setdefault(name, time.perf_counter() - started)
+        if len(first_cycles) == args.identities:
+            done.set()
+
+    signals.metrics_update.connect(on_cycle)
+    signals.finished.connect(lambda success, message: done.set())
+    broker = awsManager.IdentityBroker(identities, config, signals)
+
+    started = time.perf_counter()
+    broker.start()
+    done.wait()
+    wall = time.perf_counter() - started
+    rows = broker.status()
+    broker.stop()
+    broker.join()
+    server.stop()
+
+    total = args.identities * (args.accounts + 1)
+    print(f"{args.identities} identities x {args.accounts} accounts, rate={args.rate:g}/s pool={args.pool} latency={args.latency_ms:g}ms")
+    print(f"{'identity':>8} {'profiles':>8} {'renewed':>8} {'errors':>7} {'avg ms':>7} {'first cycle s':>13}")
+    for row in rows:
+        print(f"{row['identity']:>8} {row['profiles']:>8} {row['renewed']:>8} {row['errors']:>7} "
+              f"{row['avg_ms'] or 0:>7.1f} {first_cycles.get(row['identity'], 0):>13.2f}")
+    print(f"STS calls: {total} in {wall:.2f}s = {total / wall:.1f}/s overall, peak {peak_rate(server.request_times)} in any 1s window")
+    if broker.limiter:
+        print(f"limiter held calls for {broker.limiter.waited_seconds:.1f}s in total")
+
+
+if __name__ == '__main__':
+    main()
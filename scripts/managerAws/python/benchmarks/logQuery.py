@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log query benchmark - `awsManager.py logs` (mmap + sidecar index) vs reading and filtering every file
+
+Usage: python benchmarks/logQuery.py [--mb 300] [--backups 5] [--format text|json] [--no-naive]
+Writes a synthetic history (the live log + rotated backups, ~1 day per file, with errors and tracebacks)
+into a temporary directory, then times the same queries cold (no sidecar yet), warm, and the naive way.
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from awsManager import LogQuery, log_history, LOG_ERROR_MARKERS, LOG_RECORD_RE  # noqa: E402
+
+PROFILES = [f"team-{i:03d}-app" for i in range(200)]
+TRACEBACK = ("Traceback (most recent call last):\n  File \"awsManager.py\", line 812, in sts_call\n"
+             "    raise RuntimeError(message)\nRuntimeError: Rate exceeded\n")
+
+
+def write_history(log_path, total_mb, backups, fmt, start):
+    """The live log plus `backups` rotated files, oldest in .N - returns (first, last) timestamp"""
+    files = [Path(f"{log_path}.{n}") for n in range(backups, 0, -1)] + [log_path]
+    per_file = int(total_mb * 1e6 / len(files))
+    rng = random.Random(7)
+    stamp = start
+    for path in files:
+        chunks, size = [], 0
+        while size < per_file:
+            stamp += timedelta(milliseconds=rng.randrange(50, 400))
+            profile = rng.choice(PROFILES)
+            roll = rng.random()
+            if roll < 0.003:
+                msg, tail = f"❌ {profile}: Failed: An error occurred (Throttling) when calling AssumeRole", TRACEBACK
+            else:
+                msg, tail = f"✅ {profile} renewed (expires in 59 min)", ""
+            if fmt == "json":
+                line = json.dumps({"ts": stamp.isoformat(timespec="milliseconds"), "level": "ERROR" if tail else "INFO",
+                                   "msg": msg, "profile": profile}, ensure_ascii=False) + "\n"
+            else:
+                line = f"[{stamp:%Y-%m-%d %H:%M:%S}] {msg}\n{tail}"
+            chunks.append(line)
+            size += len(line)
+        path.write_text("".join(chunks), encoding="utf-8")
+    return start, stamp
+
+
+def naive(log_path, backups, since, until, names, errors):
+    """What grepping by hand amounts to: read every file, walk every line"""
+    count = 0
+    for path in log_history(log_path, backups):
+        keep = False
+        for line in path.read_bytes().splitlines(keepends=True):
+            match = LOG_RECORD_RE.match(line)
+            if match:
+                key = f"{match.group(1).decode()} {match.group(2).decode()}"
+                keep = ((not since or key >= since) and (not until or key <= until)
+                        and (not errors or any(m in line for m in LOG_ERROR_MARKERS)) and (not names or any(n.encode() in line for n in names)))
+                count += bool(keep)
+    return count
+
+
+def timed(fn, trace=True):
+    """(result, seconds, peak Python MB) - timed and traced in separate runs, tracing slows allocation down"""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    if not trace:
+        return result, elapsed, None
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def run_query(log_path, backups, q):
+    query = LogQuery(q.get("since"), q.get("until"), q.get("names", ()), q.get("errors", False))
+    return sum(1 for _ in query.run(log_path, backups)), query.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=float, default=300, help="total history size")
+    parser.add_argument("--backups", type=int, default=5)
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument("--no-naive", dest="naive", action="store_false", help="skip the (slow) read-everything baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "aws_manager.log"
+        first, last = write_history(log_path, args.mb, args.backups, args.format, datetime(2026, 10, 1))
+        mid = first + (last - first) / 2
+        fmt = "%Y-%m-%d %H:%M:%S"
+        window = (mid.strftime(fmt), (mid + timedelta(hours=1)).strftime(fmt))
+        queries = [
+            ("1h window", dict(since=window[0], until=window[1])),
+            ("errors only", dict(errors=True)),
+            ("one profile", dict(names=["team-042-app"])),
+            ("errors, 1h, profile", dict(since=window[0], until=window[1], names=["team-042-app"], errors=True)),
+            ("last 15 min", dict(since=(last - timedelta(minutes=15)).strftime(fmt))),
+        ]
+        total = sum(p.stat().st_size for p in log_history(log_path, args.backups))
+        print(f"history: {total / 1e6:.0f} MB in {args.backups + 1} files, {args.format}, {first:%m-%d %H:%M} .. {last:%m-%d %H:%M}")
+        print(f"{'query':<22} {'records':>8} | {'cold ms':>8} {'warm ms':>8} {'MB scanned':>10} {'peak MB':>8} | {'naive ms':>9}")
+        print("-" * 86)
+        for name, q in queries:
+            (count, _), cold, _ = timed(lambda: run_query(log_path, args.backups, q), trace=False)
+            (_, stats), warm, peak = timed(lambda: run_query(log_path, args.backups, q))
+            if args.naive:
+                naive_count, naive_s, _ = timed(lambda: naive(log_path, args.backups, q.get("since"), q.get("until"),
+                                                              q.get("names", ()), q.get("errors", False)), trace=False)
+                naive_ms = f"{naive_s * 1000:>9.0f}" + ("" if naive_count == count else f"  (naive found {naive_count})")
+            else:
+                naive_ms = f"{'-':>9}"
+            print(f"{name:<22} {count:>8} | {cold * 1000:>8.0f} {warm * 1000:>8.0f} {stats['bytes_scanned'] / 1e6:>10.1f} "
+                  f"{peak:>8.1f} | {naive_ms}")
+            sidecar = Path(f"{log_path}.idx")
+            index_bytes = sidecar.stat().st_size
+            sidecar.unlink()  # next query starts cold again
+        print(f"sidecar index: {index_bytes / 1024:.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End-to-end renewal benchmark - AWSCredentialWorker against a fake STS, 2 to 500 accounts
+
+Usage:
+    python benchmarks/renewalCycle.py                                   # native backend, 50 ms latency
+    python benchmarks/renewalCycle.py --backend cli --accounts 2,10,50  # spawns benchmarks/fakeAws.py per call
+    python benchmarks/renewalCycle.py --latency-ms 200 --failure-rate 0.05 --json results.json
+    python benchmarks/renewalCycle.py --sts-rate 50                     # with the production STS rate limit
+
+Runs one MFA login + one full renewal cycle per account count in a temporary HOME,
+with no network and no real AWS. Reports cycle wall time, CPU time, file I/O and peak memory.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import awsManager  # noqa: E402
+from fakeAws import FakeAwsServer  # noqa: E402
+
+
+def process_write_bytes():
+    """Bytes this process has written so far (Linux only, else None)"""
+    try:
+        with open("/proc/self/io") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("wchar:"))
+    except (OSError, StopIteration):
+        return None
+
+
+def run_cycle(accounts, args, server):
+    """One MFA login + one renewal cycle in a throwaway HOME; returns the measurements"""
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = os.environ["USERPROFILE"] = home
+        aws_dir = Path(home) / ".aws"
+        aws_dir.mkdir()
+        (aws_dir / "credentials").write_text("[nice-identity]\naws_access_key_id = AKIDFAKE\naws_secret_access_key = fake\n")
+
+        config = dict(
+            awsManager.CONFIG,
+            credential_backend=args.backend,
+            aws_cli=f'"{sys.executable}" "{HERE / "fakeAws.py"}"',
+            sts_endpoint_url=server.url,
+            codeartifact_endpoint_url=server.url,
+            renewal_concurrency=args.concurrency,
+            sts_rate_per_second=args.sts_rate,
+            metrics_snapshot=False,
+        )
+        os.environ["FAKE_AWS_LATENCY_MS"] = str(args.latency_ms)
+        os.environ["FAKE_AWS_FAILURE_RATE"] = str(args.failure_rate)
+        account_list = [{"id": f"{100000000000 + i}", "name": f"bench-{i:03d}"} for i in range(accounts)]
+
+        done = threading.Event()
+        signals = awsManager.CallbackSignals()
+        summary = {}
+        signals.metrics_update.connect(lambda text: (summary.update(text=text), done.set()))
+        signals.finished.connect(lambda success, message: done.set())
+
+        worker = awsManager.AWSCredentialWorker(account_list[0]["name"], account_list, "123456", config, signals)
+
+        tracemalloc.reset_peak()
+        cpu_before = os.times()
+        written_before = process_write_bytes()
+        started = time.perf_counter()
+
+        worker.start()
+        done.wait()
+        wall = time.perf_counter() - started
+        worker.stop()
+        worker.join()
+
+        cpu_after = os.times()
+        written_after = process_write_bytes()
+        cpu = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+        children_cpu = (cpu_after.children_user - cpu_before.children_user) + (cpu_after.children_system - cpu_before.children_system)
+
+        series = worker.metrics.snapshot()["series"]
+        ok = sum(v["ok"] for k, v in series.items() if k.startswith("assume_role/"))
+        return {
+            "accounts": accounts,
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "children_cpu_s": round(children_cpu, 3),
+            "renewed": ok,
+            "store_files_written": worker.store.stats["files_written"],
+            "store_bytes_written": worker.store.stats["bytes_written"],
+            "process_bytes_written": None if written_before is None else written_after - written_before,
+            "peak_python_mb": round(tracemalloc.get_traced_memory()[1] / 1e6, 2),
+            "summary": summary.get("text", ""),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accounts", default="2,10,50,100,250,500")
+    parser.add_argument("--backend", choices=["native", "cli"], default="native")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=awsManager.CONFIG.get("renewal_concurrency", 8))
+    parser.add_argument("--sts-rate", type=float, default=0, help="sts_rate_per_second (default 0 = unlimited)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    # Keep the benchmark's own logs out of the real log files
+    log_dir = Path(tempfile.mkdtemp(prefix="awsManagerBench"))
+    awsManager.LOG_PATH = log_dir / "aws_manager.log"
+    awsManager.DEBUG_LOG_PATH = log_dir / "aws_manager_debug.log"
+    awsManager.setup_logging(awsManager.CONFIG)
+
+    home = os.environ.get("HOME"), os.environ.get("USERPROFILE")
+    server = FakeAwsServer(latency=args.latency_ms / 1000, failure_rate=args.failure_rate).start()
+    tracemalloc.start()
+    results = []
+    try:
+        print(f"backend={args.backend} latency={args.latency_ms:g}ms failure_rate={args.failure_rate:g} "
+              f"concurrency={args.concurrency} sts_rate={args.sts_rate:g}")
+        print(f"{'accounts':>8} {'wall s':>8} {'cpu s':>7} {'child cpu':>9} {'renewed':>8} {'writes':>7} {'KB written':>10} {'peak MB':>8}")
+        for accounts in (int(a) for a in args.accounts.split(",")):
+            r = run_cycle(accounts, args, server)
+            results.append(r)
+            written = r["process_bytes_written"] if r["process_bytes_written"] is not None else r["store_bytes_written"]
+            print(f"{r['accounts']:>8} {r['wall_s']:>8.2f} {r['cpu_s']:>7.2f} {r['children_cpu_s']:>9.2f} "
+                  f"{r['renewed']:>8} {r['store_files_written']:>7} {written / 1024:>10.0f} {r['peak_python_mb']:>8.1f}")
+    finally:
+        server.stop()
+        for key, value in zip(("HOME", "USERPROFILE"), home):
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "results": results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Start-up benchmark - first launch until the window is ready, and second launches handing off to it
+
+Usage:
+    python benchmarks/startupTime.py                                   # python awsManager.py
+    python benchmarks/startupTime.py --exe onefile=dist/AWSCredentialsManager.exe \\
+                                     --exe onedir=dist/AWSCredentialsManager/AWSCredentialsManager.exe
+
+Each launch runs in a temporary HOME (its own instance socket, never the real ~/.aws) on Qt's offscreen
+platform. "ready" is when the running instance answers a hand-off as attached (window built); "hand-off"
+is the wall time of a whole second process - start, hand over --renew, exit - and "round trip" the hand-off
+alone. The onefile build unpacks itself into _MEIPASS on every one of those launches, the onedir build does
+not; the script build recompiles awsManager.py on each (scripts are never cached as .pyc).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+
+import awsManager  # noqa: E402
+
+
+def time_to_ready(command, env, timeout):
+    """Seconds from spawning the first instance until its window has attached to the instance server"""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while time.perf_counter() - started < timeout:
+        reply = awsManager.send_to_instance([], timeout=timeout)
+        if reply and reply[1] != awsManager.InstanceServer.QUEUED:
+            return process, time.perf_counter() - started
+        if process.poll() is not None:
+            break
+        time.sleep(0.005)
+    process.kill()
+    raise RuntimeError(f"{' '.join(command)} did not come up (exit code {process.poll()})")
+
+
+def handoff_times(command, env, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(command + ["--renew"], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        samples.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            raise RuntimeError(f"hand-off failed: {result.stdout.decode()}{result.stderr.decode()}")
+    return samples
+
+
+def round_trip_ms(runs):
+    """The hand-off itself - connect, send, reply - without a process start around it"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        awsManager.send_to_instance(["--renew"])
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--exe", action="append", default=[], metavar="LABEL=PATH", help="a built executable (repeatable)")
+    parser.add_argument("--runs", type=int, default=10, help="hand-off launches per build")
+    parser.add_argument("--starts", type=int, default=3, help="first launches per build")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    builds = [("python", [sys.executable, str(HERE.parent / "awsManager.py")])]
+    builds += [(label, [path]) for label, path in (spec.split("=", 1) if "=" in spec else (Path(spec).stem, spec) for spec in args.exe)]
+
+    print(f"{'build':<10} {'ready s (min / median)':>24} | {'hand-off ms (min / median / max)':>34} | {'round trip ms':>13}")
+    print("-" * 88)
+    for label, command in builds:
+        with tempfile.TemporaryDirectory() as home:
+            # state_dir() follows the home directory - this process and the launches share the temporary one
+            os.environ["HOME"] = os.environ["USERPROFILE"] = home
+            env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+            ready, handoff = [], []
+            for start in range(args.starts):
+                process, seconds = time_to_ready(command, env, args.timeout)
+                ready.append(seconds)
+                try:
+                    if start == 0:
+                        handoff = handoff_times(command, env, args.runs)
+                        trip = round_trip_ms(args.runs)
+                finally:
+                    process.terminate()  # leaves a stale socket behind - the next start has to replace it
+                    process.wait()
+        print(f"{label:<10} {min(ready):>11.2f} / {statistics.median(ready):>10.2f} | "
+              f"{min(handoff) * 1000:>10.0f} / {statistics.median(handoff) * 1000:>10.0f} / {max(handoff) * 1000:>9.0f} | {trip:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+STS endpoint selection benchmark - latency probe, cached order and failover against local stub regions
+
+Usage: python benchmarks/stsEndpoints.py [--latency-ms 80,20,150] [--calls 20]
+
+Starts one FakeAwsServer per "region" with the given latencies plus one unreachable endpoint, then reports:
+the probe result and order, AssumeRole time on the configured-first vs probed-first endpoint, the restart
+cost with a cached probe, and AssumeRole time while the fastest region answers 503.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import awsManager  # noqa: E402
+from fakeAws import FakeAwsServer, fake_credentials  # noqa: E402
+
+REGIONS = ["us-west-2", "eu-west-1", "ap-south-1"]
+
+
+def closed_port_url():
+    """A loopback URL nothing listens on"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def timed_calls(backend, calls):
+    """Mean AssumeRole seconds over `calls` calls"""
+    creds = fake_credentials()
+    started = time.perf_counter()
+    for _ in range(calls):
+        success, result = backend.assume_role("arn:aws:iam::100000000000:role/Bench", "bench", "bench", creds)
+        if not success:
+            raise SystemExit(f"AssumeRole failed: {result}")
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", default="80,20,150", help=f"per-region latency for {', '.join(REGIONS)}")
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    latencies = [float(ms) / 1000 for ms in args.latency_ms.split(",")]
+    servers = {region: FakeAwsServer(latency=latency).start() for region, latency in zip(REGIONS, latencies)}
+    home = tempfile.mkdtemp(prefix="awsManagerBench")
+    os.environ["HOME"] = os.environ["USERPROFILE"] = home
+    config = dict(awsManager.CONFIG, default_region=REGIONS[0], sts_regions=REGIONS[1:], sts_endpoint_mode="fastest",
+                  sts_endpoints={**{region: server.url for region, server in servers.items()}, "global": closed_port_url()})
+    try:
+        backend = awsManager.NativeBackend(config)
+        started = time.perf_counter()
+        print(f"probe:            {backend.sts.describe()}  ({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+        configured = awsManager.NativeBackend(dict(config, sts_endpoint_mode="regional"))
+        print(f"configured first: {timed_calls(configured, args.calls) * 1000:6.1f} ms/call  ({configured.sts.order()[0][0]})")
+        print(f"probed first:     {timed_calls(backend, args.calls) * 1000:6.1f} ms/call  ({backend.sts.order()[0][0]})")
+
+        restarted = awsManager.NativeBackend(config)
+        started = time.perf_counter()
+        restarted.sts.order()
+        print(f"cached restart:   {(time.perf_counter() - started) * 1000:6.1f} ms to pick {restarted.sts.order()[0][0]}")
+
+        fastest = backend.sts.order()[0][0]
+        servers[fastest].unavailable = True
+        print(f"{fastest} down:   {timed_calls(backend, args.calls) * 1000:6.1f} ms/call  (now {backend.sts.order()[0][0]} first)")
+    finally:
+        for server in servers.values():
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IniFile / patch_ini_lines - the format-preserving patcher that rewrites ~/.aws/credentials and ~/.aws/config
+
+Usage:
+    python -m unittest discover tests      # or: python -m pytest tests
+"""
+
+import configparser
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from awsManager import IniFile, patch_ini_lines  # noqa: E402
+
+
+CONFIG_TEXT = """\
+# managed by hand - keep this comment
+[default]
+region = us-east-1
+
+[profile work] ; inline comment after the header
+; comment inside the section
+region = eu-west-1
+output = json
+
+[sso-session corp]
+sso_start_url = https://corp.awsapps.com/start
+sso_registration_scopes =
+    sso:account:access
+
+[profile last]
+region = us-west-2
+"""
+
+
+def parsed(text):
+    cp = configparser.ConfigParser(interpolation=None, inline_comment_prefixes=(";",))
+    cp.read_string(text)
+    return {section: dict(cp[section]) for section in cp.sections()}
+
+
+class IniFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "config"
+
+    def load(self, text):
+        self.path.write_text(text, encoding="utf-8", newline="")
+        ini = IniFile(self.path)
+        ini.refresh()
+        return ini
+
+    def assertIndexed(self, ini):
+        """The incrementally maintained index equals a from-scratch scan of the same text"""
+        fresh = IniFile(self.path)
+        fresh.reindex(ini.text)
+        self.assertEqual(ini.names, fresh.names)
+        self.assertEqual(ini.starts, fresh.starts)
+        for name, start in zip(ini.names, ini.starts):
+            self.assertTrue(ini.text.startswith(f"[{name}]", start))
+
+    def test_index(self):
+        ini = self.load(CONFIG_TEXT)
+        self.assertEqual(ini.names, ["default", "profile work", "sso-session corp", "profile last"])
+        self.assertEqual(ini.names, list(parsed(CONFIG_TEXT)))
+        self.assertEqual(ini.get("profile work"), {"region": "eu-west-1", "output": "json"})
+        self.assertIsNone(ini.get("profile missing"))
+
+    def test_comments_and_inline_comment_after_header_survive(self):
+        ini = self.load(CONFIG_TEXT)
+        self.assertTrue(ini.patch({"profile work": {"region": "ap-south-1"}}))
+        self.assertEqual(ini.text, CONFIG_TEXT.replace("region = eu-west-1", "region = ap-south-1"))
+        self.assertIndexed(ini)
+
+    def test_patch_section_followed_by_others(self):
+        ini = self.load(CONFIG_TEXT)
+        self.assertTrue(ini.patch({"profile work": {"credential_process": "python creds.py work", "output": None}}))
+        self.assertEqual(parsed(ini.text)["profile work"], {"region": "eu-west-1", "credential_process": "python creds.py work"})
+        self.assertIn("; comment inside the section\n", ini.text)
+        # Everything after the patched section moved, byte for byte
+        self.assertTrue(ini.text.endswith(CONFIG_TEXT[CONFIG_TEXT.index("\n[sso-session corp]"):]))
+        self.assertIndexed(ini)
+
+    def test_unchanged_values_are_not_rewritten(self):
+        text = CONFIG_TEXT.replace("region = eu-west-1", "region=eu-west-1")
+        ini = self.load(text)
+        self.assertFalse(ini.patch({"profile work": {"region": "eu-west-1"}}))
+        self.assertEqual(ini.text, text)
+
+    def test_remove_section(self):
+        ini = self.load(CONFIG_TEXT)
+        self.assertTrue(ini.patch({"profile work": None}))
+        self.assertNotIn("work", ini.text)
+        self.assertEqual(list(parsed(ini.text)), ["default", "sso-session corp", "profile last"])
+        self.assertIndexed(ini)
+
+        self.assertTrue(ini.patch({"profile last": None}))
+        self.assertTrue(ini.text.endswith("    sso:account:access\n"))  # no blank line left dangling
+        self.assertIndexed(ini)
+
+    def test_add_section(self):
+        ini = self.load(CONFIG_TEXT)
+        self.assertTrue(ini.patch({"profile new": {"region": "us-east-2", "output": None}}))
+        self.assertEqual(ini.text, CONFIG_TEXT + "\n[profile new]\nregion = us-east-2\n")
+        self.assertIndexed(ini)
+
+    def test_add_to_missing_file(self):
+        ini = IniFile(self.path)
+        ini.refresh()
+        self.assertTrue(ini.patch({"default": {"region": "us-east-1"}}))
+        self.assertEqual(ini.text, "[default]\nregion = us-east-1\n")
+        self.assertFalse(ini.patch({"profile gone": None}))  # removing what is not there changes nothing
+
+    def test_crlf_is_kept(self):
+        text = CONFIG_TEXT.replace("\n", "\r\n")
+        ini = self.load(text)
+        ini.patch({"profile work": {"region": "ap-south-1"}, "profile new": {"region": "us-east-2"}})
+        self.assertNotIn("\n", ini.text.replace("\r\n", ""))
+        self.assertIndexed(ini)
+
+    def test_reindex_after_external_edit(self):
+        """refresh() only rescans from the first changed byte - the result must still match a full scan"""
+        ini = self.load(CONFIG_TEXT)
+        edits = [
+            CONFIG_TEXT.replace("us-west-2", "us-west-1"),                          # inside the last section
+            CONFIG_TEXT.replace("[profile last]", "[profile renamed]"),             # a header after the kept ones
+            CONFIG_TEXT.replace("# managed by hand", "[profile first]\nregion = x"),  # before every section
+            CONFIG_TEXT.replace("\n[sso-session corp]", "\n[profile inserted]\nregion = y\n\n[sso-session corp]"),
+            CONFIG_TEXT[:CONFIG_TEXT.index("[profile last]")],                       # truncated
+            "",
+        ]
+        for text in edits:
+            with self.subTest(text=text[:40]):
+                ini.reindex(text)
+                self.assertIndexed(ini)
+                self.assertEqual(ini.names, list(parsed(text)))
+
+    def test_reindex_scans_only_the_tail(self):
+        ini = self.load(CONFIG_TEXT)
+        scanned = ini.stats["sections_scanned"]
+        ini.reindex(CONFIG_TEXT.replace("us-west-2", "us-west-1"))
+        self.assertLess(ini.stats["sections_scanned"] - scanned, len(ini.names))
+
+    def test_round_trip_through_configparser(self):
+        ini = self.load(CONFIG_TEXT)
+        expected = parsed(CONFIG_TEXT)
+        updates = [
+            {"profile work": {"region": "ap-south-1"}},
+            {"profile a1": {"region": "us-east-1", "credential_process": "creds a1"}},
+            {"default": {"region": "eu-central-1", "output": "text"}},
+            {"profile last": None},
+            {"profile a1": {"credential_process": None}},
+            {"profile a2": {"region": "sa-east-1"}},
+        ]
+        for update in updates:
+            ini.patch(update)
+            for section, values in update.items():
+                if values is None:
+                    expected.pop(section)
+                    continue
+                current = expected.setdefault(section, {})
+                for key, value in values.items():
+                    if value is None:
+                        current.pop(key, None)
+                    else:
+                        current[key] = value
+            self.assertEqual(parsed(ini.text), expected)
+            self.assertIndexed(ini)
+        self.assertIn("# managed by hand - keep this comment\n", ini.text)
+
+    def test_save_and_refresh(self):
+        ini = self.load(CONFIG_TEXT)
+        ini.patch({"profile work": {"region": "ap-south-1"}})
+        ini.save()
+        self.assertEqual(self.path.read_text(encoding="utf-8"), ini.text)
+        self.assertFalse(ini.refresh())  # our own write is not re-read
+
+        ini.patch({name: None for name in list(ini.names)})
+        ini.save()
+        self.assertEqual(self.path.read_text(encoding="utf-8"), "# managed by hand - keep this comment\n")
+
+        ini = self.load("[default]\nregion = us-east-1\n")
+        ini.patch({"default": None})
+        ini.save()
+        self.assertFalse(self.path.exists())  # nothing left - the file goes away
+
+    def test_indented_header_is_not_a_section(self):
+        """Like configparser: an indented "[name]" after a key is a continuation of that key's value"""
+        text = "[default]\nregion = us-east-1\n  [profile hidden]\n[profile shown]\nregion = x\n"
+        ini = self.load(text)
+        self.assertEqual(ini.names, list(parsed(text)))
+        lines = patch_ini_lines(text.splitlines(), "profile hidden", {"region": "y"})
+        self.assertEqual(lines, text.splitlines() + ["", "[profile hidden]", "region = y"])
+
+
+class PatchIniLinesTest(unittest.TestCase):
+
+    LINES = ["[default]", "region = us-east-1", "ca_bundle =", "    a.pem", "    b.pem", "REGION = duplicate", "", "[other]", "k = v"]
+
+    def test_continuation_lines_of_untouched_keys_are_kept(self):
+        lines = patch_ini_lines(self.LINES, "default", {"output": "json"})
+        self.assertEqual(lines[:5], self.LINES[:5])
+        self.assertEqual(lines[6], "output = json")
+
+    def test_key_match_is_case_insensitive_and_drops_duplicates(self):
+        lines = patch_ini_lines(self.LINES, "default", {"region": "eu-west-1"})
+        self.assertEqual([line for line in lines if "region" in line.lower()], ["region = eu-west-1"])
+        self.assertEqual(lines[-2:], ["[other]", "k = v"])
+
+    def test_replace_multi_line_value(self):
+        lines = patch_ini_lines(self.LINES, "default", {"ca_bundle": "c.pem"})
+        self.assertEqual(lines[:3], ["[default]", "region = us-east-1", "ca_bundle = c.pem"])
+        self.assertNotIn("    a.pem", lines)
+
+    def test_remove_last_section(self):
+        self.assertEqual(patch_ini_lines(self.LINES, "other", None), self.LINES[:6])
+
+    def test_untouched_section(self):
+        self.assertEqual(patch_ini_lines(self.LINES, "missing", {"k": None}), self.LINES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RenewalScheduler against a fake clock - superseded heap entries, jitter batching, the session-expiry deadline
+
+Usage:
+    python -m unittest discover tests      # or: python -m pytest tests
+"""
+
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from awsManager import RenewalScheduler  # noqa: E402
+
+
+class FakeClock:
+    """Epoch seconds that only move when the test says so - or by `step` on every read, which stands in for
+    the time a real wait would have taken"""
+
+    def __init__(self, now=1_000_000.0, step=0.0):
+        self.now = now
+        self.step = step
+
+    def __call__(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+
+def scheduler(clock, jitter_seconds=0, max_sleep_seconds=0):
+    # max_sleep_seconds=0: Condition.wait() returns at once, so only the fake clock decides what is due
+    return RenewalScheduler(margin_seconds=300, jitter_seconds=jitter_seconds, max_sleep_seconds=max_sleep_seconds,
+                            clock=clock)
+
+
+class RenewalSchedulerTest(unittest.TestCase):
+
+    def test_due_profiles_in_order(self):
+        clock = FakeClock()
+        s = scheduler(clock)
+        s.schedule_at("b", clock.now + 20)
+        s.schedule_at("a", clock.now + 10)
+        self.assertEqual(s.next_due(), clock.now + 10)
+        self.assertEqual(s.wait_due(clock.now), [])  # nothing due, deadline reached
+        clock.now += 10
+        self.assertEqual(s.wait_due(clock.now + 100), ["a"])
+        clock.now += 10
+        self.assertEqual(s.wait_due(clock.now + 100), ["b"])
+        self.assertIsNone(s.next_due())
+
+    def test_waits_until_due(self):
+        clock = FakeClock(step=1.0)
+        s = scheduler(clock)
+        start = clock.now
+        s.schedule_at("a", start + 30)
+        self.assertEqual(s.wait_due(start + 3600), ["a"])
+        self.assertGreaterEqual(clock.now, start + 30)
+
+    def test_ends_at_session_expiry(self):
+        clock = FakeClock(step=1.0)
+        s = scheduler(clock)
+        start = clock.now
+        s.schedule_at("a", start + 7200)  # due after the MFA session is gone
+        self.assertEqual(s.wait_due(start + 60), [])
+        self.assertLess(clock.now, start + 7200)
+        self.assertEqual(s.next_due(), start + 7200)  # still scheduled - ending the wait does not drop it
+
+    def test_reschedule_supersedes_the_old_entry(self):
+        clock = FakeClock()
+        s = scheduler(clock)
+        s.schedule_at("a", clock.now + 100)
+        s.schedule_at("a", clock.now + 10)  # the latest call wins, even when earlier
+        clock.now += 10
+        self.assertEqual(s.wait_due(clock.now), ["a"])
+        clock.now += 90
+        self.assertEqual(s.wait_due(clock.now), [])  # the stale +100 entry never fires
+
+        s.schedule_at("b", clock.now + 10)
+        s.schedule_at("b", clock.now + 50)  # pushed back: the +10 entry is stale
+        clock.now += 10
+        self.assertEqual(s.wait_due(clock.now), [])
+        clock.now += 40
+        self.assertEqual(s.wait_due(clock.now), ["b"])
+
+    def test_same_due_twice_fires_once(self):
+        clock = FakeClock()
+        s = scheduler(clock)
+        s.schedule_at("a", clock.now)
+        s.schedule_at("a", clock.now)
+        self.assertEqual(s.wait_due(clock.now), ["a"])
+        self.assertEqual(s.wait_due(clock.now), [])
+
+    def test_remove(self):
+        clock = FakeClock()
+        s = scheduler(clock)
+        s.schedule_at("a", clock.now)
+        s.schedule_at("b", clock.now)
+        s.remove("a")
+        s.remove("missing")
+        self.assertEqual(s.wait_due(clock.now), ["b"])
+
+    def test_jitter_window_batches(self):
+        clock = FakeClock()
+        s = scheduler(clock, jitter_seconds=60)
+        s.schedule_at("a", clock.now)
+        s.schedule_at("b", clock.now + 59)   # within the window - renewed with "a"
+        s.schedule_at("c", clock.now + 61)   # outside it
+        self.assertEqual(s.wait_due(clock.now), ["a", "b"])
+        self.assertEqual(s.next_due(), clock.now + 61)
+
+    def test_batch_skips_stale_entries(self):
+        clock = FakeClock()
+        s = scheduler(clock, jitter_seconds=60)
+        s.schedule_at("a", clock.now)
+        s.schedule_at("b", clock.now + 30)
+        s.schedule_at("b", clock.now + 3000)  # moved out of the window after being queued in it
+        self.assertEqual(s.wait_due(clock.now), ["a"])
+        self.assertEqual(s.next_due(), clock.now + 3000)
+
+    def test_schedule_expiry(self):
+        clock = FakeClock()
+        s = scheduler(clock, jitter_seconds=60)
+        expires = clock.now + 3600
+        for _ in range(50):
+            due = s.schedule_expiry("a", expires)
+            self.assertTrue(expires - 360 <= due <= expires - 300)
+            self.assertEqual(s.next_due(), due)
+
+    def test_schedule_expiry_in_the_past_is_due_now(self):
+        clock = FakeClock()
+        s = scheduler(clock, jitter_seconds=60)
+        s.schedule_expiry("a", clock.now + 10)  # expires inside the margin
+        self.assertEqual(s.next_due(), clock.now)
+        self.assertEqual(s.wait_due(clock.now), ["a"])
+
+    def test_renew_now(self):
+        clock = FakeClock()
+        s = scheduler(clock)
+        for name, offset in (("a", 100), ("b", 200), ("c", 300)):
+            s.schedule_at(name, clock.now + offset)
+        s.renew_now(["b"])
+        self.assertEqual(s.wait_due(clock.now), ["b"])
+        s.renew_now()  # everything still scheduled
+        self.assertEqual(sorted(s.wait_due(clock.now)), ["a", "c"])
+        self.assertEqual(s.wait_due(clock.now), [])
+
+    def test_renew_now_and_stop_wake_a_waiter(self):
+        clock = FakeClock()
+        s = scheduler(clock, max_sleep_seconds=3600)  # a real, long wait - only a notify can end it
+        s.schedule_at("a", clock.now + 3000)
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(s.wait_due(clock.now + 3600)))
+        waiter.start()
+        s.renew_now(["a"])
+        waiter.join(5)
+        self.assertEqual(result, [["a"]])
+
+        waiter = threading.Thread(target=lambda: result.append(s.wait_due(clock.now + 3600)))
+        waiter.start()
+        s.stop()
+        waiter.join(5)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(result[1], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+classify_error, RetryPolicy and CircuitBreaker - how failed renewals are retried and when a profile is paused
+
+Usage:
+    python -m unittest discover tests      # or: python -m pytest tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from awsManager import CircuitBreaker, RetryPolicy, classify_error  # noqa: E402
+
+
+class ClassifyErrorTest(unittest.TestCase):
+
+    CASES = [
+        ("An error occurred (Throttling) when calling the AssumeRole operation: Rate exceeded", "throttling"),
+        ("An error occurred (HTTP 429) when calling the GetAuthorizationToken operation: ", "throttling"),
+        ("An error occurred (TooManyRequestsException) when calling the GetAuthorizationToken operation", "throttling"),
+        ("An error occurred (AccessDenied) when calling the AssumeRole operation: User: arn:aws:iam::1:user/x "
+         "is not authorized to perform: sts:AssumeRole", "permanent"),
+        ("An error occurred (ExpiredToken) when calling the AssumeRole operation: The security token included "
+         "in the request is expired", "permanent"),
+        ("An error occurred (RegionDisabledException) when calling the AssumeRole operation", "permanent"),
+        ("Could not connect to the endpoint URL: https://sts.us-east-1.amazonaws.com (timed out)", "transient"),
+        ("An error occurred (HTTP 503) when calling the AssumeRole operation: ", "transient"),
+        ("", "transient"),
+    ]
+
+    def test_cases(self):
+        for message, kind in self.CASES:
+            with self.subTest(message=message[:60]):
+                self.assertEqual(classify_error(message), kind)
+
+    def test_throttling_wins_over_permanent_words(self):
+        self.assertEqual(classify_error("Rate exceeded for AccessDenied retries"), "throttling")
+
+    def test_non_string(self):
+        self.assertEqual(classify_error(ValueError("Throttling")), "throttling")
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def run_policy(self, results, attempts=3, should_stop=lambda: False):
+        """Feed `results` to RetryPolicy.call (no real waits); returns (outcome, calls, retries)"""
+        results, calls, retries = list(results), [], []
+        policy = RetryPolicy(attempts=attempts, base_seconds=0, max_seconds=0)
+
+        def operation():
+            calls.append(1)
+            return results.pop(0)
+
+        outcome = policy.call(operation, lambda *args: retries.append(args), should_stop)
+        return outcome, len(calls), retries
+
+    def test_success_first_time(self):
+        self.assertEqual(self.run_policy([(True, "creds")]), ((True, "creds", None), 1, []))
+
+    def test_transient_then_success(self):
+        outcome, calls, retries = self.run_policy([(False, "HTTP 503"), (False, "Throttling"), (True, "creds")])
+        self.assertEqual(outcome, (True, "creds", None))
+        self.assertEqual(calls, 3)
+        self.assertEqual([(attempt, kind) for attempt, _, kind, _ in retries], [(1, "transient"), (2, "throttling")])
+
+    def test_permanent_fails_at_once(self):
+        outcome, calls, retries = self.run_policy([(False, "AccessDenied")])
+        self.assertEqual((outcome, calls, retries), ((False, "AccessDenied", "permanent"), 1, []))
+
+    def test_gives_up_after_attempts(self):
+        outcome, calls, _ = self.run_policy([(False, "HTTP 503")] * 3, attempts=2)
+        self.assertEqual((outcome, calls), ((False, "HTTP 503", "transient"), 3))
+
+    def test_should_stop(self):
+        outcome, calls, _ = self.run_policy([(False, "HTTP 503")] * 4, should_stop=lambda: True)
+        self.assertEqual((outcome, calls), ((False, "HTTP 503", "transient"), 1))
+
+    def test_delay_bounds(self):
+        policy = RetryPolicy(attempts=5, base_seconds=0.5, max_seconds=8)
+        for attempt in range(6):
+            for _ in range(50):
+                self.assertLessEqual(policy.delay(attempt, "transient"), min(8, 0.5 * 2 ** attempt))
+                self.assertLessEqual(policy.delay(attempt, "throttling"), min(8, 1.0 * 2 ** attempt))
+                self.assertGreaterEqual(policy.delay(attempt, "transient"), 0)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    NOW = 1_000_000.0
+
+    def breaker(self):
+        return CircuitBreaker(failures=3, permanent_failures=2, cooldown_seconds=100, max_cooldown_seconds=350)
+
+    def fail(self, breaker, kind="transient", now=NOW, profile="a"):
+        return breaker.record_failure(profile, kind, f"{kind} error", now=now)
+
+    def test_opens_after_consecutive_failures(self):
+        b = self.breaker()
+        self.assertFalse(self.fail(b))
+        self.assertFalse(self.fail(b))
+        self.assertTrue(b.allow("a", now=self.NOW))
+        self.assertTrue(self.fail(b))
+        self.assertFalse(b.allow("a", now=self.NOW))
+        self.assertEqual(b.retry_at("a"), self.NOW + 100)
+        self.assertEqual(b.open_profiles(), {"a": (self.NOW + 100, "transient error")})
+
+    def test_permanent_failures_open_sooner(self):
+        b = self.breaker()
+        self.assertFalse(self.fail(b, "permanent"))
+        self.assertTrue(self.fail(b, "permanent"))
+
+    def test_permanent_count_is_consecutive(self):
+        b = self.breaker()
+        self.fail(b, "permanent")
+        self.fail(b, "transient")   # resets the permanent streak, but is the 2nd failure overall
+        self.assertTrue(self.fail(b, "permanent"))  # 3rd failure overall opens it
+        b = self.breaker()
+        self.fail(b, "permanent")
+        self.fail(b, "transient")
+        self.assertIsNone(b.retry_at("a"))
+
+    def test_half_open_probe_and_doubling_cooldown(self):
+        b = self.breaker()
+        for _ in range(3):
+            self.fail(b)
+        now = self.NOW + 100
+        self.assertTrue(b.allow("a", now=now))   # cooldown over - one probe goes through
+        self.assertTrue(self.fail(b, now=now))   # probe failed: open again, twice as long
+        self.assertEqual(b.retry_at("a"), now + 200)
+        self.assertFalse(b.allow("a", now=now + 199))
+        now += 200
+        self.assertTrue(self.fail(b, now=now))
+        self.assertEqual(b.retry_at("a"), now + 350)  # capped
+
+    def test_success_closes(self):
+        b = self.breaker()
+        self.assertFalse(b.record_success("a"))  # was never open
+        for _ in range(3):
+            self.fail(b)
+        self.assertTrue(b.record_success("a"))
+        self.assertTrue(b.allow("a", now=self.NOW))
+        self.assertEqual(b.open_profiles(), {})
+        self.assertFalse(self.fail(b))  # counting starts over
+        self.assertFalse(self.fail(b))
+
+    def test_throttling_does_not_count(self):
+        """An STS-wide throttle must not pause healthy accounts"""
+        b = self.breaker()
+        for profile in ("a", "b", "c"):
+            for _ in range(10):
+                self.assertFalse(self.fail(b, "throttling", profile=profile))
+        self.assertEqual(b.open_profiles(), {})
+        self.fail(b)
+        self.fail(b)
+        self.fail(b, "throttling")
+        self.assertTrue(self.fail(b))  # throttling neither counts nor breaks the streak
+
+    def test_throttled_probe_does_not_extend_the_pause(self):
+        b = self.breaker()
+        for _ in range(3):
+            self.fail(b)
+        self.assertFalse(self.fail(b, "throttling", now=self.NOW + 100))
+        self.assertEqual(b.retry_at("a"), self.NOW + 100)
+        self.assertTrue(b.allow("a", now=self.NOW + 100))
+
+    def test_profiles_are_independent(self):
+        b = self.breaker()
+        for _ in range(3):
+            self.fail(b, profile="a")
+        self.assertFalse(b.allow("a", now=self.NOW))
+        self.assertTrue(b.allow("b", now=self.NOW))
+        b.remove("a")
+        self.assertTrue(b.allow("a", now=self.NOW))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TOTP against the RFC 6238 Appendix B test vectors, and base32_key input handling
+
+Usage:
+    python -m unittest discover tests      # or: python -m pytest tests
+"""
+
+import base64
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from awsManager import TOTP, base32_key  # noqa: E402
+
+
+# RFC 6238 Appendix B: the ASCII seed repeated to the hash's key length, 8 digits, 30 s steps
+SEEDS = {
+    "sha1": b"12345678901234567890",
+    "sha256": b"12345678901234567890123456789012",
+    "sha512": b"1234567890123456789012345678901234567890123456789012345678901234",
+}
+
+VECTORS = [
+    # time,         SHA1,       SHA256,     SHA512
+    (59,            "94287082", "46119246", "90693936"),
+    (1111111109,    "07081804", "68084774", "25091201"),
+    (1111111111,    "14050471", "67062674", "99943326"),
+    (1234567890,    "89005924", "91819424", "93441116"),
+    (2000000000,    "69279037", "90698825", "38618901"),
+    (20000000000,   "65353130", "77737706", "47863826"),
+]
+
+
+def totp(algorithm):
+    return TOTP(base64.b32encode(SEEDS[algorithm]).decode("ascii"), digits=8, algorithm=algorithm)
+
+
+class Rfc6238VectorsTest(unittest.TestCase):
+
+    def test_vectors(self):
+        for index, algorithm in enumerate(("sha1", "sha256", "sha512"), start=1):
+            generator = totp(algorithm)
+            for vector in VECTORS:
+                with self.subTest(algorithm=algorithm, time=vector[0]):
+                    self.assertEqual(generator.code_at(generator.counter(vector[0])), vector[index])
+
+    def test_now_matches_code_at(self):
+        generator = totp("sha1")
+        self.assertEqual(generator.now(1111111109), "07081804")
+
+    def test_six_digits_is_the_low_order_part(self):
+        generator = TOTP(base64.b32encode(SEEDS["sha1"]).decode("ascii"))
+        self.assertEqual(generator.now(59), "287082")
+
+
+class Base32KeyTest(unittest.TestCase):
+
+    KEY = SEEDS["sha1"]
+    SECRET = base64.b32encode(KEY).decode("ascii")  # GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ
+
+    def test_canonical(self):
+        self.assertEqual(base32_key(self.SECRET), self.KEY)
+
+    def test_lowercase(self):
+        self.assertEqual(base32_key(self.SECRET.lower()), self.KEY)
+
+    def test_spaces(self):
+        grouped = " ".join(self.SECRET[i:i + 4] for i in range(0, len(self.SECRET), 4)).lower()
+        self.assertEqual(base32_key(grouped), self.KEY)
+
+    def test_missing_padding(self):
+        for key in (b"hello!", b"\x00\xffke", b"x"):  # 6, 4 and 1 bytes: 6, 1 and 6 "=" of padding
+            encoded = base64.b32encode(key).decode("ascii")
+            with self.subTest(encoded=encoded):
+                self.assertTrue(encoded.endswith("="))
+                self.assertEqual(base32_key(encoded), key)
+                self.assertEqual(base32_key(encoded.rstrip("=")), key)
+                self.assertEqual(base32_key(encoded.rstrip("=").lower()), key)
+
+    def test_invalid_character(self):
+        with self.assertRaises(ValueError):
+            base32_key("GEZD1NBV")  # "1" is not in the Base32 alphabet
+
+    def test_empty_secret_rejected(self):
+        with self.assertRaises(ValueError):
+            TOTP("  ")
+
+
+if __name__ == '__main__':
+    unittest.main()